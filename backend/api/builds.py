@@ -0,0 +1,55 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-05-01
+Description:
+This FastAPI router serves "more like this" build suggestions.
+Features:
+- POST /builds/match: labeled builds nearest to the requested features within the price,
+  re-ranked by the RandomForest build scorer
+- GET /builds/{build_id}/similar: the k most similar labeled builds (precomputed neighbour lists)
+- GET /builds/{build_id}/ratings: rating count, mean, variance and last_rated from the
+  build_rating_stats aggregates (a single primary-key read)
+- Unknown (or, for ratings, unrated) build IDs return 404
+"""
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+from recommender.similar_builds import similar_builds, NEIGHBORS_K
+from recommender.content_recommender import recommend_build_from_features
+from auth.repositories import ratings
+
+builds_router = APIRouter()
+
+#  Most builds one /builds/match request can return
+MAX_MATCHES = 20
+
+class BuildFeatureQuery(BaseModel):
+    cpu_score: float
+    gpu_score: float
+    ram_gb: float
+    storage_gb: float
+    price: float
+    top_k: int = Field(5, ge=1, le=MAX_MATCHES)
+    rerank: bool = True
+
+@builds_router.post("/builds/match")
+def match_builds_handler(query: BuildFeatureQuery):
+    user_features = query.model_dump(exclude={"top_k", "rerank"})
+    builds = recommend_build_from_features(user_features=user_features, top_k=query.top_k, rerank=query.rerank)
+    return {"builds": builds}
+
+@builds_router.get("/builds/{build_id}/similar")
+def similar_builds_handler(build_id: str, k: int = Query(5, ge=1, le=NEIGHBORS_K)):
+    try:
+        similar = similar_builds.similar(build_id, k)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return {"build_id": build_id, "similar": similar}
+
+@builds_router.get("/builds/{build_id}/ratings")
+async def build_ratings_handler(build_id: str):
+    stats = await ratings.stats(build_id)
+    if stats is None:
+        raise HTTPException(status_code=404, detail=f"No ratings for build: {build_id}")
+    return {"build_id": build_id, **stats}
@@ -0,0 +1,66 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-30
+Description:
+This FastAPI router exposes batched component compatibility scoring from the Siamese network.
+Features:
+- POST /compatibility/score: one component against many candidates of a category
+  (all of them by default, or up to MAX_CANDIDATES named ones), sorted by compatibility,
+  optionally limited to top_k (>= 1)
+- POST /compatibility/pairs: scores up to MAX_PAIRS arbitrary component pairs in one call
+- Out-of-range top_k or oversized lists return 422
+- GET /compatibility/categories: categories with cached embeddings
+- Unknown categories or component names return 404
+"""
+
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel, Field
+from recommender.compatibility_scorer import compatibility_scorer
+
+compatibility_router = APIRouter()
+
+#  Most candidates / pairs one request may score
+MAX_CANDIDATES = 5000
+MAX_PAIRS = 5000
+
+class CompatibilityQuery(BaseModel):
+    category: str
+    name: str
+    candidate_category: str
+    candidate_names: Optional[List[str]] = Field(None, max_length=MAX_CANDIDATES)
+    top_k: Optional[int] = Field(None, ge=1)
+
+class ComponentPair(BaseModel):
+    category_a: str
+    name_a: str
+    category_b: str
+    name_b: str
+
+class CompatibilityPairs(BaseModel):
+    pairs: List[ComponentPair] = Field(..., max_length=MAX_PAIRS)
+
+@compatibility_router.get("/compatibility/categories")
+def compatibility_categories():
+    return {"categories": compatibility_scorer.categories()}
+
+@compatibility_router.post("/compatibility/score")
+def score_compatibility(query: CompatibilityQuery):
+    try:
+        results = compatibility_scorer.score_against(
+            query.category, query.name, query.candidate_category, query.candidate_names, query.top_k
+        )
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return {"category": query.category, "name": query.name,
+            "candidate_category": query.candidate_category, "results": results}
+
+@compatibility_router.post("/compatibility/pairs")
+def score_compatibility_pairs(request: CompatibilityPairs):
+    pairs = [(p.category_a, p.name_a, p.category_b, p.name_b) for p in request.pairs]
+    try:
+        scores = compatibility_scorer.score_pairs(pairs)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    return {"scores": scores}
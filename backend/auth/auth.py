@@ -7,22 +7,26 @@ This module handles user authentication and saved build logic using FastAPI.
 It:
 - Registers users with hashed passwords
 - Verifies login credentials
+- Runs bcrypt for register/login/update-profile on the bounded hashing pool (429 when saturated)
 - Generates and returns JWT tokens on successful login
 - Provides access to user profile (protected route)
-- Allows authenticated users to save, retrieve and delete multiple PC builds.
+- Rates builds one at a time or in bulk (/rate-builds), as atomic upserts
+- Allows authenticated users to save, retrieve (keyset-paginated) and delete multiple PC builds,
+  one saved_builds row per build
+- All routes are async; SQL goes through the async repositories (auth/repositories.py),
+  which run on dedicated DB threads with pooled connections
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends, Body
+from fastapi import APIRouter, HTTPException, status, Depends, Body, Query
 from fastapi.security import OAuth2PasswordRequestForm
 import sqlite3
-import json
 
 from .schemas import UserCreate, UserResponse
-from .hashing import Hasher
-from .jwt_handler import create_access_token, get_current_user
-from .database import get_db_connection
-from .schemas import BuildRating
-from datetime import datetime
+from .hashing import hashing_pool, HashingBusy
+from .jwt_handler import create_access_token, get_current_user, user_cache
+from .repositories import users, ratings, saved_builds
+from .schemas import BuildRating, BuildRatingBatch
+from typing import Optional
 from .schemas import UserUpdate
 
 from pydantic import BaseModel
@@ -34,26 +38,39 @@ class LoginRequest(BaseModel):
 
 router = APIRouter(tags=["Authentication"])
 
+#  Saved builds returned per /my_builds page
+SAVED_BUILDS_PAGE_SIZE = 50
+MAX_SAVED_BUILDS_PAGE_SIZE = 200
+
+#  Seconds clients are asked to wait when the hashing pool is saturated
+HASH_RETRY_AFTER = "1"
+
+#  bcrypt runs on the bounded hashing pool; a saturated pool answers 429 instead of queueing forever
+async def hash_password(password: str) -> str:
+    try:
+        return await hashing_pool.hash_password(password)
+    except HashingBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": HASH_RETRY_AFTER})
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return await hashing_pool.verify_password(plain_password, hashed_password)
+    except HashingBusy as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": HASH_RETRY_AFTER})
+
 #  REGISTER ROUTE
 @router.post("/register", response_model=UserResponse)
-def register(user: UserCreate):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT * FROM users WHERE username = ? OR email = ?", (user.username, user.email))
-    existing_user = cursor.fetchone()
-    if existing_user:
+async def register(user: UserCreate):
+    if await users.exists(user.username, user.email):
         raise HTTPException(status_code=400, detail="Username or email already exists.")
 
-    hashed_pw = Hasher.hash_password(user.password)
-    cursor.execute(
-        "INSERT INTO users (username, email, hashed_password, role, saved_builds) VALUES (?, ?, ?, ?, ?)",
-        (user.username, user.email, hashed_pw, user.role or "user", json.dumps([]))
-    )
-    conn.commit()
-    conn.close()
+    hashed_pw = await hash_password(user.password)
+    try:
+        user_id = await users.create(user.username, user.email, hashed_pw, user.role or "user")
+    except sqlite3.IntegrityError:
+        #  Lost a race with a concurrent registration for the same username/email
+        raise HTTPException(status_code=400, detail="Username or email already exists.")
 
-    user_id = cursor.lastrowid
     return {
         "id": user_id,
         "username": user.username,
@@ -63,224 +80,124 @@ def register(user: UserCreate):
 
 #  LOGIN ROUTE
 @router.post("/login")
-def login(form_data: LoginRequest):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+async def login(form_data: LoginRequest):
+    user = await users.find_login(form_data.username)
 
-    cursor.execute("SELECT * FROM users WHERE username = ?", (form_data.username,))
-    user = cursor.fetchone()
-    conn.close()
-
-    if not user or not Hasher.verify_password(form_data.password, user[3]):
+    if not user or not await verify_password(form_data.password, user[1]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password"
         )
 
-    token = create_access_token(data={"sub": user[1]})
+    token = create_access_token(data={"sub": user[0]})
     return {"access_token": token, "token_type": "bearer"}
 
 #  UPDATE PROFILE ROUTE
 @router.patch("/auth/update-profile")
-def update_profile(updates: UserUpdate, current_user: dict = Depends(get_current_user)):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    updated_fields = []
-    params = []
+async def update_profile(updates: UserUpdate, current_user: dict = Depends(get_current_user)):
+    conflict = await users.find_profile_conflict(current_user["id"], updates.username, updates.email)
+    if conflict:
+        raise HTTPException(status_code=400, detail=conflict)
 
+    fields = {}
     if updates.username:
-        cursor.execute("SELECT id FROM users WHERE username = ? AND id != ?", (updates.username, current_user["id"]))
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Username already taken by another user.")
-        updated_fields.append("username = ?")
-        params.append(updates.username)
-
+        fields["username"] = updates.username
     if updates.email:
-        cursor.execute("SELECT id FROM users WHERE email = ? AND id != ?", (updates.email, current_user["id"]))
-        if cursor.fetchone():
-            raise HTTPException(status_code=400, detail="Email already registered by another user.")
-        updated_fields.append("email = ?")
-        params.append(updates.email)
+        fields["email"] = updates.email
 
     if updates.new_password:
         if not updates.current_password:
             raise HTTPException(status_code=400, detail="Current password is required.")
-        cursor.execute("SELECT hashed_password FROM users WHERE id = ?", (current_user["id"],))
-        hashed_pw = cursor.fetchone()[0]
-        if not Hasher.verify_password(updates.current_password, hashed_pw):
+        hashed_pw = await users.find_password_hash(current_user["id"])
+        if not await verify_password(updates.current_password, hashed_pw):
             raise HTTPException(status_code=401, detail="Current password is incorrect.")
-        new_hashed = Hasher.hash_password(updates.new_password)
-        updated_fields.append("hashed_password = ?")
-        params.append(new_hashed)
+        fields["hashed_password"] = await hash_password(updates.new_password)
 
-    if not updated_fields:
+    if not fields:
         raise HTTPException(status_code=400, detail="No updates provided.")
 
-    params.append(current_user["id"])
-    update_query = f"UPDATE users SET {', '.join(updated_fields)} WHERE id = ?"
-    cursor.execute(update_query, tuple(params))
+    await users.update(current_user["id"], fields)
 
-    conn.commit()
-    conn.close()
+    #  Drop the cached identity so the next request sees the new username/email
+    user_cache.invalidate(current_user["username"])
+    if updates.username:
+        user_cache.invalidate(updates.username)
 
     return {"message": " Profile updated successfully."}
 
 #  DELETE OWN ACCOUNT
 @router.delete("/auth/delete-account")
-def delete_own_account(current_user: dict = Depends(get_current_user)):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("DELETE FROM ratings WHERE user_id = ?", (current_user["id"],))
-    cursor.execute("DELETE FROM users WHERE id = ?", (current_user["id"],))
-    conn.commit()
-    conn.close()
+async def delete_own_account(current_user: dict = Depends(get_current_user)):
+    await users.delete(current_user["id"])
+    user_cache.invalidate(current_user["username"])
 
     return {"message": f" Your account '{current_user['username']}' has been deleted."}
 
 #  GET PROFILE ROUTE
 @router.get("/me", response_model=UserResponse)
-def get_profile(current_user: dict = Depends(get_current_user)):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT saved_builds FROM users WHERE username = ?", (current_user["username"],))
-    result = cursor.fetchone()
-    conn.close()
-
-    saved_builds = json.loads(result[0]) if result and result[0] else []
-
+async def get_profile(current_user: dict = Depends(get_current_user)):
     return {
         "id": current_user["id"],
         "username": current_user["username"],
         "email": current_user["email"],
         "role": current_user["role"],
-        "saved_builds": saved_builds
+        "saved_builds": await saved_builds.all_for_user(current_user["id"])
     }
 
 #  SAVE MULTIPLE BUILDS
 @router.post("/save_build")
-def save_build(build: dict = Body(...), current_user: dict = Depends(get_current_user)):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT saved_builds FROM users WHERE username = ?", (current_user["username"],))
-    result = cursor.fetchone()
-
-    existing_builds = []
-    if result and result[0]:
-        try:
-            existing_builds = json.loads(result[0])
-            if isinstance(existing_builds, dict):
-                existing_builds = [existing_builds]
-        except:
-            existing_builds = []
-
-    existing_builds.append(build)
-
-    cursor.execute("UPDATE users SET saved_builds = ? WHERE username = ?", (json.dumps(existing_builds), current_user["username"]))
-    conn.commit()
-    conn.close()
-
+async def save_build(build: dict = Body(...), current_user: dict = Depends(get_current_user)):
+    await saved_builds.add(current_user["id"], build)
     return {"message": " Build saved successfully!"}
 
-#  GET MULTIPLE SAVED BUILDS
+#  GET MULTIPLE SAVED BUILDS (keyset pagination: pass next_cursor back as cursor)
 @router.get("/my_builds")
-def get_saved_builds(current_user: dict = Depends(get_current_user)):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT saved_builds FROM users WHERE username = ?", (current_user["username"],))
-    result = cursor.fetchone()
-    conn.close()
-
-    if not result or not result[0]:
-        return {"saved_builds": []}
-
-    try:
-        builds = json.loads(result[0])
-        if isinstance(builds, dict):
-            builds = [builds]
-    except:
-        builds = []
-
-    return {"saved_builds": builds}
+async def get_saved_builds(
+    cursor: Optional[int] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(SAVED_BUILDS_PAGE_SIZE, ge=1, le=MAX_SAVED_BUILDS_PAGE_SIZE),
+    current_user: dict = Depends(get_current_user)
+):
+    builds, next_cursor = await saved_builds.page(current_user["id"], cursor, limit)
+    return {"saved_builds": builds, "next_cursor": next_cursor}
 
 #  DELETE SAVED BUILD
 @router.delete("/delete_build/{build_id}")
-def delete_saved_build(build_id: str, current_user: dict = Depends(get_current_user)):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT saved_builds FROM users WHERE username = ?", (current_user["username"],))
-    result = cursor.fetchone()
-
-    if not result or not result[0]:
-        conn.close()
-        raise HTTPException(status_code=404, detail="No saved builds found.")
-
-    saved_builds = json.loads(result[0])
-    if isinstance(saved_builds, dict):
-        saved_builds = [saved_builds]
-
-    updated_builds = [b for b in saved_builds if b.get("build_id") != build_id]
-
-    if len(updated_builds) == len(saved_builds):
-        conn.close()
+async def delete_saved_build(build_id: str, current_user: dict = Depends(get_current_user)):
+    if await saved_builds.delete(current_user["id"], build_id) == 0:
         raise HTTPException(status_code=404, detail="Build not found.")
 
-    cursor.execute("UPDATE users SET saved_builds = ? WHERE username = ?", (json.dumps(updated_builds), current_user["username"]))
-    conn.commit()
-    conn.close()
-
     return {"message": f" Build '{build_id}' deleted successfully."}
 
-#  RATE BUILD
+#  RATE BUILD(S): one upsert per rating against the unique (user_id, build_id) index
 @router.post("/rate-build")
-def rate_build(rating: BuildRating, current_user: dict = Depends(get_current_user)):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-
-    cursor.execute('SELECT id FROM ratings WHERE user_id = ? AND build_id = ?', (current_user["id"], rating.build_id))
-    existing = cursor.fetchone()
-
-    if existing:
-        cursor.execute('''
-            UPDATE ratings
-            SET rating = ?, timestamp = ?
-            WHERE user_id = ? AND build_id = ?
-        ''', (rating.rating, datetime.utcnow().isoformat(), current_user["id"], rating.build_id))
+async def rate_build(rating: BuildRating, current_user: dict = Depends(get_current_user)):
+    previous = await ratings.upsert(current_user["id"], {rating.build_id: rating.rating})
+
+    if rating.build_id in previous:
         message = f" Updated rating for build {rating.build_id}."
     else:
-        cursor.execute('''
-            INSERT INTO ratings (user_id, build_id, rating, timestamp)
-            VALUES (?, ?, ?, ?)
-        ''', (current_user["id"], rating.build_id, rating.rating, datetime.utcnow().isoformat()))
         message = f" New rating submitted for build {rating.build_id}."
 
-    conn.commit()
-    conn.close()
-
     return {"message": message}
 
-#  GET USER RATINGS
-@router.get("/get-ratings")
-def get_user_ratings(current_user: dict = Depends(get_current_user)):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+@router.post("/rate-builds")
+async def rate_builds(batch: BuildRatingBatch, current_user: dict = Depends(get_current_user)):
+    #  A build rated twice in one request keeps its last rating
+    new_ratings = {item.build_id: item.rating for item in batch.ratings}
+    previous = await ratings.upsert(current_user["id"], new_ratings)
 
-    cursor.execute('''
-        SELECT build_id, rating, comment, timestamp
-        FROM ratings
-        WHERE user_id = ?
-        ORDER BY timestamp DESC
-    ''', (current_user["id"],))
+    return {
+        "message": f" Saved {len(new_ratings)} rating(s).",
+        "created": len(new_ratings) - len(previous),
+        "updated": len(previous)
+    }
 
-    rows = cursor.fetchall()
-    conn.close()
+#  GET USER RATINGS
+@router.get("/get-ratings")
+async def get_user_ratings(current_user: dict = Depends(get_current_user)):
+    rows = await ratings.for_user(current_user["id"])
 
-    ratings = [
+    user_ratings = [
         {
             "build_id": row[0],
             "rating": row[1],
@@ -290,7 +207,7 @@ def get_user_ratings(current_user: dict = Depends(get_current_user)):
         for row in rows
     ]
 
-    return {"user": current_user["username"], "ratings": ratings}
+    return {"user": current_user["username"], "ratings": user_ratings}
 
 # Export router
-auth_router = router
\ No newline at end of file
+auth_router = router
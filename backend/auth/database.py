@@ -6,13 +6,28 @@ Description:
 This script sets up the SQLite database for user authentication and ratings.
 It:
 - Creates a `users.db` SQLite database (if not exists)
-- Defines a `users` table to store user credentials and saved builds
-- Defines a `ratings` table to store user-submitted ratings on builds
-- Provides a function to get a database connection
+- Defines a `users` table to store user credentials
+- Defines a `saved_builds` table (one row per saved build) and migrates the legacy
+  `users.saved_builds` JSON blobs into it
+- Defines a `ratings` table to store user-submitted ratings on builds (unique per user and build)
+- Defines a `build_rating_stats` table of per-build rating aggregates (auth/rating_stats.py),
+  backfilled from `ratings` when first created
+- Provides a pool of reusable connections (WAL journal, tuned pragmas, busy timeout,
+  per-connection prepared-statement cache) for the auth routes
+- Provides AsyncDatabase: awaitable queries run on dedicated DB threads (a queue in front of
+  DB_POOL_SIZE threads, one pooled connection each), used by auth/repositories.py
 """
 
 import sqlite3
 import os
+import json
+import queue
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from .rating_stats import create_rating_stats_table
 
 #  Define database file path
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -22,11 +37,169 @@ DB_PATH = os.path.join(DB_DIR, "users.db")
 #  Ensure database directory exists
 os.makedirs(DB_DIR, exist_ok=True)
 
+#  Connection pool settings
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 8))
+DB_POOL_TIMEOUT = 10.0
+DB_BUSY_TIMEOUT_MS = 5000
+DB_CACHE_SIZE_KB = 16384
+DB_MMAP_SIZE = 256 * 1024 * 1024
+DB_CACHED_STATEMENTS = 256
+#  init_db may wait for another worker's startup migration to finish
+DB_INIT_TIMEOUT_MS = 60000
+
+def _configure_connection(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """WAL lets readers run alongside a writer; NORMAL sync is safe in WAL mode."""
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    conn.execute(f"PRAGMA cache_size = -{DB_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    return conn
+
+def _open_connection(db_path: str) -> sqlite3.Connection:
+    return _configure_connection(sqlite3.connect(
+        db_path,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        cached_statements=DB_CACHED_STATEMENTS,
+    ))
+
+class ConnectionPool:
+    """
+    Bounded pool of SQLite connections, opened lazily and reused (most recently used first,
+    so hot connections keep their page and statement caches).
+    """
+
+    def __init__(self, db_path: str = DB_PATH, size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT):
+        self.db_path = db_path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return _open_connection(self.db_path)
+                except sqlite3.Error:
+                    self._opened -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"No database connection available after {self.timeout}s")
+
+    def release(self, conn: sqlite3.Connection):
+        try:
+            #  Uncommitted work (e.g. a route that raised) must not leak to the next borrower
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+#  Shared pool used by the auth routes
+db_pool = ConnectionPool()
+
+class AsyncDatabase:
+    """
+    Runs SQLite work off the event loop on its own threads (not the request threadpool shared
+    with the recommend endpoint); requests beyond the thread count wait in the executor's queue.
+    """
+
+    def __init__(self, workers: int = DB_POOL_SIZE):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sqlite")
+
+    @staticmethod
+    def _call(fn, args):
+        with db_connection() as conn:
+            return fn(conn, *args)
+
+    async def run(self, fn, *args):
+        """Awaits fn(conn, *args) on a DB thread with a pooled connection."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, args)
+
+    async def fetchone(self, sql: str, params: tuple = ()):
+        return await self.run(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql: str, params: tuple = ()):
+        return await self.run(lambda conn: conn.execute(sql, params).fetchall())
+
+    async def execute(self, sql: str, params: tuple = ()):
+        """Runs and commits one statement; returns the cursor (lastrowid / rowcount)."""
+        def execute(conn):
+            cursor = conn.execute(sql, params)
+            conn.commit()
+            return cursor
+        return await self.run(execute)
+
+#  Shared async access used by the auth repositories
+async_db = AsyncDatabase()
+
+def migrate_saved_builds(conn: sqlite3.Connection) -> int:
+    """
+    Moves every non-empty users.saved_builds JSON blob into saved_builds rows (list order kept)
+    and clears the blob, so running it again is a no-op. Returns the number of users migrated.
+    Run it inside the caller's write transaction (init_db) so concurrent workers can't both
+    copy the same blob.
+    """
+    rows = conn.execute(
+        "SELECT id, saved_builds FROM users WHERE saved_builds IS NOT NULL AND saved_builds NOT IN ('', '[]')"
+    ).fetchall()
+    for user_id, blob in rows:
+        try:
+            builds = json.loads(blob)
+        except ValueError:
+            builds = []
+        if isinstance(builds, dict):
+            builds = [builds]
+        conn.executemany(
+            "INSERT INTO saved_builds (user_id, build_id, payload) VALUES (?, ?, ?)",
+            [(user_id, b.get("build_id") if isinstance(b, dict) else None, json.dumps(b)) for b in builds]
+        )
+        conn.execute("UPDATE users SET saved_builds = NULL WHERE id = ?", (user_id,))
+    return len(rows)
+
 def init_db():
     """Initializes the SQLite database and creates tables if they don't exist."""
-    conn = sqlite3.connect(DB_PATH)
+    conn = _configure_connection(sqlite3.connect(DB_PATH))
+    conn.execute(f"PRAGMA busy_timeout = {DB_INIT_TIMEOUT_MS}")
     cursor = conn.cursor()
 
+    #  Every worker runs this at startup: take the write lock first so schema checks, migrations
+    #  and backfills see (and build on) each other's committed work instead of repeating it
+    cursor.execute("BEGIN IMMEDIATE")
+
     #  Create Users Table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
@@ -39,6 +212,25 @@ def init_db():
         )
     ''')
 
+    #  Create Saved Builds Table (the users.saved_builds column is legacy, kept for the migration)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS saved_builds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            build_id TEXT,
+            payload TEXT NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users(id)
+        )
+    ''')
+    #  Keyset pagination walks (user_id, id); deletes look up (user_id, build_id)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_saved_builds_user ON saved_builds(user_id, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_saved_builds_user_build ON saved_builds(user_id, build_id)")
+
+    migrated = migrate_saved_builds(conn)
+    if migrated:
+        print(f" Migrated saved builds for {migrated} user(s) into the saved_builds table")
+
     #  Create Ratings Table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS ratings (
@@ -52,13 +244,36 @@ def init_db():
         )
     ''')
 
+    #  Lets incremental exports find updated ratings without scanning the table
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ratings_timestamp ON ratings(timestamp)")
+
+    #  One rating per (user, build): keep the latest duplicate before enforcing it (first run only;
+    #  the check, dedupe and index share init_db's write transaction with the other workers)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_ratings_user_build'")
+    if not cursor.fetchone():
+        cursor.execute("DELETE FROM ratings WHERE id NOT IN (SELECT MAX(id) FROM ratings GROUP BY user_id, build_id)")
+        if cursor.rowcount:
+            print(f" Removed {cursor.rowcount} duplicate rating(s) before adding the unique index")
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_ratings_user_build ON ratings(user_id, build_id)")
+    #  Serves /get-ratings (a user's ratings, newest first) without a sort
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ratings_user_timestamp ON ratings(user_id, timestamp)")
+    #  Per-build lookups for build_rating_stats (last_rated after deletions, consistency repairs)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ratings_build ON ratings(build_id, timestamp)")
+
+    #  Per-build count/sum/sum of squares, kept current by the rating repositories
+    create_rating_stats_table(conn)
+
     conn.commit()
     conn.close()
     print(" Database initialized successfully!")
 
+def db_connection():
+    """Borrows a pooled connection: `with db_connection() as conn: ...` (returned to the pool on exit)."""
+    return db_pool.connection()
+
 def get_db_connection():
-    """Returns a connection to the SQLite database."""
-    return sqlite3.connect(DB_PATH)
+    """Returns a new (unpooled) connection to the SQLite database, with the pool's pragmas."""
+    return _open_connection(DB_PATH)
 
 #  Run database initialization when script is executed
 if __name__ == "__main__":
@@ -5,10 +5,22 @@ Date Created: 26/03/2025
 Description:
 This module handles password hashing and verification using bcrypt. It ensures that user passwords
 are securely stored and compared when authenticating users.
+Async routes run bcrypt on a small dedicated thread pool (HashingPool) so a burst of logins
+can't occupy the shared request threadpool; when too much work is already waiting the pool
+rejects new work (HashingBusy -> 429) and reports its queue depth for monitoring.
 """
 
+import os
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import bcrypt
 
+#  bcrypt pool settings: worker threads and the most hashes allowed in flight (running + queued)
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", 2))
+HASH_MAX_PENDING = int(os.environ.get("HASH_MAX_PENDING", 32))
+
 class Hasher:
     @staticmethod
     def hash_password(password: str) -> str:
@@ -33,6 +45,78 @@ class Hasher:
         """
         return bcrypt.checkpw(plain_password.encode("utf-8"), hashed_password.encode("utf-8"))
 
+class HashingBusy(Exception):
+    """Raised when the hashing pool already has HASH_MAX_PENDING hashes in flight."""
+
+
+class HashingPool:
+    """Bounded thread pool for bcrypt (which releases the GIL while hashing)."""
+
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+        self.total_work = 0.0
+
+    def _run(self, fn, args, submitted_at: float):
+        started_at = time.perf_counter()
+        with self._lock:
+            self.running += 1
+        try:
+            return fn(*args)
+        finally:
+            finished_at = time.perf_counter()
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+                self.total_wait += started_at - submitted_at
+                self.total_work += finished_at - started_at
+
+    async def submit(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.max_pending:
+                self.rejected += 1
+                raise HashingBusy("Too many password operations in progress, please retry shortly.")
+            self.in_flight += 1
+        future = self._executor.submit(self._run, fn, args, time.perf_counter())
+        #  Fires when the job finishes, or when it is cancelled before starting (client went away)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future):
+        with self._lock:
+            self.in_flight -= 1
+
+    async def hash_password(self, password: str) -> str:
+        return await self.submit(Hasher.hash_password, password)
+
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.submit(Hasher.verify_password, plain_password, hashed_password)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            completed = max(self.completed, 1)
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self.in_flight,
+                "running": self.running,
+                "queue_depth": self.in_flight - self.running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.total_wait / completed * 1000, 2),
+                "avg_hash_ms": round(self.total_work / completed * 1000, 2),
+            }
+
+#  Shared pool used by the auth routes
+hashing_pool = HashingPool()
+
 #  Testing Hashing Functionality
 if __name__ == "__main__":
     test_password = "securepassword123"
@@ -8,13 +8,19 @@ It:
 - Generates a secure access token with an expiry time
 - Decodes and verifies tokens for protected route access
 - Provides a get_current_user dependency to protect private API endpoints
+- Caches resolved users per token subject (bounded LRU with a TTL), invalidated when a
+  profile is updated or an account deleted
 """
 
+import os
+import time
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt  
-from .database import get_db_connection
+from .repositories import users
 
 #  Secret key and algorithm for JWT
 SECRET_KEY = "your_secret_key_here"  
@@ -24,6 +30,48 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60
 #  OAuth2 scheme for extracting token from Authorization header
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
+#  Resolved-user cache settings (per worker process; the TTL bounds staleness across workers)
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 1024))
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 60))
+
+class UserCache:
+    """Bounded LRU of username -> user dict, with entries expiring after ttl seconds."""
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, username: str):
+        with self._lock:
+            entry = self._entries.get(username)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[username]
+                return None
+            self._entries.move_to_end(username)
+            return dict(user)
+
+    def put(self, username: str, user: dict):
+        with self._lock:
+            self._entries[username] = (time.monotonic() + self.ttl, dict(user))
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, username: str):
+        with self._lock:
+            self._entries.pop(username, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+user_cache = UserCache()
+
 def create_access_token(data: dict):
     """Generates a JWT access token with expiration"""
     to_encode = data.copy()
@@ -42,8 +90,8 @@ def verify_token(token: str):
     except jwt.JWTError:
         return None
 
-def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Validates JWT token and returns current user data from the DB"""
+async def get_current_user(token: str = Depends(oauth2_scheme)):
+    """Validates JWT token and returns current user data (from the user cache, else the DB)"""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username = payload.get("sub")
@@ -52,19 +100,21 @@ def get_current_user(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+    cached = user_cache.get(username)
+    if cached is not None:
+        return cached
+
     #  Fetch user from DB by username
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
-    user = cursor.fetchone()
-    conn.close()
+    user = await users.find_identity(username)
 
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
-    
-    return {
+
+    current_user = {
         "id": user[0],
         "username": user[1],
         "email": user[2],
-        "role": user[4]
-    }
\ No newline at end of file
+        "role": user[3]
+    }
+    user_cache.put(username, current_user)
+    return current_user
@@ -0,0 +1,204 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-05-02
+Description:
+This module maintains per-build rating aggregates in the build_rating_stats table.
+Features:
+- One row per rated build: rating_count, rating_sum, rating_sum_sq and last_rated, so the mean
+  and variance of a build's ratings are an O(1) primary-key read
+- apply_rating_deltas updates the rows inside the caller's transaction (rating inserts,
+  updates and account deletions in auth/repositories.py)
+- rebuild_rating_stats recomputes the table from ratings (backfill on first run, or repair)
+- check_rating_stats compares the table with a GROUP BY over ratings; RatingStatsChecker runs
+  it periodically in the background and repairs any drift (e.g. from seeding scripts that
+  write to ratings directly)
+"""
+
+import os
+import math
+import sqlite3
+import threading
+
+#  Seconds between background consistency checks
+RATING_STATS_CHECK_SECONDS = int(os.environ.get("RATING_STATS_CHECK_SECONDS", 60 * 60))
+
+#  Aggregates compared with this tolerance (sums of REAL ratings)
+STATS_TOLERANCE = 1e-6
+
+#  last_rated only moves forward here; deletions pass NULL and recompute it (RECOMPUTE_LAST_RATED_SQL)
+APPLY_DELTA_SQL = '''
+    INSERT INTO build_rating_stats (build_id, rating_count, rating_sum, rating_sum_sq, last_rated)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(build_id) DO UPDATE SET
+        rating_count = rating_count + excluded.rating_count,
+        rating_sum = rating_sum + excluded.rating_sum,
+        rating_sum_sq = rating_sum_sq + excluded.rating_sum_sq,
+        last_rated = COALESCE(MAX(last_rated, excluded.last_rated), last_rated, excluded.last_rated)
+'''
+
+AGGREGATE_SQL = '''
+    SELECT build_id, COUNT(*), SUM(rating), SUM(rating * rating), MAX(timestamp)
+    FROM ratings
+    GROUP BY build_id
+'''
+
+#  One build's aggregate (no row when it has no ratings); an index range scan on idx_ratings_build
+BUILD_AGGREGATE_SQL = '''
+    SELECT build_id, COUNT(*), SUM(rating), SUM(rating * rating), MAX(timestamp)
+    FROM ratings
+    WHERE build_id = ?
+    GROUP BY build_id
+'''
+
+RECOMPUTE_LAST_RATED_SQL = '''
+    UPDATE build_rating_stats
+    SET last_rated = (SELECT MAX(timestamp) FROM ratings WHERE ratings.build_id = build_rating_stats.build_id)
+    WHERE build_id = ?
+'''
+
+
+def create_rating_stats_table(conn: sqlite3.Connection):
+    """Creates build_rating_stats and backfills it from ratings the first time."""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'build_rating_stats'"
+    ).fetchone()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS build_rating_stats (
+            build_id TEXT PRIMARY KEY,
+            rating_count INTEGER NOT NULL DEFAULT 0,
+            rating_sum REAL NOT NULL DEFAULT 0,
+            rating_sum_sq REAL NOT NULL DEFAULT 0,
+            last_rated DATETIME
+        )
+    ''')
+    if not exists:
+        rebuild_rating_stats(conn)
+
+
+def rating_deltas(new_ratings: dict, previous: dict, timestamp: str) -> list:
+    """APPLY_DELTA_SQL rows for upserted {build_id: rating} given the ratings they replaced."""
+    deltas = []
+    for build_id, rating in new_ratings.items():
+        old = previous.get(build_id)
+        if old is None:
+            deltas.append((build_id, 1, rating, rating * rating, timestamp))
+        else:
+            deltas.append((build_id, 0, rating - old, rating * rating - old * old, timestamp))
+    return deltas
+
+
+def removal_deltas(removed_ratings) -> list:
+    """APPLY_DELTA_SQL rows for deleted (build_id, rating) pairs."""
+    deltas = {}
+    for build_id, rating in removed_ratings:
+        count, total, total_sq = deltas.get(build_id, (0, 0.0, 0.0))
+        deltas[build_id] = (count - 1, total - rating, total_sq - rating * rating)
+    return [(build_id, count, total, total_sq, None) for build_id, (count, total, total_sq) in deltas.items()]
+
+
+def apply_rating_deltas(conn: sqlite3.Connection, deltas: list):
+    """Applies deltas in the caller's transaction; rows that drop to zero ratings are removed."""
+    if not deltas:
+        return
+    conn.executemany(APPLY_DELTA_SQL, deltas)
+    removed_from = [(delta[0],) for delta in deltas if delta[1] < 0]
+    if removed_from:
+        #  The deleted rating may have been the latest one
+        conn.executemany(RECOMPUTE_LAST_RATED_SQL, removed_from)
+        conn.execute("DELETE FROM build_rating_stats WHERE rating_count <= 0")
+
+
+def rebuild_rating_stats(conn: sqlite3.Connection):
+    """Recomputes every row from the ratings table (caller commits)."""
+    conn.execute("DELETE FROM build_rating_stats")
+    conn.execute(f'''
+        INSERT INTO build_rating_stats (build_id, rating_count, rating_sum, rating_sum_sq, last_rated)
+        {AGGREGATE_SQL}
+    ''')
+
+
+def _differs(stored, expected) -> bool:
+    if stored[0] != expected[0] or stored[3] != expected[3]:
+        return True
+    return any(not math.isclose(a or 0.0, b or 0.0, abs_tol=STATS_TOLERANCE) for a, b in zip(stored[1:3], expected[1:3]))
+
+
+def check_rating_stats(conn: sqlite3.Connection, repair: bool = True) -> list:
+    """
+    Compares build_rating_stats with a fresh aggregate over ratings and returns the build IDs
+    whose count/sum/sum of squares/last_rated disagree; with repair, those rows are rewritten.
+    """
+    #  Both sides from one read snapshot, so concurrent ratings don't show up as drift
+    conn.execute("BEGIN")
+    expected = {row[0]: row[1:] for row in conn.execute(AGGREGATE_SQL)}
+    stored = {row[0]: row[1:] for row in conn.execute(
+        "SELECT build_id, rating_count, rating_sum, rating_sum_sq, last_rated FROM build_rating_stats"
+    )}
+    conn.commit()
+    mismatched = [build_id for build_id in expected.keys() | stored.keys()
+                  if build_id not in expected or build_id not in stored
+                  or _differs(stored[build_id], expected[build_id])]
+
+    if mismatched and repair:
+        #  Rows are recomputed from ratings under the write lock, not copied from the snapshot
+        conn.execute("BEGIN IMMEDIATE")
+        params = [(build_id,) for build_id in mismatched]
+        conn.executemany("DELETE FROM build_rating_stats WHERE build_id = ?", params)
+        conn.executemany(f'''
+            INSERT INTO build_rating_stats (build_id, rating_count, rating_sum, rating_sum_sq, last_rated)
+            {BUILD_AGGREGATE_SQL}
+        ''', params)
+        conn.commit()
+    return sorted(mismatched)
+
+
+def summarize(row) -> dict:
+    """API view of a (rating_count, rating_sum, rating_sum_sq, last_rated) row."""
+    count, total, total_sq, last_rated = row
+    mean = total / count
+    return {
+        "count": count,
+        "mean": round(mean, 4),
+        "variance": round(max(total_sq / count - mean * mean, 0.0), 4),
+        "last_rated": last_rated,
+    }
+
+
+class RatingStatsChecker:
+    """Background thread that periodically checks (and repairs) build_rating_stats."""
+
+    def __init__(self, check_seconds: int = RATING_STATS_CHECK_SECONDS):
+        self.check_seconds = check_seconds
+        self.last_mismatches = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="rating-stats-checker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run_once(self) -> list:
+        from .database import db_connection
+
+        with db_connection() as conn:
+            mismatched = check_rating_stats(conn, repair=True)
+        self.last_mismatches = len(mismatched)
+        if mismatched:
+            print(f" Repaired rating stats for {len(mismatched)} build(s): {mismatched[:5]}")
+        return mismatched
+
+    def _run(self):
+        while not self._stop.wait(self.check_seconds):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f" Rating stats check error: {e}")
+
+
+#  Shared instance started by main.py
+rating_stats_checker = RatingStatsChecker()
@@ -0,0 +1,176 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-05-02
+Description:
+This module is the async data-access layer for the auth router.
+Features:
+- UserRepository, RatingRepository and SavedBuildRepository wrap every SQL statement the
+  auth routes and get_current_user need
+- All methods are awaitable and run on the dedicated DB threads of auth/database.AsyncDatabase,
+  so async routes never block the event loop or the shared request threadpool
+- Multi-statement operations (rating upserts, account deletion) run in a single transaction,
+  which also applies the matching deltas to build_rating_stats (auth/rating_stats.py)
+- Rating timestamps are taken under the write lock and always move forward, so (timestamp, id)
+  is a monotonic change cursor for the incremental export and training jobs
+"""
+
+import json
+from datetime import datetime, timedelta
+from typing import Optional
+
+from .database import async_db
+from .rating_stats import apply_rating_deltas, rating_deltas, removal_deltas, summarize
+
+#  Insert or replace a user's rating in one statement (unique index on user_id, build_id)
+UPSERT_RATING_SQL = '''
+    INSERT INTO ratings (user_id, build_id, rating, timestamp)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(user_id, build_id) DO UPDATE SET rating = excluded.rating, timestamp = excluded.timestamp
+'''
+
+#  Build IDs per "IN (...)" lookup (below SQLite's bound-parameter limit)
+RATING_LOOKUP_CHUNK = 500
+
+
+def _next_rating_timestamp(conn) -> str:
+    """
+    Timestamp for a rating write transaction (call after BEGIN IMMEDIATE): now, or just after the
+    newest rating if the clock hasn't moved past it, so a later commit never reuses an earlier timestamp.
+    """
+    now = datetime.utcnow()
+    latest = conn.execute("SELECT MAX(timestamp) FROM ratings").fetchone()[0]
+    if latest and now <= datetime.fromisoformat(latest):
+        now = datetime.fromisoformat(latest) + timedelta(microseconds=1)
+    return now.isoformat(timespec="microseconds")
+
+
+class UserRepository:
+    async def find_identity(self, username: str):
+        """(id, username, email, role) or None."""
+        return await async_db.fetchone("SELECT id, username, email, role FROM users WHERE username = ?", (username,))
+
+    async def find_login(self, username: str):
+        """(username, hashed_password) or None."""
+        return await async_db.fetchone("SELECT username, hashed_password FROM users WHERE username = ?", (username,))
+
+    async def find_password_hash(self, user_id: int) -> str:
+        row = await async_db.fetchone("SELECT hashed_password FROM users WHERE id = ?", (user_id,))
+        return row[0]
+
+    async def exists(self, username: str, email: str) -> bool:
+        row = await async_db.fetchone("SELECT id FROM users WHERE username = ? OR email = ?", (username, email))
+        return row is not None
+
+    async def find_profile_conflict(self, user_id: int, username: Optional[str], email: Optional[str]) -> Optional[str]:
+        """Error message if another user already has the new username or email."""
+        def find(conn):
+            if username and conn.execute(
+                "SELECT id FROM users WHERE username = ? AND id != ?", (username, user_id)
+            ).fetchone():
+                return "Username already taken by another user."
+            if email and conn.execute(
+                "SELECT id FROM users WHERE email = ? AND id != ?", (email, user_id)
+            ).fetchone():
+                return "Email already registered by another user."
+            return None
+        return await async_db.run(find)
+
+    async def create(self, username: str, email: str, hashed_password: str, role: str) -> int:
+        cursor = await async_db.execute(
+            "INSERT INTO users (username, email, hashed_password, role) VALUES (?, ?, ?, ?)",
+            (username, email, hashed_password, role)
+        )
+        return cursor.lastrowid
+
+    async def update(self, user_id: int, fields: dict):
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        await async_db.execute(f"UPDATE users SET {assignments} WHERE id = ?", (*fields.values(), user_id))
+
+    async def delete(self, user_id: int) -> list:
+        """Deletes the user with their ratings and saved builds; returns the removed (build_id, rating) pairs."""
+        def delete(conn):
+            conn.execute("BEGIN IMMEDIATE")
+            removed_ratings = conn.execute("SELECT build_id, rating FROM ratings WHERE user_id = ?", (user_id,)).fetchall()
+            conn.execute("DELETE FROM ratings WHERE user_id = ?", (user_id,))
+            apply_rating_deltas(conn, removal_deltas(removed_ratings))
+            conn.execute("DELETE FROM saved_builds WHERE user_id = ?", (user_id,))
+            conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            conn.commit()
+            return removed_ratings
+        return await async_db.run(delete)
+
+
+class RatingRepository:
+    async def upsert(self, user_id: int, ratings: dict) -> dict:
+        """
+        Upserts {build_id: rating} for one user in a single write transaction (which also updates
+        build_rating_stats) and returns the ratings they replaced ({build_id: previous_rating}).
+        """
+        def upsert(conn):
+            build_ids = list(ratings)
+            conn.execute("BEGIN IMMEDIATE")
+            timestamp = _next_rating_timestamp(conn)
+            previous = {}
+            for start in range(0, len(build_ids), RATING_LOOKUP_CHUNK):
+                chunk = build_ids[start:start + RATING_LOOKUP_CHUNK]
+                placeholders = ", ".join("?" * len(chunk))
+                previous.update(conn.execute(
+                    f"SELECT build_id, rating FROM ratings WHERE user_id = ? AND build_id IN ({placeholders})",
+                    (user_id, *chunk)
+                ).fetchall())
+            conn.executemany(UPSERT_RATING_SQL, [(user_id, build_id, rating, timestamp)
+                                                 for build_id, rating in ratings.items()])
+            apply_rating_deltas(conn, rating_deltas(ratings, previous, timestamp))
+            conn.commit()
+            return previous
+        return await async_db.run(upsert)
+
+    async def stats(self, build_id: str) -> Optional[dict]:
+        """count/mean/variance/last_rated for a build from build_rating_stats, or None if unrated."""
+        row = await async_db.fetchone(
+            "SELECT rating_count, rating_sum, rating_sum_sq, last_rated FROM build_rating_stats WHERE build_id = ?",
+            (build_id,)
+        )
+        return summarize(row) if row else None
+
+    async def for_user(self, user_id: int) -> list:
+        """(build_id, rating, comment, timestamp) rows, newest first."""
+        return await async_db.fetchall('''
+            SELECT build_id, rating, comment, timestamp
+            FROM ratings
+            WHERE user_id = ?
+            ORDER BY timestamp DESC
+        ''', (user_id,))
+
+
+class SavedBuildRepository:
+    async def add(self, user_id: int, build: dict):
+        await async_db.execute(
+            "INSERT INTO saved_builds (user_id, build_id, payload) VALUES (?, ?, ?)",
+            (user_id, build.get("build_id"), json.dumps(build))
+        )
+
+    async def all_for_user(self, user_id: int) -> list:
+        rows = await async_db.fetchall("SELECT payload FROM saved_builds WHERE user_id = ? ORDER BY id", (user_id,))
+        return [json.loads(row[0]) for row in rows]
+
+    async def page(self, user_id: int, cursor: Optional[int], limit: int):
+        """(builds, next_cursor) for the page after cursor (a saved_builds id), in save order."""
+        rows = await async_db.fetchall(
+            "SELECT id, payload FROM saved_builds WHERE user_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (user_id, cursor or 0, limit + 1)
+        )
+        page = rows[:limit]
+        next_cursor = page[-1][0] if len(rows) > limit else None
+        return [json.loads(payload) for _, payload in page], next_cursor
+
+    async def delete(self, user_id: int, build_id: str) -> int:
+        cursor = await async_db.execute("DELETE FROM saved_builds WHERE user_id = ? AND build_id = ?", (user_id, build_id))
+        return cursor.rowcount
+
+
+#  Shared repositories
+users = UserRepository()
+ratings = RatingRepository()
+saved_builds = SavedBuildRepository()
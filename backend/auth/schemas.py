@@ -8,7 +8,7 @@ user-related data in the authentication system.
 """
 
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 
 #  Base User schema (shared fields)
 class UserBase(BaseModel):
@@ -29,7 +29,7 @@ class UserLogin(BaseModel):
 class UserResponse(UserBase):
     id: int
     role: str
-    saved_builds: Optional[Dict[str, Any]] = None  # Optional field for saved builds
+    saved_builds: Optional[List[Dict[str, Any]]] = None  # Optional field for saved builds
 
     class Config:
         orm_mode = True
@@ -39,6 +39,10 @@ class BuildRating(BaseModel):
     build_id: str
     rating: int = Field(..., ge=1, le=5, description="Rating from 1 to 5")
     comment: Optional[str] = None
+
+#  Request schema for submitting many build ratings at once
+class BuildRatingBatch(BaseModel):
+    ratings: List[BuildRating] = Field(..., min_length=1, max_length=1000)
     
 
 #  Request schema for updating user profile
@@ -6,18 +6,56 @@ Description:
 This script initializes the FastAPI backend for the PC Component Recommendation System.
 It:
 - Sets up CORS middleware for frontend communication.
-- Includes API routes for recommendations and authentication.
+- Includes API routes for recommendations, similar builds, component compatibility scoring and authentication.
+- Starts loading the TFRS model in the background and exposes health/readiness probes
+  and password-hashing pool metrics.
+- Starts the background retraining scheduler and hot-swaps retrained models.
+- Starts the periodic build_rating_stats consistency check.
 - Runs the FastAPI server.
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from api.hybrid import hybrid_router 
+from api.compatibility import compatibility_router
+from api.builds import builds_router
 from auth.auth import auth_router  
+from auth.database import init_db
+from auth.hashing import hashing_pool
+from auth.rating_stats import rating_stats_checker
+from recommender.model_manager import model_manager
+from recommender.compatibility_scorer import compatibility_scorer
+from recommender.similar_builds import similar_builds
+from models.retrain_scheduler import RetrainScheduler
+
+retrain_scheduler = RetrainScheduler()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    #  Create missing tables/indexes and run pending migrations (e.g. saved builds)
+    init_db()
+    #  Load (or train) the TFRS model without delaying port binding
+    model_manager.start()
+    #  Pick up models published by the retrain scheduler (from any worker)
+    model_manager.watch_for_updates()
+    #  Encode the component catalog once so compatibility queries only run the L1 head
+    compatibility_scorer.start()
+    #  Precompute (or incrementally refresh) the "more like this" neighbour lists
+    similar_builds.start()
+    retrain_scheduler.start()
+    #  Repair any drift between build_rating_stats and the raw ratings table
+    rating_stats_checker.start()
+    yield
+    rating_stats_checker.stop()
+    retrain_scheduler.stop()
+
 app = FastAPI(
     title="PC Component Recommendation API",
     description="A machine learning-enhanced system for recommending PC components.",
-    version="1.0"
+    version="1.0",
+    lifespan=lifespan
 )
 
 #  Enable CORS (Adjust frontend URLs in future config.py)
@@ -31,6 +69,8 @@ app.add_middleware(
 
 #  Include API routes
 app.include_router(hybrid_router, prefix="/api")
+app.include_router(compatibility_router, prefix="/api")
+app.include_router(builds_router, prefix="/api")
 app.include_router(auth_router, prefix="/auth")  
 
 @app.get("/")
@@ -40,6 +80,29 @@ def root():
     """
     return {"message": "Welcome to the PC Component Recommendation API"}
 
+@app.get("/health/live")
+def liveness():
+    """
+    Liveness probe: the process is up and serving requests.
+    """
+    return {"status": "ok"}
+
+@app.get("/health/ready")
+def readiness():
+    """
+    Readiness probe: 200 once the TFRS model is loaded, 503 while it is loading or training.
+    Content-based recommendations are served either way.
+    """
+    status = model_manager.get_status()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
+
+@app.get("/health/hashing")
+def hashing_metrics():
+    """
+    Password-hashing pool metrics: in-flight and queued bcrypt jobs, rejections (429s) and timings.
+    """
+    return hashing_pool.metrics()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=False)
\ No newline at end of file
@@ -0,0 +1,85 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-30
+Description:
+This script distills the full Siamese compatibility network into a small student for CPU serving.
+Features:
+- Uses the full model (NumPy artifact) as the teacher and scores every training pair on the fly
+- Trains a narrow student encoder on a blend of the rule labels and the teacher's probabilities
+  (binary cross-entropy is linear in the target, so this equals a weighted hard + soft loss)
+- Streams training pairs from siamese_pairs (train split only; the test split stays held out
+  for models/siamese_benchmark.py)
+- Saves the student (.keras), its NumPy artifact and an int8 copy for serving
+"""
+
+import os
+import sys
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from models.siamese_pairs import PAIR_SAMPLE_SIZE, load_component_dataframes, build_pair_plans, iter_pair_batches
+from models.export_siamese_numpy import (
+    SIAMESE_ARTIFACT_PATH, build_siamese_network, export_siamese_artifact, export_quantized_siamese_artifact
+)
+from recommender.compatibility_scorer import SiameseEncoder
+
+#  Paths
+DATA_DIR = os.path.join(BACKEND_DIR, "data")
+STUDENT_MODEL_PATH = os.path.join(BACKEND_DIR, "models", "student_siamese_network_model.keras")
+
+#  Student settings
+STUDENT_UNITS = (32, 16)
+HARD_LABEL_WEIGHT = 0.5
+DISTILL_EPOCHS = 3
+DISTILL_BATCH_SIZE = 256
+
+
+def make_distillation_dataset(plans, teacher: SiameseEncoder, batch_size: int = DISTILL_BATCH_SIZE,
+                              hard_weight: float = HARD_LABEL_WEIGHT):
+    """tf.data source of ((a, b), blended target) over the training split."""
+    import tensorflow as tf
+
+    n_features = teacher.input_dim
+    epoch = {"count": 0}
+
+    def generator():
+        epoch["count"] += 1
+        for (features_a, features_b), labels in iter_pair_batches(plans, batch_size, split="train",
+                                                                  seed=42 + epoch["count"]):
+            soft = teacher.score_pairs(teacher.encode(features_a), teacher.encode(features_b))
+            yield (features_a, features_b), hard_weight * labels + (1.0 - hard_weight) * soft.astype("float32")
+
+    return tf.data.Dataset.from_generator(generator, output_signature=(
+        (tf.TensorSpec(shape=(None, n_features), dtype=tf.float32),
+         tf.TensorSpec(shape=(None, n_features), dtype=tf.float32)),
+        tf.TensorSpec(shape=(None,), dtype=tf.float32),
+    )).prefetch(tf.data.AUTOTUNE)
+
+
+def distill(teacher_path: str = SIAMESE_ARTIFACT_PATH, student_path: str = STUDENT_MODEL_PATH,
+            units=STUDENT_UNITS, epochs: int = DISTILL_EPOCHS, sample_size: int = PAIR_SAMPLE_SIZE):
+    from tensorflow.keras.optimizers import Adam
+
+    teacher = SiameseEncoder.load(teacher_path)
+    plans = build_pair_plans(load_component_dataframes(DATA_DIR), sample_size=sample_size)
+
+    student = build_siamese_network(teacher.input_dim, units)
+    student.compile(loss="binary_crossentropy", optimizer=Adam(learning_rate=0.001))
+    print(f" Distilling {teacher_path} into a {list(units)} student...")
+    student.fit(make_distillation_dataset(plans, teacher), epochs=epochs)
+
+    student.save(student_path)
+    print(f" Student model saved at {student_path}")
+    artifact_path = os.path.splitext(student_path)[0] + ".npz"
+    export_siamese_artifact(student, artifact_path)
+    export_quantized_siamese_artifact(artifact_path)
+    return student
+
+
+#  CLI usage
+if __name__ == "__main__":
+    distill()
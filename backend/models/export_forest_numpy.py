@@ -0,0 +1,93 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-05-01
+Description:
+This script compiles the sklearn RandomForest build scorer into flat NumPy arrays for recommender/forest_scorer.py.
+Features:
+- Concatenates every tree's nodes into single feature / threshold / left / right / value arrays,
+  with child indices rewritten to global node positions and one root index per tree
+- Leaves point at themselves with an infinite threshold, so every tree can be walked the same
+  number of steps (the forest's max depth) without branching on "is this a leaf"
+- Bundles the MinMaxScaler (models/scaler.pkl) and the feature names, so serving takes raw prices/scores
+- Writes everything to a single .npz file (atomically) and checks it reproduces model.predict
+"""
+
+import os
+import sys
+import joblib
+import numpy as np
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from models.export_tfrs_numpy import save_artifact
+
+FOREST_MODEL_PATH = os.path.join(BACKEND_DIR, "models", "sklearn_recommendation_model.pkl")
+FOREST_SCALER_PATH = os.path.join(BACKEND_DIR, "models", "scaler.pkl")
+FOREST_ARTIFACT_PATH = os.path.join(BACKEND_DIR, "models", "sklearn_recommendation_model.npz")
+
+
+def compile_forest(model) -> dict:
+    """Flattens a fitted RandomForestRegressor (single output) into global node arrays."""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        thresholds.append(np.where(is_leaf, np.inf, tree.threshold).astype(np.float64))
+        lefts.append((np.where(is_leaf, nodes, tree.children_left) + offset).astype(np.int32))
+        rights.append((np.where(is_leaf, nodes, tree.children_right) + offset).astype(np.int32))
+        values.append(tree.value[:, 0, 0].astype(np.float64))
+        roots.append(offset)
+        offset += tree.node_count
+
+    return {
+        "node_feature": np.concatenate(features),
+        "node_threshold": np.concatenate(thresholds),
+        "node_left": np.concatenate(lefts),
+        "node_right": np.concatenate(rights),
+        "node_value": np.concatenate(values),
+        "tree_roots": np.array(roots, dtype=np.int32),
+        "max_depth": np.int32(max(estimator.tree_.max_depth for estimator in model.estimators_)),
+    }
+
+
+def extract_scaler(scaler) -> dict:
+    """MinMaxScaler as scaled = raw * scale + min, with the column order it was fitted on."""
+    return {
+        "feature_names": np.asarray(scaler.feature_names_in_).astype(str),
+        "scaler_scale": np.asarray(scaler.scale_, dtype=np.float64),
+        "scaler_min": np.asarray(scaler.min_, dtype=np.float64),
+    }
+
+
+def export_forest_artifact(model, scaler, artifact_path: str = FOREST_ARTIFACT_PATH):
+    save_artifact({**compile_forest(model), **extract_scaler(scaler)}, artifact_path)
+    print(f" Forest NumPy artifact saved to: {artifact_path}")
+
+
+def check_equivalence(model, artifact_path: str = FOREST_ARTIFACT_PATH, atol: float = 1e-9) -> float:
+    """Predicts random scaled rows with sklearn and with the flattened forest; returns the max difference."""
+    from recommender.forest_scorer import ForestBuildScorer
+
+    scorer = ForestBuildScorer.load(artifact_path)
+    rows = np.random.default_rng(0).random((2048, model.n_features_in_))
+    sklearn_scores = model.predict(rows)
+    numpy_scores = scorer.predict_scaled(rows)
+    max_diff = float(np.max(np.abs(sklearn_scores - numpy_scores)))
+    print(f" Max |sklearn - NumPy| forest prediction difference: {max_diff:.2e}")
+    if max_diff > atol:
+        raise ValueError(f" Forest artifact does not match the sklearn model (max difference {max_diff})")
+    return max_diff
+
+
+#  CLI usage: python models/export_forest_numpy.py
+if __name__ == "__main__":
+    forest_model = joblib.load(FOREST_MODEL_PATH)
+    export_forest_artifact(forest_model, joblib.load(FOREST_SCALER_PATH), FOREST_ARTIFACT_PATH)
+    check_equivalence(forest_model, FOREST_ARTIFACT_PATH)
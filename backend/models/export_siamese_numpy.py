@@ -0,0 +1,130 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-30
+Description:
+This script exports a trained Siamese compatibility network to a TensorFlow-free NumPy artifact.
+Features:
+- Rebuilds the Siamese architecture from the saved config and loads its weights
+  (the saved Lambda layer can't be unmarshalled across Python versions, so the model isn't deserialized)
+- Extracts the shared encoder's dense kernels/biases and the L1-distance head
+- Writes everything to a single .npz file (atomically) for recommender/compatibility_scorer.py
+- Checks that the NumPy encoder + head reproduce the Keras predictions
+- Optionally writes an int8 copy (per-unit kernel scales) for CPU serving (--quantize)
+"""
+
+import os
+import sys
+import json
+import zipfile
+import numpy as np
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from models.export_tfrs_numpy import save_artifact
+
+SIAMESE_MODEL_PATH = os.path.join(BACKEND_DIR, "models", "full_siamese_network_model.keras")
+SIAMESE_ARTIFACT_PATH = os.path.join(BACKEND_DIR, "models", "full_siamese_network_model.npz")
+
+
+def read_architecture(model_path: str):
+    """Returns (input_dim, encoder_units) from the .keras config."""
+    with zipfile.ZipFile(model_path) as archive:
+        config = json.loads(archive.read("config.json"))
+    layers = config["config"]["layers"]
+    input_dim = next(l for l in layers if l["class_name"] == "InputLayer")["config"]["batch_shape"][-1]
+    encoder = next(l for l in layers if l["class_name"] == "Sequential")
+    units = [l["config"]["units"] for l in encoder["config"]["layers"] if l["class_name"] == "Dense"]
+    return input_dim, units
+
+
+def build_siamese_network(input_dim: int, encoder_units):
+    """Same graph as train_siamese_network.build_siamese_network, with configurable encoder widths."""
+    import tensorflow as tf
+    from tensorflow.keras.layers import Input, Dense, Lambda
+    from tensorflow.keras.models import Model
+
+    input_a, input_b = Input(shape=(input_dim,)), Input(shape=(input_dim,))
+    shared_network = tf.keras.Sequential([Dense(units, activation="relu") for units in encoder_units])
+    encoded_a, encoded_b = shared_network(input_a), shared_network(input_b)
+    L1_distance = Lambda(lambda tensors: tf.abs(tensors[0] - tensors[1]))([encoded_a, encoded_b])
+    output_layer = Dense(1, activation="sigmoid")(L1_distance)
+    return Model(inputs=[input_a, input_b], outputs=output_layer)
+
+
+def load_siamese_model(model_path: str = SIAMESE_MODEL_PATH):
+    model = build_siamese_network(*read_architecture(model_path))
+    model.load_weights(model_path)
+    return model
+
+
+def extract_siamese_weights(model) -> dict:
+    """Encoder layers as encoder_kernel_<i>/encoder_bias_<i>, plus the head's kernel and bias."""
+    encoder = next(layer for layer in model.layers if hasattr(layer, "layers"))
+    head = model.layers[-1]
+    arrays = {}
+    for i, layer in enumerate(encoder.layers):
+        arrays[f"encoder_kernel_{i}"], arrays[f"encoder_bias_{i}"] = layer.get_weights()
+    arrays["head_kernel"], arrays["head_bias"] = head.get_weights()
+    return arrays
+
+
+def export_siamese_artifact(model, artifact_path: str = SIAMESE_ARTIFACT_PATH):
+    save_artifact(extract_siamese_weights(model), artifact_path)
+    print(f" Siamese NumPy artifact saved to: {artifact_path}")
+
+
+def quantize_siamese_weights(arrays: dict) -> dict:
+    """
+    int8 copy of the encoder kernels with one float32 scale per output unit (max |w| / 127)
+    in "encoder_kernel_<i>_scales"; biases and the (tiny) head stay float32.
+    """
+    quantized = dict(arrays)
+    for name in [key for key in arrays if key.startswith("encoder_kernel_")]:
+        kernel = arrays[name].astype(np.float32)
+        scales = np.abs(kernel).max(axis=0) / 127.0
+        scales[scales == 0] = 1.0
+        quantized[name] = np.round(kernel / scales[None, :]).astype(np.int8)
+        quantized[f"{name}_scales"] = scales.astype(np.float32)
+    return quantized
+
+
+def export_quantized_siamese_artifact(artifact_path: str) -> str:
+    """Writes <artifact>.int8.npz next to a float32 Siamese artifact and returns its path."""
+    with np.load(artifact_path) as data:
+        arrays = {key: data[key] for key in data.files}
+    output_path = os.path.splitext(artifact_path)[0] + ".int8.npz"
+    save_artifact(quantize_siamese_weights(arrays), output_path)
+    print(f" int8 Siamese artifact saved to: {output_path}")
+    return output_path
+
+
+def check_equivalence(model, artifact_path: str = SIAMESE_ARTIFACT_PATH, atol: float = 1e-5) -> float:
+    """Scores random pairs with Keras and with the NumPy head; returns the max difference."""
+    from recommender.compatibility_scorer import SiameseEncoder
+
+    encoder = SiameseEncoder.load(artifact_path)
+    rng = np.random.default_rng(0)
+    a, b = rng.random((256, encoder.input_dim), dtype=np.float32), rng.random((256, encoder.input_dim), dtype=np.float32)
+    keras_scores = model.predict([a, b], verbose=0)[:, 0]
+    numpy_scores = encoder.score_pairs(encoder.encode(a), encoder.encode(b))
+    max_diff = float(np.max(np.abs(keras_scores - numpy_scores)))
+    print(f" Max |Keras - NumPy| compatibility difference: {max_diff:.2e}")
+    if max_diff > atol:
+        raise ValueError(f" Siamese artifact does not match the Keras model (max difference {max_diff})")
+    return max_diff
+
+
+#  CLI usage: python models/export_siamese_numpy.py [model.keras] [artifact.npz] [--quantize]
+if __name__ == "__main__":
+    paths = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    model_path = paths[0] if paths else SIAMESE_MODEL_PATH
+    artifact_path = paths[1] if len(paths) > 1 else os.path.splitext(model_path)[0] + ".npz"
+    siamese_model = load_siamese_model(model_path)
+    export_siamese_artifact(siamese_model, artifact_path)
+    check_equivalence(siamese_model, artifact_path)
+    if "--quantize" in sys.argv:
+        export_quantized_siamese_artifact(artifact_path)
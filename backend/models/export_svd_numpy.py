@@ -0,0 +1,54 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-29
+Description:
+This script exports a trained Surprise SVD model to a NumPy artifact for recommender/svd_ranker.py.
+Features:
+- Maps Surprise's inner user/item indices back to raw user and build IDs
+- Extracts the user/build factor matrices (pu, qi), biases (bu, bi) and the global mean
+- Zeroes the biases and mean for models trained with biased=False, matching SVD.estimate
+- Writes everything to a single .npz file atomically
+"""
+
+import os
+import sys
+import pickle
+import numpy as np
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from models.export_tfrs_numpy import save_artifact
+
+SVD_MODEL_PATH = os.path.join(BACKEND_DIR, "models", "svd_model.pkl")
+SVD_ARTIFACT_PATH = os.path.join(BACKEND_DIR, "models", "svd_model.npz")
+
+
+def extract_svd_factors(model) -> dict:
+    """Collects the arrays SvdBuildRanker needs from a fitted surprise.SVD."""
+    trainset = model.trainset
+    biased = getattr(model, "biased", True)
+    return {
+        "user_vocabulary": np.array([str(trainset.to_raw_uid(i)) for i in range(trainset.n_users)]),
+        "build_vocabulary": np.array([str(trainset.to_raw_iid(i)) for i in range(trainset.n_items)]),
+        "user_factors": np.asarray(model.pu, dtype=np.float32),
+        "build_factors": np.asarray(model.qi, dtype=np.float32),
+        "user_bias": np.asarray(model.bu if biased else np.zeros(trainset.n_users), dtype=np.float32),
+        "build_bias": np.asarray(model.bi if biased else np.zeros(trainset.n_items), dtype=np.float32),
+        "global_mean": np.float32(trainset.global_mean if biased else 0.0),
+    }
+
+
+def export_svd_artifact(model, artifact_path: str = SVD_ARTIFACT_PATH):
+    save_artifact(extract_svd_factors(model), artifact_path)
+    print(f" SVD factor artifact saved to: {artifact_path}")
+
+
+#  CLI usage: export the pickled model written by train_svd_model.py
+if __name__ == "__main__":
+    with open(SVD_MODEL_PATH, "rb") as f:
+        svd_model = pickle.load(f)
+    export_svd_artifact(svd_model, SVD_ARTIFACT_PATH)
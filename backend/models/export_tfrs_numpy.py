@@ -0,0 +1,136 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-26
+Description:
+This script exports a trained TFRS BuildRankingModel to a TensorFlow-free NumPy artifact.
+Features:
+- Extracts the user/build StringLookup vocabularies (or Hashing bucket counts and salts) and embedding tables
+- Extracts the rating MLP's dense kernels and biases
+- Writes everything to a single .npz file (atomically) for recommender/numpy_ranker.py
+- Checks that the NumPy scorer reproduces the TensorFlow predictions
+- Optionally writes a copy with float16 or int8 (per-row scale) embedding tables
+  (--quantize float16|int8), derived from the float32 artifact without TensorFlow
+"""
+
+import os
+import sys
+import numpy as np
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+MODEL_PATH = os.path.join(BACKEND_DIR, "models", "tfrs_model.keras")
+ARTIFACT_PATH = os.path.join(BACKEND_DIR, "models", "tfrs_model.npz")
+EMBEDDING_PRECISIONS = ("float32", "float16", "int8")
+
+
+def extract_weights(model) -> dict:
+    """Collects the arrays the NumPy scorer needs from a BuildRankingModel."""
+    user_lookup, user_embedding = model.user_model.layers
+    build_lookup, build_embedding = model.build_model.layers
+    hidden, output = model.rating_model.layers
+    hidden_kernel, hidden_bias = hidden.get_weights()
+    output_kernel, output_bias = output.get_weights()
+
+    arrays = {
+        "build_vocabulary": np.array([str(v) for v in model.get_candidate_build_ids()]),
+        "user_embeddings": user_embedding.get_weights()[0],
+        "build_embeddings": build_embedding.get_weights()[0],
+        "hidden_kernel": hidden_kernel,
+        "hidden_bias": hidden_bias,
+        "output_kernel": output_kernel,
+        "output_bias": output_bias,
+    }
+
+    #  Hashed tables have no vocabulary; store the bucket count and SipHash key instead
+    if hasattr(user_lookup, "get_vocabulary"):
+        arrays["user_vocabulary"] = np.array([str(v) for v in user_lookup.get_vocabulary()])
+    else:
+        arrays["user_vocabulary"] = np.array([], dtype=str)
+        arrays["user_hash"] = np.array([user_lookup.num_bins, *user_lookup.salt], dtype=np.uint64)
+    if not hasattr(build_lookup, "get_vocabulary"):
+        arrays["build_hash"] = np.array([build_lookup.num_bins, *build_lookup.salt], dtype=np.uint64)
+    return arrays
+
+
+def save_artifact(arrays: dict, artifact_path: str = ARTIFACT_PATH):
+    """Writes the arrays to a temporary file and renames it over the artifact."""
+    tmp_path = artifact_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, artifact_path)
+
+
+def export_numpy_artifact(model, artifact_path: str = ARTIFACT_PATH):
+    """Exports a loaded BuildRankingModel to a NumPy artifact."""
+    save_artifact(extract_weights(model), artifact_path)
+    print(f" NumPy ranking artifact saved to: {artifact_path}")
+
+
+def quantize_embeddings(arrays: dict, precision: str) -> dict:
+    """
+    Returns a copy of the artifact arrays with smaller embedding tables.
+    int8 tables store one float32 scale per row (max |value| / 127) in "<table>_scales".
+    """
+    if precision not in EMBEDDING_PRECISIONS:
+        raise ValueError(f" Unknown embedding precision: {precision}")
+
+    quantized = dict(arrays)
+    for name in ("user_embeddings", "build_embeddings"):
+        table = arrays[name].astype(np.float32)
+        if precision == "float16":
+            quantized[name] = table.astype(np.float16)
+        elif precision == "int8":
+            scales = np.abs(table).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            quantized[name] = np.round(table / scales[:, None]).astype(np.int8)
+            quantized[f"{name}_scales"] = scales.astype(np.float32)
+    return quantized
+
+
+def quantized_artifact_path(artifact_path: str, precision: str) -> str:
+    if precision == "float32":
+        return artifact_path
+    return f"{os.path.splitext(artifact_path)[0]}.{precision}.npz"
+
+
+def export_quantized_artifact(artifact_path: str = ARTIFACT_PATH, precision: str = "int8") -> str:
+    """Writes a quantized copy of a float32 artifact and returns its path."""
+    with np.load(artifact_path) as data:
+        arrays = {key: data[key] for key in data.files}
+    output_path = quantized_artifact_path(artifact_path, precision)
+    save_artifact(quantize_embeddings(arrays, precision), output_path)
+    print(f" {precision} ranking artifact saved to: {output_path}")
+    return output_path
+
+
+def check_equivalence(model, artifact_path: str = ARTIFACT_PATH, atol: float = 1e-4) -> float:
+    """Scores every (user, build) pair with both implementations and returns the max difference."""
+    import tensorflow as tf
+    from recommender.numpy_ranker import NumpyBuildRanker
+
+    ranker = NumpyBuildRanker.load(artifact_path)
+    user_ids = ranker.user_vocabulary if len(ranker.user_vocabulary) else np.array(["1", "2", "guest"])
+    tf_scores, _ = model.recommend(tf.constant(user_ids), k=len(ranker.build_vocabulary))
+    np_scores, _ = ranker.recommend(user_ids, k=len(ranker.build_vocabulary))
+    max_diff = float(np.max(np.abs(tf_scores.numpy() - np_scores)))
+    print(f" Max |TF - NumPy| score difference: {max_diff:.2e}")
+    if max_diff > atol:
+        raise ValueError(f" NumPy artifact does not match the TF model (max difference {max_diff})")
+    return max_diff
+
+
+#  CLI usage: export the current model and verify it
+if __name__ == "__main__":
+    import tensorflow as tf
+    from models.train_tfrs_model import BuildRankingModel
+
+    tfrs_model = tf.keras.models.load_model(MODEL_PATH, custom_objects={"BuildRankingModel": BuildRankingModel})
+    export_numpy_artifact(tfrs_model, ARTIFACT_PATH)
+    check_equivalence(tfrs_model, ARTIFACT_PATH)
+
+    if "--quantize" in sys.argv:
+        export_quantized_artifact(ARTIFACT_PATH, sys.argv[sys.argv.index("--quantize") + 1])
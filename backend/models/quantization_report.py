@@ -0,0 +1,91 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-27
+Description:
+This script compares quantized ranking artifacts against the full-precision (float32) model.
+Features:
+- Builds float16 and int8 (per-row scale) versions of tfrs_model.npz in memory
+- Reports embedding-table size, artifact size on disk and load time for each precision
+- Reports top-k agreement and max score difference against float32 for every known user
+- Reports full-vocabulary scoring latency per batch of users
+"""
+
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from models.export_tfrs_numpy import ARTIFACT_PATH, EMBEDDING_PRECISIONS, quantize_embeddings, save_artifact
+from recommender.numpy_ranker import NumpyBuildRanker
+
+
+def _best_time(fn, repeats=20):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _top_k_agreement(reference_ids, candidate_ids) -> float:
+    """Mean fraction of the reference top-k that also appears in the candidate top-k."""
+    overlaps = [len(set(r) & set(c)) / len(r) for r, c in zip(reference_ids.tolist(), candidate_ids.tolist())]
+    return float(np.mean(overlaps))
+
+
+def build_report(artifact_path: str = ARTIFACT_PATH, k: int = 10, batch_size: int = 64) -> list:
+    with np.load(artifact_path) as data:
+        arrays = {key: data[key] for key in data.files}
+
+    reference = NumpyBuildRanker(**arrays)
+    #  Hashed models have no vocabulary, so score a range of synthetic IDs instead
+    user_ids = reference.user_vocabulary[1:]
+    if len(user_ids) == 0:
+        user_ids = np.array([str(i) for i in range(1, 1001)])
+    batch = user_ids[:batch_size]
+    reference_all = reference.score_all(user_ids)
+    _, reference_ids = reference.recommend(user_ids, k=k)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for precision in EMBEDDING_PRECISIONS:
+            quantized = quantize_embeddings(arrays, precision)
+            path = os.path.join(tmp_dir, f"tfrs_model.{precision}.npz")
+            save_artifact(quantized, path)
+
+            load_time = _best_time(lambda: NumpyBuildRanker.load(path), repeats=5)
+            ranker = NumpyBuildRanker.load(path)
+            _, top_ids = ranker.recommend(user_ids, k=k)
+            scores = ranker.score_all(user_ids)
+
+            rows.append({
+                "precision": precision,
+                "embedding_bytes": sum(quantized[name].nbytes for name in quantized if "embeddings" in name),
+                "artifact_bytes": os.path.getsize(path),
+                "load_ms": load_time * 1000,
+                f"top{k}_agreement": _top_k_agreement(reference_ids, top_ids),
+                "max_score_diff": float(np.max(np.abs(scores - reference_all))),
+                "batch_latency_ms": _best_time(lambda: ranker.recommend(batch, k=k)) * 1000,
+            })
+    return rows
+
+
+def print_report(rows: list):
+    headers = list(rows[0].keys())
+    print(" | ".join(f"{h:>16}" for h in headers))
+    for row in rows:
+        print(" | ".join(f"{v:>16.4f}" if isinstance(v, float) else f"{v:>16}" for v in row.values()))
+
+
+#  CLI usage
+if __name__ == "__main__":
+    print(f"\n Quantization report for {ARTIFACT_PATH}\n")
+    print_report(build_report())
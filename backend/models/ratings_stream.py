@@ -0,0 +1,93 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-29
+Description:
+This module streams user ratings from SQLite into TensorFlow for TFRS training.
+Features:
+- Reads the ratings table in fixed-size chunks using keyset pagination on the primary key
+- Filters rows against an index of valid build IDs (from labeled_builds.csv) as they stream
+- Wraps the reader in a generator-backed tf.data source with a bounded shuffle buffer and prefetch
+- Collects the user/build vocabularies with DISTINCT queries instead of loading the ratings
+Peak memory depends on the chunk size and shuffle buffer, not on the size of the ratings table.
+"""
+
+import sqlite3
+import pandas as pd
+import tensorflow as tf
+
+CHUNK_SIZE = 5_000
+SHUFFLE_BUFFER = 10_000
+BATCH_SIZE = 32
+
+#  Deterministic holdout split (20%) that can be expressed in SQL
+TRAIN_SPLIT = "id % 5 != 0"
+HOLDOUT_SPLIT = "id % 5 = 0"
+
+
+def load_valid_build_ids(labeled_path: str) -> set:
+    """Build-ID index used to drop ratings for builds that are no longer in the catalogue."""
+    return set(pd.read_csv(labeled_path, usecols=["build_id"])["build_id"].astype(str))
+
+
+def iter_ratings(db_path: str, valid_build_ids: set, where: str = None, chunk_size: int = CHUNK_SIZE):
+    """Yields (user_id, build_id, rating) tuples, fetching chunk_size rows at a time."""
+    condition = f" AND ({where})" if where else ""
+    query = f"SELECT id, user_id, build_id, rating FROM ratings WHERE id > ?{condition} ORDER BY id LIMIT ?"
+
+    conn = sqlite3.connect(db_path)
+    try:
+        last_id = -1
+        while True:
+            rows = conn.execute(query, (last_id, chunk_size)).fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            for _, user_id, build_id, rating in rows:
+                if build_id in valid_build_ids and rating is not None:
+                    yield str(user_id), str(build_id), float(rating)
+    finally:
+        conn.close()
+
+
+def make_ratings_dataset_from_db(db_path: str, valid_build_ids: set, where: str = None, shuffle: bool = True,
+                                 batch_size: int = BATCH_SIZE, shuffle_buffer: int = SHUFFLE_BUFFER,
+                                 chunk_size: int = CHUNK_SIZE) -> tf.data.Dataset:
+    """Generator-backed dataset of rating batches; re-reads the database on every epoch."""
+    def generator():
+        for user_id, build_id, rating in iter_ratings(db_path, valid_build_ids, where, chunk_size):
+            yield {"user_id": user_id, "build_id": build_id, "rating": rating}
+
+    dataset = tf.data.Dataset.from_generator(generator, output_signature={
+        "user_id": tf.TensorSpec(shape=(), dtype=tf.string),
+        "build_id": tf.TensorSpec(shape=(), dtype=tf.string),
+        "rating": tf.TensorSpec(shape=(), dtype=tf.float32),
+    })
+    if shuffle:
+        dataset = dataset.shuffle(shuffle_buffer, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).prefetch(tf.data.AUTOTUNE)
+
+
+def distinct_ids(db_path: str, valid_build_ids: set, where: str = None):
+    """Returns (user_ids, build_ids) that appear in the (filtered) ratings."""
+    condition = f" WHERE {where}" if where else ""
+    conn = sqlite3.connect(db_path)
+    try:
+        user_ids = [str(row[0]) for row in conn.execute(f"SELECT DISTINCT user_id FROM ratings{condition}")]
+        build_ids = [str(row[0]) for row in conn.execute(f"SELECT DISTINCT build_id FROM ratings{condition}")
+                     if str(row[0]) in valid_build_ids]
+    finally:
+        conn.close()
+    return user_ids, build_ids
+
+
+def rating_moments(db_path: str, valid_build_ids: set, where: str = None, center: float = 0.0):
+    """Streams (count, mean, mean squared deviation from `center`) of the filtered ratings."""
+    count, total, squared = 0, 0.0, 0.0
+    for _, _, rating in iter_ratings(db_path, valid_build_ids, where):
+        count += 1
+        total += rating
+        squared += (rating - center) ** 2
+    if count == 0:
+        return 0, 0.0, 0.0
+    return count, total / count, squared / count
@@ -0,0 +1,216 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-25
+Description:
+This module retrains the TFRS model in the background as new ratings arrive.
+Features:
+- Checks on a fixed cadence whether the model is older than the retrain interval
+  or whether enough ratings were added/updated since it was trained
+- Runs training in a separate process so API workers never block on TensorFlow training;
+  ratings are streamed from SQLite (models/ratings_stream.py) rather than exported to CSV
+- Validates a candidate trained without a holdout split (ratings with id % 5 == 0) and only
+  publishes that same candidate if it beats the mean-rating baseline on the holdout
+- Publishes accepted models with an atomic file replace; API workers pick the new file up,
+  warm it and hot-swap it in (see ModelManager.watch_for_updates)
+- Uses a lock file so only one worker retrains at a time
+- RETRAIN_MODE=incremental warm-starts from the live model on new ratings instead (train_tfrs_incremental),
+  with the same holdout check against the mean-rating baseline before publishing
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import threading
+import multiprocessing
+from datetime import datetime, timezone
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+#  Paths
+MODEL_PATH = os.path.join(BACKEND_DIR, "models", "tfrs_model.keras")
+CANDIDATE_PATH = os.path.join(BACKEND_DIR, "models", "tfrs_model.candidate.keras")
+LOCK_PATH = os.path.join(BACKEND_DIR, "models", ".retrain.lock")
+LAST_ATTEMPT_PATH = os.path.join(BACKEND_DIR, "models", ".retrain.last_attempt")
+DB_PATH = os.path.join(BACKEND_DIR, "database", "users.db")
+LABELED_PATH = os.path.join(BACKEND_DIR, "data", "builds", "labeled_builds.csv")
+
+#  Schedule settings (overridable per deployment)
+RETRAIN_INTERVAL_HOURS = float(os.environ.get("RETRAIN_INTERVAL_HOURS", 24))
+RETRAIN_MIN_NEW_RATINGS = int(os.environ.get("RETRAIN_MIN_NEW_RATINGS", 50))
+RETRAIN_CHECK_SECONDS = float(os.environ.get("RETRAIN_CHECK_SECONDS", 300))
+#  "full" retrains from scratch with holdout validation; "incremental" warm-starts from the live model
+RETRAIN_MODE = os.environ.get("RETRAIN_MODE", "full")
+RMSE_TOLERANCE = 0.05
+STALE_LOCK_SECONDS = 6 * 60 * 60
+
+#  Exit codes of the retraining process
+EXIT_PUBLISHED = 0
+EXIT_REJECTED = 2
+
+
+def count_new_ratings(db_path: str, since: datetime) -> int:
+    """Counts ratings inserted or updated after the given UTC time."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT COUNT(*) FROM ratings WHERE timestamp > ?",
+            (since.replace(tzinfo=None).isoformat(),)
+        ).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def file_mtime_utc(path: str):
+    """Returns a file's modification time as a UTC datetime, or None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    return datetime.fromtimestamp(os.path.getmtime(path), tz=timezone.utc)
+
+
+def retrain_and_validate(db_path=DB_PATH, labeled_path=LABELED_PATH,
+                         model_path=MODEL_PATH, candidate_path=CANDIDATE_PATH):
+    """
+    Trains a candidate model and publishes it if it passes holdout validation.
+    Runs inside the retraining process. Returns True if the candidate was published.
+    """
+    from models.train_tfrs_model import fit_model_on_dataset, evaluate_rmse_on_dataset
+    from models.export_tfrs_numpy import export_numpy_artifact
+    from models.ratings_stream import (
+        TRAIN_SPLIT, HOLDOUT_SPLIT, load_valid_build_ids, distinct_ids, make_ratings_dataset_from_db, rating_moments
+    )
+
+    #  Ratings are streamed from SQLite; the holdout is the deterministic id-based split
+    valid_build_ids = load_valid_build_ids(labeled_path)
+    user_ids, build_ids = distinct_ids(db_path, valid_build_ids)
+    if not user_ids or not build_ids:
+        print(" No valid ratings to train on.")
+        return False
+
+    candidate = fit_model_on_dataset(
+        make_ratings_dataset_from_db(db_path, valid_build_ids, where=TRAIN_SPLIT), user_ids, build_ids, epochs=10
+    )
+    candidate_rmse = evaluate_rmse_on_dataset(
+        candidate, make_ratings_dataset_from_db(db_path, valid_build_ids, where=HOLDOUT_SPLIT, shuffle=False)
+    )
+
+    #  The live model was trained on these holdout ratings, so its score can't be compared fairly;
+    #  the candidate must instead beat predicting the training mean for every rating
+    _, train_mean, _ = rating_moments(db_path, valid_build_ids, where=TRAIN_SPLIT)
+    _, _, holdout_mse = rating_moments(db_path, valid_build_ids, where=HOLDOUT_SPLIT, center=train_mean)
+    baseline_rmse = holdout_mse ** 0.5
+    print(f" Candidate holdout RMSE: {candidate_rmse:.4f} (mean-rating baseline: {baseline_rmse:.4f})")
+    if candidate_rmse > baseline_rmse * (1 + RMSE_TOLERANCE):
+        print(" Candidate rejected — keeping the current model.")
+        return False
+
+    #  The validated candidate is what gets published (no unvalidated refit on the holdout ratings);
+    #  save next to the live model, then swap atomically so readers never see a partial file
+    candidate.save(candidate_path)
+    os.replace(candidate_path, model_path)
+    #  Written after the Keras file so NumPy-backed workers see a current artifact
+    export_numpy_artifact(candidate, os.path.splitext(model_path)[0] + ".npz")
+    print(f" Candidate published to: {model_path}")
+    return True
+
+
+def _retrain_process_main():
+    if RETRAIN_MODE == "incremental":
+        from models.train_tfrs_incremental import train_incremental
+        sys.exit(EXIT_PUBLISHED if train_incremental() else EXIT_REJECTED)
+    sys.exit(EXIT_PUBLISHED if retrain_and_validate() else EXIT_REJECTED)
+
+
+class RetrainScheduler:
+    """Background thread that decides when to retrain and launches the retraining process."""
+
+    def __init__(self, db_path=DB_PATH, model_path=MODEL_PATH, lock_path=LOCK_PATH,
+                 last_attempt_path=LAST_ATTEMPT_PATH, interval_hours=RETRAIN_INTERVAL_HOURS,
+                 min_new_ratings=RETRAIN_MIN_NEW_RATINGS, check_seconds=RETRAIN_CHECK_SECONDS):
+        self.db_path = db_path
+        self.model_path = model_path
+        self.lock_path = lock_path
+        self.last_attempt_path = last_attempt_path
+        self.interval_seconds = interval_hours * 60 * 60
+        self.min_new_ratings = min_new_ratings
+        self.check_seconds = check_seconds
+        self.last_result = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="tfrs-retrain-scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def should_retrain(self) -> bool:
+        trained_at = file_mtime_utc(self.model_path)
+        if trained_at is None:
+            return False  # Initial training is handled by ModelManager
+
+        #  Measure from the last attempt too, so a rejected candidate isn't retried every check
+        last_attempt = file_mtime_utc(self.last_attempt_path)
+        since = max(trained_at, last_attempt) if last_attempt else trained_at
+        age = (datetime.now(timezone.utc) - since).total_seconds()
+        if age >= self.interval_seconds:
+            return True
+        return count_new_ratings(self.db_path, since) >= self.min_new_ratings
+
+    def _run(self):
+        while not self._stop.wait(self.check_seconds):
+            try:
+                if self.should_retrain() and self._acquire_lock():
+                    try:
+                        self.run_once()
+                    finally:
+                        self._release_lock()
+            except Exception as e:
+                print(f" Retrain scheduler error: {e}")
+
+    def run_once(self) -> bool:
+        """Runs one retraining process and waits for it. Returns True if a model was published."""
+        print("🔄 Retraining TFRS model in a background process...")
+        process = multiprocessing.get_context("spawn").Process(target=_retrain_process_main)
+        process.start()
+        process.join()
+        with open(self.last_attempt_path, "w") as f:
+            f.write(str(process.exitcode))
+        self.last_result = {
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "published": process.exitcode == EXIT_PUBLISHED,
+            "exit_code": process.exitcode
+        }
+        if process.exitcode not in (EXIT_PUBLISHED, EXIT_REJECTED):
+            print(f" Retraining process failed with exit code {process.exitcode}")
+        return process.exitcode == EXIT_PUBLISHED
+
+    def _acquire_lock(self) -> bool:
+        """Cross-process lock so only one API worker retrains at a time."""
+        try:
+            fd = os.open(self.lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            if time.time() - os.path.getmtime(self.lock_path) < STALE_LOCK_SECONDS:
+                return False
+            os.remove(self.lock_path)
+            return self._acquire_lock()
+        with os.fdopen(fd, "w") as f:
+            f.write(str(os.getpid()))
+        return True
+
+    def _release_lock(self):
+        try:
+            os.remove(self.lock_path)
+        except FileNotFoundError:
+            pass
+
+
+#  CLI usage: retrain and validate once
+if __name__ == "__main__":
+    retrain_and_validate()
@@ -0,0 +1,208 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-30
+Description:
+This script benchmarks every Siamese compatibility variant on the CPU serving path (NumPy encoder + head).
+Features:
+- Variants: reduced, expanded and full (.keras), the distilled student and its int8 copy;
+  the int8 copy is int8 storage only — SiameseEncoder dequantizes it on load, so its latency,
+  throughput and memory are float32 compute (the "compute" column says so)
+- Per-pair latency (median of single-pair calls) and batch throughput (pairs per second)
+- Memory: weight bytes held in memory by the encoder, weight bytes as stored in the artifact,
+  and artifact size on disk
+- Accuracy, ROC AUC and agreement with the full model on held-out pairs labeled by the
+  compatibility rules (the "test" split of siamese_pairs)
+- The saved reduced/expanded/full models predate the id-based split and were trained on some of
+  those pairs, so by default they are retrained (same architectures) on the "train" split first
+  and the student is re-distilled from the retrained full model; --saved benchmarks the saved
+  weights instead and marks their metrics held_out=False
+- The 2-input variants (reduced/expanded) are fed the first two feature columns
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import numpy as np
+from sklearn.metrics import roc_auc_score
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from models.siamese_pairs import (
+    PAIR_SAMPLE_SIZE, load_component_dataframes, build_pair_plans, iter_pair_batches, make_pair_dataset
+)
+from models.export_siamese_numpy import (
+    load_siamese_model, read_architecture, build_siamese_network, export_siamese_artifact,
+    export_quantized_siamese_artifact
+)
+from recommender.compatibility_scorer import SiameseEncoder
+
+DATA_DIR = os.path.join(BACKEND_DIR, "data")
+MODELS_DIR = os.path.join(BACKEND_DIR, "models")
+VARIANTS = ("reduced", "expanded", "full", "student")
+
+#  Benchmark settings
+HOLDOUT_PAIRS = 50000
+THROUGHPUT_BATCH = 16384
+LATENCY_CALLS = 2000
+#  Retraining the saved baselines on the id-based train split
+BASELINE_EPOCHS = 3
+BASELINE_BATCH_SIZE = 1024
+
+
+def load_holdout_pairs(plans, max_pairs: int = HOLDOUT_PAIRS):
+    """Held-out (features_a, features_b, labels), in the same order for every variant."""
+    features_a, features_b, labels, total = [], [], [], 0
+    for (a, b), y in iter_pair_batches(plans, batch_size=4096, split="test", seed=42):
+        features_a.append(a)
+        features_b.append(b)
+        labels.append(y)
+        total += len(y)
+        if total >= max_pairs:
+            break
+    return (np.concatenate(features_a)[:max_pairs], np.concatenate(features_b)[:max_pairs],
+            np.concatenate(labels)[:max_pairs])
+
+
+def retrain_baseline(model_path: str, plans, epochs: int = BASELINE_EPOCHS):
+    """A fresh model with the saved variant's architecture, trained on the "train" split only."""
+    from tensorflow.keras.optimizers import Adam
+
+    input_dim, units = read_architecture(model_path)
+    model = build_siamese_network(input_dim, units)
+    model.compile(loss="binary_crossentropy", optimizer=Adam(learning_rate=0.001))
+    dataset = make_pair_dataset(plans, batch_size=BASELINE_BATCH_SIZE, split="train").map(
+        lambda pair, labels: ((pair[0][:, :input_dim], pair[1][:, :input_dim]), labels)
+    )
+    print(f" Retraining {os.path.basename(model_path)} {units} on the train split...")
+    model.fit(dataset, epochs=epochs)
+    return model
+
+
+def load_variant_encoders(tmp_dir: str, plans=None, epochs: int = BASELINE_EPOCHS, sample_size: int = PAIR_SAMPLE_SIZE):
+    """
+    Exports each available variant to NumPy (plus an int8 copy of the student) and returns
+    {variant: (artifact_path, held_out)}. With plans, the baselines are retrained on the train
+    split and the student is distilled from the retrained full model; otherwise saved weights are used.
+    """
+    from models.distill_siamese import distill
+
+    encoders = {}
+    for variant in VARIANTS:
+        model_path = os.path.join(MODELS_DIR, f"{variant}_siamese_network_model.keras")
+        artifact_path = os.path.join(tmp_dir, f"{variant}_siamese_network_model.npz")
+        if variant == "student" and plans is not None:
+            if "full" not in encoders:
+                print(" Skipping student: no retrained full model to distill from")
+                continue
+            distill(encoders["full"][0], os.path.join(tmp_dir, f"{variant}_siamese_network_model.keras"),
+                    epochs=epochs, sample_size=sample_size)
+        elif not os.path.exists(model_path):
+            print(f" Skipping {variant}: {model_path} not found")
+            continue
+        elif plans is not None:
+            export_siamese_artifact(retrain_baseline(model_path, plans, epochs), artifact_path)
+        else:
+            export_siamese_artifact(load_siamese_model(model_path), artifact_path)
+        #  Saved baselines (and a student distilled from the saved full model) have seen test pairs
+        held_out = plans is not None
+        encoders[variant] = (artifact_path, held_out)
+        if variant == "student":
+            int8_path = os.path.splitext(artifact_path)[0] + ".int8.npz"
+            if not os.path.exists(int8_path):  # distill() already wrote one
+                int8_path = export_quantized_siamese_artifact(artifact_path)
+            encoders["student_int8"] = (int8_path, held_out)
+    return encoders
+
+
+def _score(encoder: SiameseEncoder, features_a, features_b) -> np.ndarray:
+    return encoder.score_pairs(encoder.encode(features_a), encoder.encode(features_b))
+
+
+def _per_pair_latency(encoder: SiameseEncoder, features_a, features_b, calls: int = LATENCY_CALLS) -> float:
+    timings = np.empty(calls)
+    for i in range(calls):
+        j = i % len(features_a)
+        start = time.perf_counter()
+        _score(encoder, features_a[j:j + 1], features_b[j:j + 1])
+        timings[i] = time.perf_counter() - start
+    return float(np.median(timings))
+
+
+def _throughput(encoder: SiameseEncoder, features_a, features_b, repeats: int = 5) -> float:
+    a, b = features_a[:THROUGHPUT_BATCH], features_b[:THROUGHPUT_BATCH]
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        _score(encoder, a, b)
+        best = min(best, time.perf_counter() - start)
+    return len(a) / best
+
+
+def build_report(max_pairs: int = HOLDOUT_PAIRS, retrain: bool = True, epochs: int = BASELINE_EPOCHS,
+                 sample_size: int = PAIR_SAMPLE_SIZE) -> list:
+    plans = build_pair_plans(load_component_dataframes(DATA_DIR), sample_size=sample_size)
+    features_a, features_b, labels = load_holdout_pairs(plans, max_pairs)
+    print(f" Held-out pairs: {len(labels)} ({int(labels.sum())} compatible)")
+    has_both_classes = 0 < labels.sum() < len(labels)
+
+    rows, reference = [], None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        artifacts = load_variant_encoders(tmp_dir, plans if retrain else None, epochs, sample_size)
+        for variant, (artifact_path, held_out) in artifacts.items():
+            encoder = SiameseEncoder.load(artifact_path)
+            a, b = features_a[:, :encoder.input_dim], features_b[:, :encoder.input_dim]
+            scores = _score(encoder, a, b)
+            if variant == "full":
+                reference = scores >= 0.5
+            with np.load(artifact_path) as data:
+                stored_bytes = sum(data[key].nbytes for key in data.files)
+                storage = "int8" if any(data[key].dtype == np.int8 for key in data.files) else "float32"
+
+            rows.append({
+                "variant": variant,
+                "held_out": held_out,
+                "storage": storage,
+                "compute": "float32",
+                "pair_latency_us": _per_pair_latency(encoder, a, b) * 1e6,
+                "pairs_per_s": _throughput(encoder, a, b),
+                "weight_bytes": encoder.weight_bytes,
+                "stored_weight_bytes": stored_bytes,
+                "artifact_bytes": os.path.getsize(artifact_path),
+                "accuracy": float(np.mean((scores >= 0.5) == labels.astype(bool))),
+                "roc_auc": float(roc_auc_score(labels, scores)) if has_both_classes else float("nan"),
+                "_predictions": scores >= 0.5,
+            })
+
+    for row in rows:
+        predictions = row.pop("_predictions")
+        row["full_agreement"] = float(np.mean(predictions == reference)) if reference is not None else float("nan")
+    return rows
+
+
+def print_report(rows: list):
+    headers = list(rows[0].keys())
+    print(" | ".join(f"{h:>16}" for h in headers))
+    for row in rows:
+        print(" | ".join(f"{v:>16.4f}" if isinstance(v, float) else f"{str(v):>16}" for v in row.values()))
+
+
+#  CLI usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Siamese compatibility variants.")
+    parser.add_argument("--saved", action="store_true",
+                        help="benchmark the saved weights as-is (accuracy/AUC not held out)")
+    parser.add_argument("--epochs", type=int, default=BASELINE_EPOCHS, help="epochs when retraining baselines")
+    args = parser.parse_args()
+
+    print("\n Siamese compatibility benchmark (NumPy CPU serving path)\n")
+    rows = build_report(retrain=not args.saved, epochs=args.epochs)
+    print_report(rows)
+    if any(not row["held_out"] for row in rows):
+        print("\n held_out=False: these weights were trained on some of the benchmark pairs, "
+              "so their accuracy/AUC are optimistic.")
@@ -0,0 +1,202 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-30
+Description:
+This module generates Siamese training pairs for component compatibility without Python row loops.
+Features:
+- Builds one feature matrix per category (same 3-feature layout as the original get_features)
+- Evaluates the compatibility rules for a whole category pair at once with broadcasting;
+  substring rules are evaluated once per distinct value pair and then indexed
+- Prepares the category pairs in parallel (thread pool)
+- Streams shuffled (component_a, component_b, label) batches from a generator / tf.data source,
+  so the full cross product is never materialized
+- Deterministic train/test split by pair index (every 5th pair is held out)
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+#  Components sampled per category for the cross product (the original script used 800)
+PAIR_SAMPLE_SIZE = int(os.environ.get("SIAMESE_PAIR_SAMPLE", 800))
+BATCH_SIZE = 32
+#  Pairs drawn from one category pair before moving on to another
+CHUNK_SIZE = 4096
+HOLDOUT_EVERY = 5
+
+#  Feature columns per category; None is a zero-padded slot
+FEATURE_COLUMNS = {
+    "cpu": ("performance_score", "price", "tdp"),
+    "gpu": ("performance_score", "price", "tdp_w"),
+    "motherboard": (None, "price", None),
+    "ram_ddr4": ("memory_size_gb", "price", None),
+    "ram_ddr5": ("memory_size_gb", "price", None),
+    "storage": ("drive_size_gb", "price", None),
+    "power_supply": ("wattage_w", "price", None),
+}
+DEFAULT_FEATURE_COLUMNS = (None, "price", None)
+
+
+def load_component_dataframes(data_dir: str, sample_size: int = 2000, seed: int = 42) -> dict:
+    """Samples every available preprocessed catalog (same files and sampling as train_siamese_network)."""
+    dataframes = {}
+    for category in FEATURE_COLUMNS:
+        path = os.path.join(data_dir, f"preprocessed_filtered_{category}.csv")
+        if os.path.exists(path):
+            df = pd.read_csv(path)
+            dataframes[category] = df.sample(min(len(df), sample_size), random_state=seed)
+    return dataframes
+
+
+def feature_matrix(df: pd.DataFrame, category: str) -> np.ndarray:
+    """(n, 3) float32 features for every component in df."""
+    columns = FEATURE_COLUMNS.get(category, DEFAULT_FEATURE_COLUMNS)
+    features = np.zeros((len(df), len(columns)), dtype=np.float32)
+    for i, column in enumerate(columns):
+        if column is not None:
+            features[:, i] = df[column].to_numpy(dtype=np.float32)
+    return features
+
+
+def _equal(values1, values2) -> np.ndarray:
+    return values1[:, None] == values2[None, :]
+
+
+def _contains(values1, values2) -> np.ndarray:
+    """values1[i] in values2[j] for every (i, j), evaluated once per distinct pair of values."""
+    codes1, uniques1 = pd.factorize(pd.Series(values1), use_na_sentinel=False)
+    codes2, uniques2 = pd.factorize(pd.Series(values2), use_na_sentinel=False)
+    table = np.array([[isinstance(a, str) and isinstance(b, str) and a in b for b in uniques2] for a in uniques1],
+                     dtype=bool).reshape(len(uniques1), len(uniques2))
+    return table[codes1[:, None], codes2[None, :]]
+
+
+def _column(df, name):
+    if name not in df.columns:
+        raise KeyError(name)
+    return df[name].to_numpy()
+
+
+def compatibility_matrix(df1: pd.DataFrame, df2: pd.DataFrame, category1: str, category2: str) -> np.ndarray:
+    """
+    (len(df1), len(df2)) boolean labels; the same rules (and rule order) as the original
+    check_compatibility, including False when a rule's column is missing.
+    """
+    try:
+        if category1 == "cpu" and category2 == "motherboard":
+            return _equal(_column(df1, "socket"), _column(df2, "socket"))
+        if category1 == "gpu" and category2 == "motherboard":
+            return _contains(_column(df1, "bus_interface"), _column(df2, "storage_support"))
+        if category1 in ["ram_ddr4", "ram_ddr5"] and category2 == "motherboard":
+            return (_contains(_column(df1, "memory_type"), _column(df2, "memory_type"))
+                    & (_column(df1, "price")[:, None] < _column(df2, "price")[None, :]))
+        if category1 == "storage" and category2 == "motherboard":
+            return _contains(_column(df1, "interface_type"), _column(df2, "storage_support"))
+        if category1 == "power_supply" and category2 in ["cpu", "gpu"]:
+            #  component2.get("tdp", 0) or component2.get("tdp_w", 0), row by row
+            zeros = np.zeros(len(df2), dtype=np.float64)
+            tdp = df2["tdp"].to_numpy(dtype=np.float64) if "tdp" in df2.columns else zeros
+            tdp_w = df2["tdp_w"].to_numpy(dtype=np.float64) if "tdp_w" in df2.columns else zeros
+            required = np.where(tdp != 0, tdp, tdp_w)
+            return _column(df1, "wattage_w").astype(np.float64)[:, None] >= required[None, :]
+    except KeyError:
+        pass
+    return np.zeros((len(df1), len(df2)), dtype=bool)
+
+
+def _prepare_pair(df1, df2, category1, category2, sample_size, seed):
+    df1 = df1.sample(min(len(df1), sample_size), random_state=seed)
+    df2 = df2.sample(min(len(df2), sample_size), random_state=seed)
+    return {
+        "categories": (category1, category2),
+        "features_a": feature_matrix(df1, category1),
+        "features_b": feature_matrix(df2, category2),
+        "labels": compatibility_matrix(df1, df2, category1, category2),
+    }
+
+
+def build_pair_plans(dataframes: dict, sample_size: int = PAIR_SAMPLE_SIZE, seed: int = 42, workers: int = None):
+    """Feature matrices and label grids for every category pair (i < j), prepared in parallel."""
+    categories = list(dataframes.keys())
+    jobs = [(categories[i], categories[j]) for i in range(len(categories)) for j in range(i + 1, len(categories))]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        plans = list(pool.map(
+            lambda job: _prepare_pair(dataframes[job[0]], dataframes[job[1]], job[0], job[1], sample_size, seed), jobs
+        ))
+    return [plan for plan in plans if plan["labels"].size]
+
+
+def pair_count(plans, split: str = None) -> int:
+    total = sum(plan["labels"].size for plan in plans)
+    if split is None:
+        return total
+    holdout = sum(len(range(0, plan["labels"].size, HOLDOUT_EVERY)) for plan in plans)
+    return holdout if split == "test" else total - holdout
+
+
+def _pair_indices(plan, start, stop):
+    """
+    Maps flat pair indices to (row_a, row_b) along diagonals (row_b = (k // n_a + row_a) % n_b),
+    a bijection on the grid that keeps consecutive pairs from sharing a component.
+    """
+    n_a, n_b = plan["labels"].shape
+    flat = np.arange(start, stop)
+    rows_a = flat % n_a
+    rows_b = (flat // n_a + rows_a) % n_b
+    return flat, rows_a, rows_b
+
+
+def iter_pair_batches(plans, batch_size: int = BATCH_SIZE, split: str = None, shuffle: bool = True,
+                      seed: int = 42, chunk_size: int = CHUNK_SIZE):
+    """Yields ((features_a, features_b), labels) batches; split is "train", "test" or None (all pairs)."""
+    rng = np.random.default_rng(seed)
+    chunks = [(p, start) for p, plan in enumerate(plans) for start in range(0, plan["labels"].size, chunk_size)]
+    if shuffle:
+        rng.shuffle(chunks)
+
+    n_features = plans[0]["features_a"].shape[1] if plans else 0
+    leftover_a = leftover_b = np.zeros((0, n_features), dtype=np.float32)
+    leftover_y = np.zeros(0, dtype=np.float32)
+    for p, start in chunks:
+        plan = plans[p]
+        flat, rows_a, rows_b = _pair_indices(plan, start, min(start + chunk_size, plan["labels"].size))
+        if split is not None:
+            keep = (flat % HOLDOUT_EVERY == 0) if split == "test" else (flat % HOLDOUT_EVERY != 0)
+            rows_a, rows_b = rows_a[keep], rows_b[keep]
+        if shuffle:
+            order = rng.permutation(len(rows_a))
+            rows_a, rows_b = rows_a[order], rows_b[order]
+
+        #  Carry the partial batch from the previous chunk over, so every batch but the last is full
+        features_a = np.concatenate([leftover_a, plan["features_a"][rows_a]])
+        features_b = np.concatenate([leftover_b, plan["features_b"][rows_b]])
+        labels = np.concatenate([leftover_y, plan["labels"][rows_a, rows_b].astype(np.float32)])
+
+        full = len(labels) - len(labels) % batch_size
+        for i in range(0, full, batch_size):
+            yield (features_a[i:i + batch_size], features_b[i:i + batch_size]), labels[i:i + batch_size]
+        leftover_a, leftover_b, leftover_y = features_a[full:], features_b[full:], labels[full:]
+
+    if len(leftover_y):
+        yield (leftover_a, leftover_b), leftover_y
+
+
+def make_pair_dataset(plans, batch_size: int = BATCH_SIZE, split: str = None, shuffle: bool = True, seed: int = 42):
+    """tf.data source over iter_pair_batches (reshuffled with a new seed every epoch)."""
+    import tensorflow as tf
+
+    n_features = plans[0]["features_a"].shape[1]
+    epoch = {"count": 0}
+
+    def generator():
+        epoch["count"] += 1
+        yield from iter_pair_batches(plans, batch_size, split, shuffle, seed + epoch["count"] if shuffle else seed)
+
+    dataset = tf.data.Dataset.from_generator(generator, output_signature=(
+        (tf.TensorSpec(shape=(None, n_features), dtype=tf.float32),
+         tf.TensorSpec(shape=(None, n_features), dtype=tf.float32)),
+        tf.TensorSpec(shape=(None,), dtype=tf.float32),
+    ))
+    return dataset.prefetch(tf.data.AUTOTUNE)
@@ -0,0 +1,217 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-05-03
+Description:
+This script tests the auth routes against a temporary users.db through FastAPI's TestClient.
+It:
+- Pages through /auth/my_builds with the returned next_cursor and checks every saved build comes
+  back once, in save order, with next_cursor null on the final page
+- Checks a cached user expires after the cache TTL and is dropped when the password changes
+- Checks a full hashing pool answers 429 (with Retry-After), and that queued hashes cancelled
+  before they start give their pool slots back
+- Checks build_rating_stats matches the ratings table after new ratings, updated ratings,
+  batch upserts and an account deletion
+"""
+
+import os
+import sys
+import time
+import asyncio
+import sqlite3
+import tempfile
+import threading
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import auth.database as database
+
+#  The tests share one temporary database (never the real users.db); usernames keep them apart
+TMP_DIR = tempfile.mkdtemp()
+database.DB_PATH = os.path.join(TMP_DIR, "users.db")
+database.db_pool = database.ConnectionPool(database.DB_PATH)
+database.init_db()
+
+from auth import auth as auth_routes
+from auth.auth import auth_router
+from auth.hashing import HashingPool
+from auth.rating_stats import check_rating_stats
+from auth.jwt_handler import UserCache, user_cache
+
+app = FastAPI()
+app.include_router(auth_router, prefix="/auth")
+client = TestClient(app)
+
+
+def register_and_login(username: str, password: str = "password123") -> dict:
+    """Registers a user and returns the Authorization header for them."""
+    response = client.post("/auth/register", json={"username": username, "email": f"{username}@example.com",
+                                                   "password": password})
+    assert response.status_code == 200
+    token = client.post("/auth/login", json={"username": username, "password": password}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _all_pages(headers: dict, limit: int) -> list:
+    pages, cursor = [], None
+    while True:
+        params = {"limit": limit} if cursor is None else {"limit": limit, "cursor": cursor}
+        response = client.get("/auth/my_builds", params=params, headers=headers)
+        assert response.status_code == 200
+        body = response.json()
+        pages.append([build["build_id"] for build in body["saved_builds"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+def test_my_builds_cursor_round_trip():
+    headers = register_and_login("pager")
+    build_ids = [f"build-{i}" for i in range(5)]
+    for build_id in build_ids:
+        assert client.post("/auth/save_build", json={"build_id": build_id}, headers=headers).status_code == 200
+
+    pages = _all_pages(headers, limit=2)
+    assert pages == [build_ids[0:2], build_ids[2:4], build_ids[4:5]]
+
+
+def test_my_builds_final_page_exact_multiple():
+    headers = register_and_login("exact")
+    for i in range(4):
+        client.post("/auth/save_build", json={"build_id": f"exact-{i}"}, headers=headers)
+
+    #  A full last page already reports next_cursor null (no trailing empty page)
+    assert _all_pages(headers, limit=2) == [["exact-0", "exact-1"], ["exact-2", "exact-3"]]
+    assert _all_pages(register_and_login("empty"), limit=2) == [[]]
+
+
+def test_user_cache_ttl_expiry():
+    cache = UserCache(maxsize=4, ttl=0.05)
+    cache.put("ttl", {"id": 1, "username": "ttl"})
+    assert cache.get("ttl") == {"id": 1, "username": "ttl"}
+    time.sleep(0.1)
+    assert cache.get("ttl") is None
+
+    #  Through get_current_user: a change made behind the cache shows up once the entry expires
+    headers = register_and_login("stale")
+    saved_ttl, user_cache.ttl = user_cache.ttl, 0.2
+    try:
+        assert client.get("/auth/me", headers=headers).json()["email"] == "stale@example.com"
+        conn = sqlite3.connect(database.DB_PATH)
+        conn.execute("UPDATE users SET email = 'fresh@example.com' WHERE username = 'stale'")
+        conn.commit()
+        conn.close()
+        assert client.get("/auth/me", headers=headers).json()["email"] == "stale@example.com"
+        time.sleep(0.3)
+        assert client.get("/auth/me", headers=headers).json()["email"] == "fresh@example.com"
+    finally:
+        user_cache.ttl = saved_ttl
+
+
+def test_password_change_invalidates_cache():
+    headers = register_and_login("rotate", password="old-password")
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    assert user_cache.get("rotate") is not None
+
+    response = client.patch("/auth/auth/update-profile", headers=headers,
+                            json={"current_password": "old-password", "new_password": "new-password"})
+    assert response.status_code == 200
+    assert user_cache.get("rotate") is None
+    assert client.post("/auth/login", json={"username": "rotate", "password": "old-password"}).status_code == 401
+    assert client.post("/auth/login", json={"username": "rotate", "password": "new-password"}).status_code == 200
+
+
+def test_full_hashing_pool_returns_429():
+    pool, release = HashingPool(workers=1, max_pending=1), threading.Event()
+    saved_pool, auth_routes.hashing_pool = auth_routes.hashing_pool, pool
+    blocker = threading.Thread(target=lambda: asyncio.run(pool.submit(release.wait)))
+    try:
+        blocker.start()
+        while pool.in_flight < 1:
+            time.sleep(0.01)
+        response = client.post("/auth/register", json={"username": "busy", "email": "busy@example.com",
+                                                       "password": "password123"})
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "1"
+        assert pool.metrics()["rejected"] == 1
+
+        #  The slot is free again once the blocking hash finishes
+        release.set()
+        blocker.join()
+        assert pool.in_flight == 0
+        register_and_login("busy")
+    finally:
+        release.set()
+        auth_routes.hashing_pool = saved_pool
+
+
+def test_cancelled_hashes_release_slots():
+    pool = HashingPool(workers=1, max_pending=4)
+
+    async def cancel_queued():
+        tasks = [asyncio.create_task(pool.submit(time.sleep, 0.2)) for _ in range(4)]
+        await asyncio.sleep(0.05)
+        #  Only the first job is running; the rest are cancelled while still queued (client went away)
+        for task in tasks[1:]:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return await pool.submit(lambda: "ok")
+
+    assert asyncio.run(cancel_queued()) == "ok"
+    time.sleep(0.05)
+    metrics = pool.metrics()
+    assert metrics["in_flight"] == 0 and metrics["rejected"] == 0
+
+
+def _stats(build_id: str):
+    conn = sqlite3.connect(database.DB_PATH)
+    try:
+        return conn.execute("SELECT rating_count, rating_sum, rating_sum_sq FROM build_rating_stats "
+                            "WHERE build_id = ?", (build_id,)).fetchone()
+    finally:
+        conn.close()
+
+
+def _stats_drift() -> list:
+    with database.db_connection() as conn:
+        return check_rating_stats(conn, repair=False)
+
+
+def test_rating_upserts_keep_stats_consistent():
+    first, second = register_and_login("rater1"), register_and_login("rater2")
+
+    client.post("/auth/rate-build", json={"build_id": "stats-a", "rating": 4}, headers=first)
+    client.post("/auth/rate-build", json={"build_id": "stats-a", "rating": 2}, headers=second)
+    assert _stats("stats-a") == (2, 6.0, 20.0)
+
+    #  An update replaces the old rating's contribution instead of adding a new one
+    client.post("/auth/rate-build", json={"build_id": "stats-a", "rating": 5}, headers=first)
+    assert _stats("stats-a") == (2, 7.0, 29.0)
+
+    response = client.post("/auth/rate-builds", headers=second, json={"ratings": [
+        {"build_id": "stats-a", "rating": 1}, {"build_id": "stats-b", "rating": 3}, {"build_id": "stats-b", "rating": 4}
+    ]})
+    assert response.json()["created"] == 1 and response.json()["updated"] == 1
+    assert _stats("stats-a") == (2, 6.0, 26.0)
+    assert _stats("stats-b") == (1, 4.0, 16.0)
+    assert _stats_drift() == []
+
+    #  Deleting an account removes its ratings from the aggregates (and rows left with none)
+    assert client.delete("/auth/auth/delete-account", headers=second).status_code == 200
+    assert _stats("stats-a") == (1, 5.0, 25.0)
+    assert _stats("stats-b") is None
+    assert _stats_drift() == []
+
+
+if __name__ == "__main__":
+    for test in (test_my_builds_cursor_round_trip, test_my_builds_final_page_exact_multiple,
+                 test_user_cache_ttl_expiry, test_password_change_invalidates_cache,
+                 test_full_hashing_pool_returns_429, test_cancelled_hashes_release_slots,
+                 test_rating_upserts_keep_stats_consistent):
+        test()
+        print(f" {test.__name__} passed")
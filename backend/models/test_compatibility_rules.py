@@ -0,0 +1,61 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-05-03
+Description:
+This script tests the compiled compatibility rules and the component matcher's use of them.
+Features:
+- compatible_motherboards matches rows by motherboard name, so a filtered or reordered
+  motherboard frame gets the same (socket-matching) boards
+- An unknown CPU name gives no motherboards instead of raising
+- PSU wattage rules treat an unknown (NaN) wattage or TDP as incompatible
+"""
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from recommender.compatibility_rules import RULES, normalize_socket
+from utils.component_matcher import compatible_motherboards, load_csv
+
+cpu_data = load_csv("cpu")
+motherboard_data = load_csv("motherboard")
+
+
+def _sockets_match(cpu, motherboards) -> bool:
+    return bool((normalize_socket(motherboards["socket"]) == normalize_socket([cpu["socket"]])[0]).all())
+
+
+def test_compatible_motherboards_on_filtered_frame():
+    cpu = cpu_data.iloc[1].to_dict()
+    full = compatible_motherboards(cpu, motherboard_data)
+    assert not full.empty and _sockets_match(cpu, full)
+
+    subset = motherboard_data.sample(frac=0.5, random_state=1)
+    matched = compatible_motherboards(cpu, subset)
+    assert set(matched["name"]) == set(full["name"]) & set(subset["name"])
+    assert _sockets_match(cpu, matched)
+
+
+def test_compatible_motherboards_unknown_cpu():
+    assert compatible_motherboards({"name": "Not A Real CPU"}, motherboard_data).empty
+
+
+def test_wattage_rule_unknown_is_incompatible():
+    power_supply = pd.DataFrame({"wattage_w": [650.0, np.nan]})
+    gpu = pd.DataFrame({"tdp_w": [200.0, np.nan, 800.0]})
+    matrix = RULES[("power_supply", "gpu")](power_supply, gpu)
+    assert matrix.tolist() == [[True, False, False], [False, False, False]]
+
+
+if __name__ == "__main__":
+    for test in (test_compatible_motherboards_on_filtered_frame, test_compatible_motherboards_unknown_cpu,
+                 test_wattage_rule_unknown_is_incompatible):
+        test()
+        print(f" {test.__name__} passed")
@@ -0,0 +1,82 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-05-01
+Description:
+This script tests the NumPy RandomForest scorer through the /builds/match request path.
+Features:
+- Checks the flattened forest against sklearn on random scaled rows (identical predictions)
+- Calls POST /api/builds/match and checks the builds come back ordered by the forest score,
+  drawn from the nearest builds under the price
+- Checks rerank=false keeps plain nearest-neighbour order
+"""
+
+import os
+import sys
+import joblib
+import numpy as np
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from api.builds import builds_router
+from recommender.content_recommender import build_records, RERANK_CANDIDATES_PER_RESULT, FOREST_FEATURE_COLUMNS
+from recommender.forest_scorer import forest_backend
+
+SKLEARN_MODEL_PATH = os.path.join(BACKEND_DIR, "models", "sklearn_recommendation_model.pkl")
+
+QUERY = {"cpu_score": 0.8, "gpu_score": 0.75, "ram_gb": 16, "storage_gb": 1000, "price": 600}
+
+app = FastAPI()
+app.include_router(builds_router, prefix="/api")
+client = TestClient(app)
+
+
+def test_forest_matches_sklearn():
+    if not os.path.exists(SKLEARN_MODEL_PATH):
+        print(" sklearn model not found — skipping the equivalence check.")
+        return
+    model = joblib.load(SKLEARN_MODEL_PATH)
+    scorer = forest_backend._current()
+    rows = np.random.default_rng(0).uniform(-0.2, 1.2, size=(5000, len(scorer.feature_names)))
+    assert np.max(np.abs(scorer.predict_scaled(rows) - model.predict(rows.astype(np.float32)))) == 0.0
+
+
+def test_match_is_reranked_by_forest():
+    top_k = 3
+    response = client.post("/api/builds/match", json={**QUERY, "top_k": top_k})
+    assert response.status_code == 200
+    builds = response.json()["builds"]
+    assert len(builds) == top_k
+
+    #  Same candidates as the plain nearest-neighbour query, scored by the forest
+    nearest = client.post("/api/builds/match", json={**QUERY, "top_k": top_k * RERANK_CANDIDATES_PER_RESULT,
+                                                    "rerank": False}).json()["builds"]
+    expected = forest_backend.rank_builds(nearest, QUERY["price"], k=top_k, feature_columns=FOREST_FEATURE_COLUMNS)
+    assert [b["build_id"] for b in builds] == [b["build_id"] for b in expected]
+    scores = [b["score"] for b in builds]
+    assert scores == sorted(scores, reverse=True)
+    assert all(b["price"] <= QUERY["price"] for b in builds)
+
+
+def test_match_without_rerank_is_nearest_first():
+    builds = client.post("/api/builds/match", json={**QUERY, "top_k": 5, "rerank": False}).json()["builds"]
+    similarities = [b["similarity"] for b in builds]
+    assert similarities == sorted(similarities, reverse=True)
+    assert all("score" not in b for b in builds)
+    assert len(build_records) >= len(builds)
+
+
+def test_match_rejects_bad_top_k():
+    assert client.post("/api/builds/match", json={**QUERY, "top_k": 0}).status_code == 422
+
+
+if __name__ == "__main__":
+    for test in (test_forest_matches_sklearn, test_match_is_reranked_by_forest,
+                 test_match_without_rerank_is_nearest_first, test_match_rejects_bad_top_k):
+        test()
+        print(f" {test.__name__} passed")
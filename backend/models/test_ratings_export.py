@@ -0,0 +1,92 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-05-03
+Description:
+This script tests the watermark of the incremental ratings export on temporary databases.
+Features:
+- Rows sharing a timestamp are exported exactly once across runs, as are rows without a timestamp
+- A rating updated through RatingRepository in the same clock tick as the last export (same
+  timestamp, lower id than the watermark) is still picked up by the next export
+"""
+
+import os
+import sys
+import asyncio
+import sqlite3
+import tempfile
+from datetime import datetime
+import pandas as pd
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import auth.database as database
+import auth.repositories as repositories
+from utils.export_ratings_incremental import export_ratings_incremental, read_ratings_dataset
+
+TIMESTAMP = "2025-05-01T10:00:00.000000"
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def utcnow(cls):
+        return cls.fromisoformat(TIMESTAMP)
+
+
+def _labeled(tmp_dir: str) -> str:
+    path = os.path.join(tmp_dir, "labeled_builds.csv")
+    pd.DataFrame({"build_id": ["b1", "b2", "b3"]}).to_csv(path, index=False)
+    return path
+
+
+def test_same_timestamp_rows_exported_once():
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path, dataset_dir = os.path.join(tmp_dir, "users.db"), os.path.join(tmp_dir, "dataset")
+        labeled_path = _labeled(tmp_dir)
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE ratings (id INTEGER PRIMARY KEY, user_id INTEGER, build_id TEXT, "
+                     "rating REAL, comment TEXT, timestamp TEXT)")
+        insert = "INSERT INTO ratings (id, user_id, build_id, rating, timestamp) VALUES (?, ?, ?, ?, ?)"
+        conn.executemany(insert, [(1, 1, "b1", 4, TIMESTAMP), (2, 2, "b1", 5, TIMESTAMP), (3, 3, "b2", 3, None)])
+        conn.commit()
+        assert export_ratings_incremental(db_path, labeled_path, dataset_dir) == 3
+
+        conn.executemany(insert, [(4, 4, "b2", 2, TIMESTAMP), (5, 5, "b3", 1, None)])
+        conn.commit()
+        conn.close()
+        assert export_ratings_incremental(db_path, labeled_path, dataset_dir) == 2
+        assert export_ratings_incremental(db_path, labeled_path, dataset_dir) == 0
+        assert len(read_ratings_dataset(dataset_dir)) == 5
+
+
+def test_update_in_same_clock_tick_is_exported():
+    saved = database.DB_PATH, database.db_pool, repositories.datetime
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database.DB_PATH = os.path.join(tmp_dir, "users.db")
+        database.db_pool = database.ConnectionPool(database.DB_PATH)
+        repositories.datetime = FrozenDatetime
+        dataset_dir, labeled_path = os.path.join(tmp_dir, "dataset"), _labeled(tmp_dir)
+        try:
+            database.init_db()
+            ratings = repositories.RatingRepository()
+            asyncio.run(ratings.upsert(1, {"b1": 4, "b2": 5}))
+            asyncio.run(ratings.upsert(2, {"b3": 3}))
+            assert export_ratings_incremental(database.DB_PATH, labeled_path, dataset_dir) == 3
+
+            #  Same (frozen) clock, and the row id is below the watermark's
+            asyncio.run(ratings.upsert(1, {"b1": 1}))
+            assert export_ratings_incremental(database.DB_PATH, labeled_path, dataset_dir) == 1
+        finally:
+            database.DB_PATH, database.db_pool, repositories.datetime = saved
+
+        dataset = read_ratings_dataset(dataset_dir)
+        assert sorted(dataset["rating"].tolist()) == [1, 3, 5]
+
+
+if __name__ == "__main__":
+    for test in (test_same_timestamp_rows_exported_once, test_update_in_same_clock_tick_is_exported):
+        test()
+        print(f" {test.__name__} passed")
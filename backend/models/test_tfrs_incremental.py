@@ -0,0 +1,105 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-05-03
+Description:
+This script tests the incremental (warm-start) TFRS update path on a small temporary ratings database.
+Features:
+- Checks fine_tune_embeddings trains the user/build embeddings only (rating MLP unchanged)
+  and adds new builds to the recommendation candidates
+- Runs train_incremental against a hashed-embedding model and checks the update goes through
+  fine_tune_embeddings
+"""
+
+import os
+import sys
+import sqlite3
+import tempfile
+import numpy as np
+import pandas as pd
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import models.train_tfrs_incremental as incremental
+from models.train_tfrs_model import fit_model, fine_tune_embeddings
+
+BUILD_IDS = [f"b{i}" for i in range(8)]
+
+
+def make_ratings(start_id: int, count: int, builds=BUILD_IDS, timestamp: str = "2025-05-01T10:00:00") -> pd.DataFrame:
+    rng = np.random.default_rng(start_id)
+    ids = np.arange(start_id, start_id + count)
+    return pd.DataFrame({
+        "id": ids,
+        "user_id": [f"u{i % 6}" for i in ids],
+        "build_id": [builds[i % len(builds)] for i in ids],
+        "rating": rng.integers(1, 6, size=count).astype(float),
+        "timestamp": timestamp,
+    })
+
+
+def write_ratings_db(db_path: str, df: pd.DataFrame):
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS ratings (
+            id INTEGER PRIMARY KEY, user_id TEXT, build_id TEXT, rating REAL, comment TEXT, timestamp TEXT
+        )
+    ''')
+    conn.executemany("INSERT INTO ratings (id, user_id, build_id, rating, timestamp) VALUES (?, ?, ?, ?, ?)",
+                     df[["id", "user_id", "build_id", "rating", "timestamp"]].values.tolist())
+    conn.commit()
+    conn.close()
+
+
+def test_fine_tune_embeddings_updates_only_embeddings():
+    model = fit_model(make_ratings(1, 40, BUILD_IDS[:6]), epochs=1, hashed=True)
+    rating_weights = [w.copy() for w in model.rating_model.get_weights()]
+    build_weights = model.build_model.get_weights()[0].copy()
+
+    fine_tune_embeddings(model, make_ratings(41, 40), epochs=2)
+
+    assert all(np.array_equal(a, b) for a, b in zip(rating_weights, model.rating_model.get_weights()))
+    assert not np.array_equal(build_weights, model.build_model.get_weights()[0])
+    assert model.candidate_build_ids[-2:] == ["b6", "b7"]
+    assert model.rating_model.trainable
+
+
+def test_hashed_incremental_update_fine_tunes():
+    calls = []
+
+    def spy(model, df, epochs=3):
+        calls.append(len(df))
+        return fine_tune_embeddings(model, df, epochs)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_path = os.path.join(tmp_dir, "users.db")
+        labeled_path = os.path.join(tmp_dir, "labeled_builds.csv")
+        model_path = os.path.join(tmp_dir, "tfrs_model.keras")
+        state_path = os.path.join(tmp_dir, "state.json")
+        pd.DataFrame({"build_id": BUILD_IDS}).to_csv(labeled_path, index=False)
+
+        old_df = make_ratings(1, 60, BUILD_IDS[:6])
+        write_ratings_db(db_path, old_df)
+        fit_model(old_df, epochs=1, hashed=True).save(model_path)
+        incremental.save_state({"version": 1, "last_rating_id": 60, "last_timestamp": "2025-05-01T10:00:00"},
+                               state_path)
+        write_ratings_db(db_path, make_ratings(61, 40, timestamp="2025-05-02T10:00:00"))
+
+        original, incremental.fine_tune_embeddings = incremental.fine_tune_embeddings, spy
+        try:
+            incremental.train_incremental(db_path, labeled_path, model_path, state_path,
+                                          os.path.join(tmp_dir, "versions"), epochs=1)
+        finally:
+            incremental.fine_tune_embeddings = original
+
+    #  40 new ratings, 8 of them (id % 5 == 0) held out, plus a replay sample of the old ones
+    assert len(calls) == 1 and calls[0] >= 32
+
+
+if __name__ == "__main__":
+    for test in (test_fine_tune_embeddings_updates_only_embeddings, test_hashed_incremental_update_fine_tunes):
+        test()
+        print(f" {test.__name__} passed")
@@ -9,6 +9,7 @@ It:
 - Normalizes feature data using MinMaxScaler.
 - Trains a RandomForestRegressor for predicting the best component configurations.
 - Saves the trained model and scaler for future predictions.
+- Exports the forest and scaler as flat NumPy arrays for recommender/forest_scorer.py.
 """
 
 import pandas as pd
@@ -17,6 +18,14 @@ import joblib
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.ensemble import RandomForestRegressor
 import os
+import sys
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from models.export_forest_numpy import export_forest_artifact
 
 #  Define dataset paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -104,4 +113,6 @@ model.fit(X, y)
 #  Save model
 joblib.dump(model, os.path.join(BASE_DIR, "models/sklearn_recommendation_model.pkl"))
 
+export_forest_artifact(model, scaler, os.path.join(BASE_DIR, "models/sklearn_recommendation_model.npz"))
+
 print(" Model training complete and saved!")
\ No newline at end of file
@@ -10,9 +10,11 @@ Features:
 - Trains an SVD model for collaborative filtering
 - Evaluates the model using RMSE, Precision@K, and Recall@K metrics
 - Saves the trained SVD model to disk for future use
+- Exports its factors and biases to svd_model.npz for NumPy serving (recommender/svd_ranker.py)
 """
 
 import os
+import sys
 import sqlite3
 import pandas as pd
 import pickle
@@ -21,6 +23,13 @@ from surprise import Dataset, Reader, SVD
 from surprise.model_selection import train_test_split
 from surprise import accuracy
 
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from models.export_svd_numpy import export_svd_artifact
+
 #  Load ratings from SQLite database
 DB_PATH = os.path.join(os.path.dirname(__file__), "..", "database", "users.db")
 
@@ -91,4 +100,7 @@ MODEL_PATH = os.path.join(os.path.dirname(__file__), "svd_model.pkl")
 with open(MODEL_PATH, "wb") as f:
     pickle.dump(model, f)
 
-print(f" SVD model trained and saved to: {MODEL_PATH}")
\ No newline at end of file
+print(f" SVD model trained and saved to: {MODEL_PATH}")
+
+#  Export factors for the SVD collaborative backend
+export_svd_artifact(model, os.path.join(os.path.dirname(__file__), "svd_model.npz"))
\ No newline at end of file
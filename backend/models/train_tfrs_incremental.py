@@ -0,0 +1,251 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-28
+Description:
+This script warm-starts the TFRS model from the current version instead of retraining from scratch.
+Features:
+- Reads only ratings added or updated since the last run (the (timestamp, id) watermark shared
+  with utils/export_ratings_incremental.py), filtered in SQL, and samples the replay set in SQL
+- Extends the user/build StringLookup vocabularies and embedding tables for new IDs,
+  keeping every existing row (hashed models only need new builds added to the candidates)
+- Trains on the new ratings plus a replay sample of older ones to avoid forgetting; hashed models
+  only fine-tune their embeddings (train_tfrs_model.fine_tune_embeddings), keeping the rating MLP fixed
+- Holds out the new ratings in the id-based holdout split and publishes only if the warm-started
+  model beats the mean-rating baseline and the live model on them
+- Saves each result as a new version under models/versions and publishes it (Keras + NumPy artifact)
+- Falls back to a full (streamed) train_model_from_db run when no model exists yet
+"""
+
+import os
+import sys
+import json
+import sqlite3
+import pandas as pd
+import numpy as np
+import tensorflow as tf
+from tensorflow.keras import layers
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from models.train_tfrs_model import (
+    BuildRankingModel, make_ratings_dataset, evaluate_rmse, fine_tune_embeddings, train_model_from_db
+)
+from models.export_tfrs_numpy import export_numpy_artifact
+from models.retrain_scheduler import RMSE_TOLERANCE
+from utils.export_ratings_incremental import NEW_RATINGS_CONDITION, watermark_params, advance_watermark
+
+#  Paths
+DB_PATH = os.path.join(BACKEND_DIR, "database", "users.db")
+LABELED_PATH = os.path.join(BACKEND_DIR, "data", "builds", "labeled_builds.csv")
+MODEL_PATH = os.path.join(BACKEND_DIR, "models", "tfrs_model.keras")
+VERSIONS_DIR = os.path.join(BACKEND_DIR, "models", "versions")
+STATE_PATH = os.path.join(BACKEND_DIR, "models", "tfrs_training_state.json")
+
+#  Older ratings replayed per new rating, and epochs over the (small) incremental dataset
+REPLAY_RATIO = 2.0
+INCREMENTAL_EPOCHS = 5
+#  Same id-based holdout as ratings_stream.HOLDOUT_SPLIT ("id % 5 = 0")
+HOLDOUT_MODULUS = 5
+
+
+def load_state(state_path: str = STATE_PATH) -> dict:
+    if not os.path.exists(state_path):
+        return {"version": 0, "last_rating_id": 0, "last_timestamp": "", "last_untimestamped_id": 0}
+    with open(state_path, "r") as f:
+        return json.load(f)
+
+
+def save_state(state: dict, state_path: str = STATE_PATH):
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def _known_builds(df: pd.DataFrame, valid_build_ids: set) -> pd.DataFrame:
+    df = df[df["build_id"].astype(str).isin(valid_build_ids)].copy()
+    df["user_id"] = df["user_id"].astype(str)
+    return df
+
+
+def load_ratings_since(db_path: str, labeled_path: str, state: dict, replay_ratio: float = REPLAY_RATIO):
+    """
+    Returns (new_ratings, replay_ratings) DataFrames restricted to known builds. Only ratings past
+    the watermark are read in full; the replay set is a random sample of the older ratings
+    (replay_ratio per new rating), drawn in SQL.
+    """
+    from models.ratings_stream import load_valid_build_ids
+
+    is_new = NEW_RATINGS_CONDITION
+    watermark = watermark_params(state)
+    conn = sqlite3.connect(db_path)
+    try:
+        new_df = pd.read_sql_query(
+            f"SELECT id, user_id, build_id, rating, timestamp FROM ratings WHERE {is_new}", conn, params=watermark
+        )
+        replay_size = int(len(new_df) * replay_ratio)
+        replay_df = pd.read_sql_query(
+            f"SELECT id, user_id, build_id, rating, timestamp FROM ratings WHERE NOT {is_new} "
+            "ORDER BY RANDOM() LIMIT ?", conn, params=(*watermark, replay_size)
+        )
+    finally:
+        conn.close()
+
+    valid_build_ids = load_valid_build_ids(labeled_path)
+    return _known_builds(new_df, valid_build_ids), _known_builds(replay_df, valid_build_ids)
+
+
+def current_watermark(db_path: str, state: dict) -> dict:
+    """Watermark past every rating in the table (used after a full training run)."""
+    conn = sqlite3.connect(db_path)
+    try:
+        latest = pd.read_sql_query(
+            "SELECT id, timestamp FROM ratings WHERE timestamp IS NOT NULL ORDER BY timestamp DESC, id DESC LIMIT 1",
+            conn
+        )
+        untimestamped = pd.read_sql_query(
+            "SELECT MAX(id) AS id, NULL AS timestamp FROM ratings WHERE timestamp IS NULL", conn
+        ).dropna(subset=["id"])
+    finally:
+        conn.close()
+    watermark = {key: state.get(key, 0) for key in ("last_rating_id", "last_untimestamped_id")}
+    watermark["last_timestamp"] = state["last_timestamp"]
+    return advance_watermark(watermark, pd.concat([latest, untimestamped]))
+
+
+def extend_lookup_model(lookup_model, new_ids):
+    """Returns a lookup + embedding model whose vocabulary also covers new_ids (old rows unchanged)."""
+    lookup, embedding = lookup_model.layers
+    vocabulary = [str(v) for v in lookup.get_vocabulary()[1:]]  # drop the OOV token
+    known = set(vocabulary)
+    added = [i for i in dict.fromkeys(str(i) for i in new_ids) if i not in known]
+    if not added:
+        return lookup_model, 0
+
+    old_weights = embedding.get_weights()[0]
+    new_rows = np.random.uniform(-0.05, 0.05, size=(len(added), old_weights.shape[1])).astype(np.float32)
+
+    extended = tf.keras.Sequential([
+        layers.StringLookup(vocabulary=vocabulary + added, mask_token=None),
+        layers.Embedding(len(vocabulary) + len(added) + 1, old_weights.shape[1])
+    ])
+    extended(tf.constant([vocabulary[0] if vocabulary else ""]))
+    extended.layers[1].set_weights([np.vstack([old_weights, new_rows])])
+    return extended, len(added)
+
+
+def copy_sub_model(sub_model):
+    """Clone of a user/build/rating sub-model with its current weights (no layers shared)."""
+    copy = tf.keras.models.clone_model(sub_model)
+    copy.set_weights(sub_model.get_weights())
+    return copy
+
+
+def warm_start_model(model, new_df):
+    """
+    Builds a model that continues from `model` with vocabularies covering new_df. Every sub-model
+    is a copy, so training it leaves `model` (the live model) unchanged for the holdout comparison.
+    """
+    hashed = not hasattr(model.user_model.layers[0], "get_vocabulary")
+    if hashed:
+        user_model, build_model = copy_sub_model(model.user_model), copy_sub_model(model.build_model)
+        candidates = list(model.candidate_build_ids)
+        known_builds = set(candidates)
+        candidates += [b for b in dict.fromkeys(new_df["build_id"].astype(str)) if b not in known_builds]
+        added_users = added_builds = 0
+    else:
+        user_model, added_users = extend_lookup_model(model.user_model, new_df["user_id"].unique())
+        build_model, added_builds = extend_lookup_model(model.build_model, new_df["build_id"].unique())
+        #  extend_lookup_model hands back the original sub-model when there are no new IDs
+        user_model = copy_sub_model(user_model) if user_model is model.user_model else user_model
+        build_model = copy_sub_model(build_model) if build_model is model.build_model else build_model
+        candidates = None
+
+    print(f" Warm start: {added_users} new users, {added_builds} new builds.")
+    warm_model = BuildRankingModel(user_model, build_model, copy_sub_model(model.rating_model),
+                                   candidate_build_ids=candidates)
+    warm_model.compile(optimizer=tf.keras.optimizers.Adagrad(learning_rate=0.05))
+    return warm_model
+
+
+def publish_version(model, version: int, model_path: str = MODEL_PATH, versions_dir: str = VERSIONS_DIR) -> str:
+    """Saves a numbered version, then atomically replaces the live model and its NumPy artifact."""
+    os.makedirs(versions_dir, exist_ok=True)
+    version_path = os.path.join(versions_dir, f"tfrs_model_v{version:04d}.keras")
+    model.save(version_path)
+
+    tmp_path = os.path.splitext(model_path)[0] + ".candidate.keras"
+    model.save(tmp_path)
+    os.replace(tmp_path, model_path)
+    export_numpy_artifact(model, os.path.splitext(model_path)[0] + ".npz")
+    print(f" Published TFRS model version {version} ({version_path})")
+    return version_path
+
+
+def validate_on_holdout(model, current, train_df, holdout_df, tolerance: float = RMSE_TOLERANCE) -> bool:
+    """
+    Holdout check for a warm-started model, mirroring retrain_scheduler.retrain_and_validate:
+    it must beat predicting the training mean for every held-out rating, and must not score
+    worse than the live model on the same ratings.
+    """
+    candidate_rmse = evaluate_rmse(model, holdout_df)
+    current_rmse = evaluate_rmse(current, holdout_df)
+    baseline_rmse = float(np.sqrt(((holdout_df["rating"] - train_df["rating"].mean()) ** 2).mean()))
+    print(f" Warm-start holdout RMSE: {candidate_rmse:.4f} "
+          f"(live model: {current_rmse:.4f}, mean-rating baseline: {baseline_rmse:.4f})")
+    return candidate_rmse <= min(baseline_rmse, current_rmse) * (1 + tolerance)
+
+
+def train_incremental(db_path=DB_PATH, labeled_path=LABELED_PATH, model_path=MODEL_PATH, state_path=STATE_PATH,
+                      versions_dir=VERSIONS_DIR, replay_ratio=REPLAY_RATIO, epochs=INCREMENTAL_EPOCHS) -> bool:
+    """Trains on ratings since the last run. Returns True if a new version was published."""
+    state = load_state(state_path)
+
+    if not os.path.exists(model_path):
+        print(" No existing model — running a full training instead.")
+        train_model_from_db(db_path, labeled_path, model_path)
+        state.update(current_watermark(db_path, state))
+    else:
+        new_df, replay_df = load_ratings_since(db_path, labeled_path, state, replay_ratio)
+        if new_df.empty:
+            print(" No new ratings since the last run.")
+            return False
+
+        #  New ratings in the id-based holdout split (ratings_stream.HOLDOUT_SPLIT) are kept out of training
+        in_holdout = new_df["id"] % HOLDOUT_MODULUS == 0
+        holdout_df, train_new_df = new_df[in_holdout], new_df[~in_holdout]
+        if holdout_df.empty or train_new_df.empty:
+            print(" Not enough new ratings for a holdout check yet — waiting for more.")
+            return False
+
+        current = tf.keras.models.load_model(model_path, custom_objects={"BuildRankingModel": BuildRankingModel})
+        model = warm_start_model(current, new_df)
+
+        train_df = pd.concat([train_new_df, replay_df])
+        print(f" Incremental training on {len(train_new_df)} new + {len(replay_df)} replayed ratings...")
+        if model.candidate_build_ids is not None:
+            #  Hashed tables already have rows for new IDs, so only the embeddings are updated
+            fine_tune_embeddings(model, train_df, epochs=epochs)
+        else:
+            model.fit(make_ratings_dataset(train_df), epochs=epochs)
+
+        if not validate_on_holdout(model, current, train_df, holdout_df):
+            #  The watermark stays put, so the next run retries with these ratings included
+            print(" Warm-started model rejected — keeping the current model.")
+            return False
+        publish_version(model, state["version"] + 1, model_path, versions_dir)
+
+        advance_watermark(state, new_df)
+
+    state["version"] += 1
+    save_state(state, state_path)
+    return True
+
+
+#  CLI usage
+if __name__ == "__main__":
+    train_incremental()
@@ -6,10 +6,13 @@ Description:
 This script trains a TensorFlow Recommenders (TFRS) model for learning user PC build preferences.
 Features:
 - Defines a BuildRankingModel using TensorFlow/Keras and TensorFlow Recommenders
-- Loads user rating data from CSV
+- Loads user rating data from CSV, or streams it straight from SQLite (train_model_from_db)
 - Trains a TFRS model to predict user preferences
 - Evaluates RMSE on training data
 - Saves the trained model for future recommendation use
+- Exports a NumPy copy of the weights for TensorFlow-free serving
+- Optionally uses fixed-size hashed embedding tables (--hashed or TFRS_HASHED_EMBEDDINGS=1)
+  and fine-tunes embeddings for new users/builds without rebuilding vocabularies
 """
 
 import os
@@ -31,15 +34,26 @@ if BACKEND_DIR not in sys.path:
 
 
 from utils.export_ratings_to_csv import export_ratings_to_csv
+from models.export_tfrs_numpy import export_numpy_artifact
+from models.ratings_stream import load_valid_build_ids, distinct_ids, make_ratings_dataset_from_db
+
+#  Hashed embedding settings: table sizes stay fixed however many users/builds exist.
+#  The salt selects Keras' SipHash-based hashing, which recommender/numpy_ranker.py reproduces.
+HASHED_EMBEDDINGS = os.environ.get("TFRS_HASHED_EMBEDDINGS", "0") == "1"
+USER_HASH_BUCKETS = 100_000
+BUILD_HASH_BUCKETS = 10_000
+HASH_SALT = [133, 137]
 
 # BuildRankingModel definition
 @register_keras_serializable()
 class BuildRankingModel(tfrs.models.Model):
-    def __init__(self, user_model=None, build_model=None, rating_model=None, **kwargs):
+    def __init__(self, user_model=None, build_model=None, rating_model=None, candidate_build_ids=None, **kwargs):
         super().__init__(**kwargs)
         self.user_model = user_model
         self.build_model = build_model
         self.rating_model = rating_model
+        #  Builds to rank when the build model is hashed (a StringLookup model uses its vocabulary)
+        self.candidate_build_ids = list(candidate_build_ids) if candidate_build_ids is not None else None
         self.task = tfrs.tasks.Ranking(
             loss=tf.keras.losses.MeanSquaredError(),
             metrics=[tf.keras.metrics.RootMeanSquaredError()]
@@ -55,8 +69,13 @@ class BuildRankingModel(tfrs.models.Model):
         predictions = self(features)
         return self.task(labels=labels, predictions=predictions)
 
+    def get_candidate_build_ids(self):
+        if self.candidate_build_ids is not None:
+            return self.candidate_build_ids
+        return self.build_model.layers[0].get_vocabulary()
+
     def recommend(self, user_ids, k=5):
-        build_ids = tf.convert_to_tensor(self.build_model.layers[0].get_vocabulary())
+        build_ids = tf.convert_to_tensor(self.get_candidate_build_ids())
         user_repeated = tf.repeat(user_ids, len(build_ids))
         build_tiled = tf.tile(build_ids, [len(user_ids)])
         predictions = self({
@@ -72,7 +91,8 @@ class BuildRankingModel(tfrs.models.Model):
         return {
             "user_model": tf.keras.utils.serialize_keras_object(self.user_model),
             "build_model": tf.keras.utils.serialize_keras_object(self.build_model),
-            "rating_model": tf.keras.utils.serialize_keras_object(self.rating_model)
+            "rating_model": tf.keras.utils.serialize_keras_object(self.rating_model),
+            "candidate_build_ids": list(self.candidate_build_ids) if self.candidate_build_ids is not None else None
         }
 
     @classmethod
@@ -80,59 +100,145 @@ class BuildRankingModel(tfrs.models.Model):
         return cls(
             user_model=tf.keras.utils.deserialize_keras_object(config["user_model"]),
             build_model=tf.keras.utils.deserialize_keras_object(config["build_model"]),
-            rating_model=tf.keras.utils.deserialize_keras_object(config["rating_model"])
+            rating_model=tf.keras.utils.deserialize_keras_object(config["rating_model"]),
+            candidate_build_ids=config.get("candidate_build_ids")
         )
 
-# Training function
-def train_model(csv_path, model_output_path):
-    df = pd.read_csv(csv_path)
-
-    user_ids = df["user_id"].astype(str).unique()
-    build_ids = df["build_id"].unique()
+# Model construction
+def build_model(user_ids, build_ids, hashed=False):
+    if hashed:
+        user_model = tf.keras.Sequential([
+            tf.keras.Input(shape=(), dtype=tf.string),
+            layers.Hashing(num_bins=USER_HASH_BUCKETS, salt=HASH_SALT),
+            layers.Embedding(USER_HASH_BUCKETS, 32)
+        ])
 
-    ratings_ds = tf.data.Dataset.from_tensor_slices({
-        "user_id": df["user_id"].astype(str),
-        "build_id": df["build_id"],
-        "rating": df["rating"]
-    }).shuffle(1000).batch(32)
+        build_model = tf.keras.Sequential([
+            tf.keras.Input(shape=(), dtype=tf.string),
+            layers.Hashing(num_bins=BUILD_HASH_BUCKETS, salt=HASH_SALT),
+            layers.Embedding(BUILD_HASH_BUCKETS, 32)
+        ])
+    else:
+        user_model = tf.keras.Sequential([
+            layers.StringLookup(vocabulary=user_ids, mask_token=None),
+            layers.Embedding(len(user_ids) + 1, 32)
+        ])
 
-    user_model = tf.keras.Sequential([
-        layers.StringLookup(vocabulary=user_ids, mask_token=None),
-        layers.Embedding(len(user_ids) + 1, 32)
-    ])
-
-    build_model = tf.keras.Sequential([
-        layers.StringLookup(vocabulary=build_ids, mask_token=None),
-        layers.Embedding(len(build_ids) + 1, 32)
-    ])
+        build_model = tf.keras.Sequential([
+            layers.StringLookup(vocabulary=build_ids, mask_token=None),
+            layers.Embedding(len(build_ids) + 1, 32)
+        ])
 
     rating_model = tf.keras.Sequential([
         layers.Dense(64, activation="relu"),
         layers.Dense(1)
     ])
 
-    model = BuildRankingModel(user_model, build_model, rating_model)
+    candidate_build_ids = [str(b) for b in build_ids] if hashed else None
+    model = BuildRankingModel(user_model, build_model, rating_model, candidate_build_ids=candidate_build_ids)
     model.compile(optimizer=tf.keras.optimizers.Adagrad(learning_rate=0.05))
+    return model
 
-    history = model.fit(ratings_ds, epochs=10)
+def make_ratings_dataset(df):
+    return tf.data.Dataset.from_tensor_slices({
+        "user_id": df["user_id"].astype(str),
+        "build_id": df["build_id"],
+        "rating": df["rating"]
+    }).shuffle(1000).batch(32)
 
+#  Fit a new model on a ratings DataFrame
+def fit_model(df, epochs=10, hashed=HASHED_EMBEDDINGS):
+    user_ids = df["user_id"].astype(str).unique()
+    build_ids = df["build_id"].unique()
 
-    #  Evaluate RMSE on the same data
-    print(" Evaluating RMSE on training ratings...")
+    model = build_model(user_ids, build_ids, hashed=hashed)
+    model.fit(make_ratings_dataset(df), epochs=epochs)
+    return model
+
+#  Fit a new model on a (streamed) ratings dataset with known vocabularies
+def fit_model_on_dataset(dataset, user_ids, build_ids, epochs=10, hashed=HASHED_EMBEDDINGS):
+    model = build_model(user_ids, build_ids, hashed=hashed)
+    model.fit(dataset, epochs=epochs)
+    return model
 
+#  Fine-tune embeddings on new ratings (hashed models only)
+def fine_tune_embeddings(model, df, epochs=3):
+    """
+    Trains only the user/build embeddings on the given ratings, keeping the rating MLP fixed.
+    With hashed tables, new IDs already have their own (bucketed) rows, so no vocabulary rebuild
+    or retrain from scratch is needed. New build IDs are added to the recommendation candidates.
+    """
+    if model.candidate_build_ids is None:
+        raise ValueError(" fine_tune_embeddings requires a model trained with hashed embeddings")
+
+    known_builds = set(model.candidate_build_ids)
+    new_builds = [str(b) for b in df["build_id"].unique() if str(b) not in known_builds]
+    model.candidate_build_ids.extend(new_builds)
+
+    model.rating_model.trainable = False
+    model.compile(optimizer=tf.keras.optimizers.Adagrad(learning_rate=0.05))
+    model.fit(make_ratings_dataset(df), epochs=epochs)
+    model.rating_model.trainable = True
+    model.compile(optimizer=tf.keras.optimizers.Adagrad(learning_rate=0.05))
+    print(f" Fine-tuned embeddings on {len(df)} ratings ({len(new_builds)} new builds).")
+    return model
+
+#  RMSE of a model's predictions on a ratings DataFrame
+def evaluate_rmse(model, df):
     true_ratings = df["rating"].tolist()
     predictions = model({
         "user_id": tf.convert_to_tensor(df["user_id"].astype(str)),
         "build_id": tf.convert_to_tensor(df["build_id"])
     }).numpy().flatten().tolist()
+    return float(np.sqrt(mean_squared_error(true_ratings, predictions)))
+
+#  RMSE over a batched ratings dataset, accumulated batch by batch
+def evaluate_rmse_on_dataset(model, dataset):
+    squared_error, count = 0.0, 0
+    for batch in dataset:
+        predictions = tf.reshape(model(batch), [-1])
+        squared_error += float(tf.reduce_sum(tf.square(predictions - batch["rating"])))
+        count += int(tf.size(predictions))
+    return float(np.sqrt(squared_error / count)) if count else 0.0
 
-    rmse = np.sqrt(mean_squared_error(true_ratings, predictions))
+# Training function
+def train_model(csv_path, model_output_path, hashed=HASHED_EMBEDDINGS):
+    df = pd.read_csv(csv_path)
+
+    model = fit_model(df, epochs=10, hashed=hashed)
+
+    #  Evaluate RMSE on the same data
+    print(" Evaluating RMSE on training ratings...")
+    rmse = evaluate_rmse(model, df)
     print(f" TFRS RMSE: {rmse:.4f}")
 
     # Save trained model
     model.save(model_output_path)
     print(f" TFRS model saved to: {model_output_path}")
 
+    #  Save the TensorFlow-free serving artifact alongside it
+    export_numpy_artifact(model, os.path.splitext(model_output_path)[0] + ".npz")
+
+
+#  Streaming training function (SQLite -> tf.data, no CSV or DataFrame of all ratings)
+def train_model_from_db(db_path, labeled_path, model_output_path, hashed=HASHED_EMBEDDINGS):
+    valid_build_ids = load_valid_build_ids(labeled_path)
+    user_ids, build_ids = distinct_ids(db_path, valid_build_ids)
+    if not user_ids or not build_ids:
+        raise ValueError(" No valid ratings found to train on.")
+
+    model = fit_model_on_dataset(
+        make_ratings_dataset_from_db(db_path, valid_build_ids), user_ids, build_ids, epochs=10, hashed=hashed
+    )
+
+    print(" Evaluating RMSE on training ratings...")
+    rmse = evaluate_rmse_on_dataset(model, make_ratings_dataset_from_db(db_path, valid_build_ids, shuffle=False))
+    print(f" TFRS RMSE: {rmse:.4f}")
+
+    model.save(model_output_path)
+    print(f" TFRS model saved to: {model_output_path}")
+    export_numpy_artifact(model, os.path.splitext(model_output_path)[0] + ".npz")
+
 
 #  CLI usage support
 if __name__ == "__main__":
@@ -140,9 +246,13 @@ if __name__ == "__main__":
     CSV_PATH = os.path.join("data", "ratings.csv")    
     MODEL_PATH = os.path.join("models", "tfrs_model.keras")
     LABELED_PATH = os.path.join("data", "builds", "labeled_builds.csv")
+    hashed = HASHED_EMBEDDINGS or "--hashed" in sys.argv
 
-    export_ratings_to_csv(DB_PATH, CSV_PATH, LABELED_PATH)
-    train_model(CSV_PATH, MODEL_PATH)
+    if "--from-csv" in sys.argv:
+        export_ratings_to_csv(DB_PATH, CSV_PATH, LABELED_PATH)
+        train_model(CSV_PATH, MODEL_PATH, hashed=hashed)
+    else:
+        train_model_from_db(DB_PATH, LABELED_PATH, MODEL_PATH, hashed=hashed)
 
 
 
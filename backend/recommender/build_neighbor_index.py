@@ -0,0 +1,92 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-05-01
+Description:
+This module indexes the labeled builds for nearest-neighbour queries over the scaled content features.
+Features:
+- Scales the build feature matrix once (the content MinMaxScaler) and keeps it sorted by price
+- "Builds under a price" is then a prefix of that order; the prefix is covered by at most
+  log2(n) KD-trees over aligned power-of-two blocks plus a brute-force tail of < LEAF_BLOCK rows
+- query() merges the per-tree top-k into the overall top-k and returns row positions and
+  distances, so callers pick records without copying or mutating the build frame
+"""
+
+import numpy as np
+from sklearn.neighbors import KDTree
+
+FEATURE_COLUMNS = ["cpu_score", "gpu_score", "ram_gb", "storage_gb", "price"]
+
+#  Smallest block with its own KD-tree; shorter tails are scanned directly
+LEAF_BLOCK = 64
+
+
+class BuildNeighborIndex:
+    """Top-k nearest builds (Euclidean, scaled features) with an optional price upper bound."""
+
+    def __init__(self, build_df, scaler, feature_columns=FEATURE_COLUMNS):
+        self.feature_columns = list(feature_columns)
+        self.scale = np.asarray(scaler.scale_, dtype=np.float64)
+        self.offset = np.asarray(scaler.min_, dtype=np.float64)
+
+        prices = build_df["price"].to_numpy(dtype=np.float64)
+        self.order = np.argsort(prices, kind="stable")
+        self.prices = prices[self.order]
+        self.features = self.transform(build_df[self.feature_columns].to_numpy(dtype=np.float64)[self.order])
+
+        #  KD-trees over the aligned blocks [start, start + size) that a prefix decomposition can use
+        self.trees = {}
+        size = LEAF_BLOCK
+        while size <= len(self.features):
+            for start in range(0, len(self.features) - size + 1, 2 * size):
+                self.trees[(start, size)] = KDTree(self.features[start:start + size])
+            size *= 2
+
+    def __len__(self):
+        return len(self.order)
+
+    def transform(self, rows) -> np.ndarray:
+        """MinMaxScaler.transform for rows in feature_columns order."""
+        return np.asarray(rows, dtype=np.float64) * self.scale + self.offset
+
+    def count_under(self, max_price: float) -> int:
+        return int(np.searchsorted(self.prices, max_price, side="right"))
+
+    def _prefix_blocks(self, stop: int):
+        """Aligned power-of-two blocks covering [0, stop), largest first, and the uncovered tail start."""
+        blocks, start = [], 0
+        size = LEAF_BLOCK
+        while size * 2 <= stop:
+            size *= 2
+        while size >= LEAF_BLOCK:
+            if start + size <= stop:
+                blocks.append((start, size))
+                start += size
+            size //= 2
+        return blocks, start
+
+    def query(self, features, k: int = 1, max_price: float = None):
+        """
+        (rows, distances) of the k builds nearest to a raw feature vector, nearest first;
+        rows index the original build frame. Only builds priced <= max_price are considered.
+        """
+        point = self.transform(np.asarray(features, dtype=np.float64).reshape(1, -1))
+        stop = len(self) if max_price is None else self.count_under(max_price)
+        if stop == 0 or k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+
+        blocks, tail = self._prefix_blocks(stop)
+        positions, distances = [], []
+        for start, size in blocks:
+            dist, idx = self.trees[(start, size)].query(point, k=min(k, size))
+            positions.append(idx[0] + start)
+            distances.append(dist[0])
+        if tail < stop:
+            positions.append(np.arange(tail, stop))
+            distances.append(np.linalg.norm(self.features[tail:stop] - point, axis=1))
+
+        positions, distances = np.concatenate(positions), np.concatenate(distances)
+        k = min(k, len(positions))
+        best = np.argpartition(distances, k - 1)[:k]
+        best = best[np.argsort(distances[best], kind="stable")]
+        return self.order[positions[best]], distances[best]
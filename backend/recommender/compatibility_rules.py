@@ -0,0 +1,189 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-30
+Description:
+This module compiles the rule-based compatibility checks into packed bitsets, once per catalog version.
+Features:
+- Rules: CPU x motherboard (socket, normalized as in the component matcher), motherboard x RAM
+  (memory type), motherboard x storage (interface), PSU x CPU / PSU x GPU (wattage >= TDP)
+- Each rule is a boolean matrix packed 8 components per byte (np.packbits), stored in both directions
+- Compiled bitsets are cached in models/compatibility_bitsets.npz and rebuilt when a catalog CSV changes
+- compatible_mask / compatible_parts: "all parts of a category compatible with X (and Y...)" by ANDing rows
+- is_valid_build: checks every rule between the parts of a build with single bit lookups
+"""
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+BITSET_CACHE_PATH = os.path.join(BASE_DIR, "models", "compatibility_bitsets.npz")
+
+CATALOG_CATEGORIES = ("cpu", "gpu", "motherboard", "ram_ddr4", "ram_ddr5", "storage", "power_supply")
+
+
+def normalize_socket(values) -> np.ndarray:
+    return (pd.Series(values).astype(str).str.upper().str.replace(" ", "", regex=False)
+            .str.replace("FCLGA", "LGA", regex=False).to_numpy())
+
+
+def _contains(values, containers) -> np.ndarray:
+    """values[i] in containers[j] for every (i, j), evaluated once per distinct pair of values."""
+    codes1, uniques1 = pd.factorize(pd.Series(values), use_na_sentinel=False)
+    codes2, uniques2 = pd.factorize(pd.Series(containers), use_na_sentinel=False)
+    table = np.array([[isinstance(a, str) and isinstance(b, str) and a in b for b in uniques2] for a in uniques1],
+                     dtype=bool).reshape(len(uniques1), len(uniques2))
+    return table[codes1[:, None], codes2[None, :]]
+
+
+def _socket_rule(cpu, motherboard):
+    return normalize_socket(cpu["socket"])[:, None] == normalize_socket(motherboard["socket"])[None, :]
+
+
+def _memory_rule(memory_type):
+    def rule(motherboard, ram):
+        supported = motherboard["memory_type"].astype(str).str.upper().str.contains(memory_type).to_numpy()
+        return np.repeat(supported[:, None], len(ram), axis=1)
+    return rule
+
+
+def _storage_rule(motherboard, storage):
+    return _contains(storage["interface_type"].to_numpy(), motherboard["storage_support"].to_numpy()).T
+
+
+def _wattage_rule(tdp_column):
+    def rule(power_supply, part):
+        #  An unknown wattage or TDP (NaN) compares False, i.e. incompatible
+        tdp = part[tdp_column].to_numpy(dtype=np.float64)
+        return power_supply["wattage_w"].to_numpy(dtype=np.float64)[:, None] >= tdp[None, :]
+    return rule
+
+
+#  (category_a, category_b) -> rule returning a len(a) x len(b) boolean matrix
+RULES = {
+    ("cpu", "motherboard"): _socket_rule,
+    ("motherboard", "ram_ddr4"): _memory_rule("DDR4"),
+    ("motherboard", "ram_ddr5"): _memory_rule("DDR5"),
+    ("motherboard", "storage"): _storage_rule,
+    ("power_supply", "cpu"): _wattage_rule("tdp"),
+    ("power_supply", "gpu"): _wattage_rule("tdp_w"),
+}
+
+
+def _catalog_paths(data_dir: str) -> dict:
+    paths = {category: os.path.join(data_dir, f"preprocessed_filtered_{category}.csv")
+             for category in CATALOG_CATEGORIES}
+    return {category: path for category, path in paths.items() if os.path.exists(path)}
+
+
+def compile_bitsets(catalog: dict) -> dict:
+    """Evaluates every rule whose categories are in the catalog and packs the results."""
+    frames = {category: pd.read_csv(path) for category, path in catalog.items()}
+    arrays = {f"{category}_names": df["name"].astype(str).to_numpy(dtype=str) for category, df in frames.items()}
+    for (category_a, category_b), rule in RULES.items():
+        if category_a not in frames or category_b not in frames:
+            continue
+        matrix = rule(frames[category_a], frames[category_b])
+        arrays[f"rule__{category_a}__{category_b}"] = np.packbits(matrix, axis=1)
+        arrays[f"rule__{category_b}__{category_a}"] = np.packbits(matrix.T, axis=1)
+    return arrays
+
+
+class CompatibilityRules:
+    """Query API over the compiled compatibility bitsets."""
+
+    def __init__(self, data_dir: str = DATA_DIR, cache_path: str = BITSET_CACHE_PATH):
+        self.data_dir = data_dir
+        self.cache_path = cache_path
+        self.names = {}
+        self.name_index = {}
+        self.bitsets = {}
+        self.loaded = False
+        self._lock = threading.Lock()
+
+    def _cache_is_current(self, catalog: dict) -> bool:
+        if not os.path.exists(self.cache_path):
+            return False
+        cache_mtime = os.path.getmtime(self.cache_path)
+        return all(os.path.getmtime(path) <= cache_mtime for path in catalog.values())
+
+    def load(self):
+        with self._lock:
+            if self.loaded:
+                return self
+            from models.export_tfrs_numpy import save_artifact
+
+            catalog = _catalog_paths(self.data_dir)
+            if not self._cache_is_current(catalog):
+                save_artifact(compile_bitsets(catalog), self.cache_path)
+                print(f" Compatibility bitsets compiled: {self.cache_path}")
+
+            with np.load(self.cache_path) as data:
+                for key in data.files:
+                    if key.startswith("rule__"):
+                        _, category_a, category_b = key.split("__")
+                        self.bitsets[(category_a, category_b)] = data[key]
+                    elif key.endswith("_names"):
+                        self.names[key[:-len("_names")]] = data[key]
+            for category, names in self.names.items():
+                index = {}
+                for i, name in enumerate(names.tolist()):
+                    index.setdefault(name, i)
+                self.name_index[category] = index
+            self.loaded = True
+        return self
+
+    def row(self, category: str, name: str) -> int:
+        self.load()
+        if category not in self.name_index:
+            raise KeyError(f"Unknown component category: {category}")
+        if name not in self.name_index[category]:
+            raise KeyError(f"Unknown {category} component: {name}")
+        return self.name_index[category][name]
+
+    def has_rule(self, category_a: str, category_b: str) -> bool:
+        return (category_a, category_b) in self.load().bitsets
+
+    def is_compatible(self, category_a: str, name_a: str, category_b: str, name_b: str) -> bool:
+        """True when no rule links the two categories."""
+        if not self.has_rule(category_a, category_b):
+            return True
+        row, column = self.row(category_a, name_a), self.row(category_b, name_b)
+        return bool(self.bitsets[(category_a, category_b)][row, column >> 3] & (0x80 >> (column & 7)))
+
+    def compatible_mask(self, target_category: str, constraints: dict) -> np.ndarray:
+        """
+        Boolean mask over target_category rows (catalog CSV order) compatible with every
+        {category: name} constraint; constraints without a rule to the target are ignored.
+        """
+        self.load()
+        if target_category not in self.names:
+            raise KeyError(f"Unknown component category: {target_category}")
+        n_targets = len(self.names[target_category])
+        packed = np.full((n_targets + 7) // 8, 0xFF, dtype=np.uint8)
+        for category, name in constraints.items():
+            if self.has_rule(category, target_category):
+                packed &= self.bitsets[(category, target_category)][self.row(category, name)]
+        return np.unpackbits(packed, count=n_targets).astype(bool)
+
+    def compatible_parts(self, target_category: str, constraints: dict) -> list:
+        """Names of target_category parts compatible with every constraint."""
+        mask = self.compatible_mask(target_category, constraints)  # loads the bitsets first
+        return self.names[target_category][mask].tolist()
+
+    def is_valid_build(self, build: dict) -> tuple:
+        """Checks every rule between the parts of {category: name}; returns (valid, violations)."""
+        violations = []
+        parts = list(build.items())
+        for i, (category_a, name_a) in enumerate(parts):
+            for category_b, name_b in parts[i + 1:]:
+                if not self.is_compatible(category_a, name_a, category_b, name_b):
+                    violations.append({category_a: name_a, category_b: name_b})
+        return not violations, violations
+
+
+#  Shared instance
+compatibility_rules = CompatibilityRules()
@@ -0,0 +1,196 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-30
+Description:
+This module scores component compatibility with the trained Siamese network, without TensorFlow.
+Features:
+- Runs the shared encoder once per catalog component (NumPy, from models/export_siamese_numpy.py;
+  float32 or int8 weight artifacts — int8 is a storage format, inference always runs in float32)
+  and caches the embeddings next to the model (siamese_embeddings.npz), rebuilt only when the
+  model artifact or a catalog CSV changes
+- Scores candidates with the L1-distance head only: sigmoid(|e_a - e_b| . w + b)
+- Scores one component against many (e.g. one CPU against every motherboard) in a single batch,
+  and arbitrary lists of pairs grouped by category pair
+- Components are looked up by name (the first row wins for duplicated names)
+"""
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+from models.siamese_pairs import FEATURE_COLUMNS, feature_matrix
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+SIAMESE_ARTIFACT_PATH = os.path.join(BASE_DIR, "models", "full_siamese_network_model.npz")
+EMBEDDING_CACHE_PATH = os.path.join(BASE_DIR, "models", "siamese_embeddings.npz")
+
+#  Pairs scored per matrix operation (bounds the pairs x embedding_dim intermediate)
+SCORE_BATCH_SIZE = 16384
+
+
+class SiameseEncoder:
+    """NumPy copy of the Siamese shared encoder and L1-distance head."""
+
+    def __init__(self, head_kernel, head_bias, **encoder_arrays):
+        n_layers = len([key for key in encoder_arrays if key.startswith("encoder_bias_")])
+        #  int8 kernels (see export_siamese_numpy.quantize_siamese_weights) are dequantized once here
+        self.kernels = [encoder_arrays[f"encoder_kernel_{i}"].astype(np.float32)
+                        * encoder_arrays.get(f"encoder_kernel_{i}_scales", np.float32(1.0))
+                        for i in range(n_layers)]
+        self.biases = [encoder_arrays[f"encoder_bias_{i}"] for i in range(n_layers)]
+        self.head_kernel = head_kernel[:, 0]
+        self.head_bias = float(head_bias[0])
+        self.input_dim = self.kernels[0].shape[0]
+
+    @property
+    def weight_bytes(self) -> int:
+        """Bytes of the weights held in memory (float32, whatever the artifact stored)."""
+        return (sum(kernel.nbytes + bias.nbytes for kernel, bias in zip(self.kernels, self.biases))
+                + self.head_kernel.nbytes + 8)
+
+    @classmethod
+    def load(cls, artifact_path: str):
+        with np.load(artifact_path) as data:
+            return cls(**{key: data[key] for key in data.files})
+
+    def encode(self, features) -> np.ndarray:
+        hidden = np.asarray(features, dtype=np.float32)
+        for kernel, bias in zip(self.kernels, self.biases):
+            hidden = np.maximum(hidden @ kernel + bias, 0.0)
+        return hidden
+
+    def _head(self, distances) -> np.ndarray:
+        #  Sigmoid written with tanh so large logits don't overflow exp
+        return 0.5 * (1.0 + np.tanh(0.5 * (distances @ self.head_kernel + self.head_bias)))
+
+    def score_pairs(self, embeddings_a, embeddings_b) -> np.ndarray:
+        """Compatibility for aligned pairs (row i of a with row i of b)."""
+        return self._head(np.abs(embeddings_a - embeddings_b))
+
+    def score_matrix(self, embeddings_a, embeddings_b) -> np.ndarray:
+        """Compatibility for every (a, b) combination, shape (len(a), len(b))."""
+        scores = np.empty((len(embeddings_a), len(embeddings_b)), dtype=np.float32)
+        rows_per_batch = max(1, SCORE_BATCH_SIZE // max(1, len(embeddings_b)))
+        for start in range(0, len(embeddings_a), rows_per_batch):
+            block = embeddings_a[start:start + rows_per_batch]
+            scores[start:start + rows_per_batch] = self._head(np.abs(block[:, None, :] - embeddings_b[None, :, :]))
+        return scores
+
+
+def _catalog_paths(data_dir: str) -> dict:
+    paths = {category: os.path.join(data_dir, f"preprocessed_filtered_{category}.csv") for category in FEATURE_COLUMNS}
+    return {category: path for category, path in paths.items() if os.path.exists(path)}
+
+
+class CompatibilityScorer:
+    """Catalog-wide compatibility scoring from cached encoder embeddings."""
+
+    def __init__(self, artifact_path: str = SIAMESE_ARTIFACT_PATH, data_dir: str = DATA_DIR,
+                 cache_path: str = EMBEDDING_CACHE_PATH):
+        self.artifact_path = artifact_path
+        self.data_dir = data_dir
+        self.cache_path = cache_path
+        self.encoder = None
+        self.names = {}
+        self.embeddings = {}
+        self.name_index = {}
+        self._lock = threading.Lock()
+
+    def _cache_is_current(self, catalog: dict) -> bool:
+        if not os.path.exists(self.cache_path):
+            return False
+        cache_mtime = os.path.getmtime(self.cache_path)
+        sources = [self.artifact_path] + list(catalog.values())
+        return all(os.path.getmtime(path) <= cache_mtime for path in sources)
+
+    def _build_cache(self, encoder: SiameseEncoder, catalog: dict):
+        from models.export_tfrs_numpy import save_artifact
+
+        arrays = {}
+        for category, path in catalog.items():
+            df = pd.read_csv(path)
+            features = np.nan_to_num(feature_matrix(df, category))
+            arrays[f"{category}_names"] = df["name"].astype(str).to_numpy(dtype=str)
+            arrays[f"{category}_embeddings"] = encoder.encode(features)
+        save_artifact(arrays, self.cache_path)
+        print(f" Siamese embeddings cached for {len(catalog)} categories: {self.cache_path}")
+
+    def load(self):
+        """Loads the encoder and the catalog embeddings, recomputing them if the cache is stale."""
+        with self._lock:
+            if self.encoder is not None:
+                return self
+            encoder = SiameseEncoder.load(self.artifact_path)
+            catalog = _catalog_paths(self.data_dir)
+            if not self._cache_is_current(catalog):
+                self._build_cache(encoder, catalog)
+
+            with np.load(self.cache_path) as data:
+                for category in catalog:
+                    self.names[category] = data[f"{category}_names"]
+                    self.embeddings[category] = data[f"{category}_embeddings"]
+            for category, names in self.names.items():
+                index = {}
+                for i, name in enumerate(names.tolist()):
+                    index.setdefault(name, i)
+                self.name_index[category] = index
+            self.encoder = encoder
+        return self
+
+    def start(self):
+        """Warms the embedding cache in the background."""
+        threading.Thread(target=self.load, name="compatibility-warmup", daemon=True).start()
+
+    def categories(self) -> list:
+        return sorted(self.load().names)
+
+    def _rows(self, category: str, names) -> np.ndarray:
+        if category not in self.name_index:
+            raise KeyError(f"Unknown component category: {category}")
+        index = self.name_index[category]
+        missing = [name for name in names if name not in index]
+        if missing:
+            raise KeyError(f"Unknown {category} component(s): {missing[:5]}")
+        return np.array([index[name] for name in names], dtype=np.int64)
+
+    def score_against(self, category: str, name: str, candidate_category: str, candidate_names=None,
+                      top_k: int = None) -> list:
+        """Scores one component against many candidates (all of candidate_category by default)."""
+        self.load()
+        anchor_rows = self._rows(category, [name])
+        if candidate_names is None:
+            if candidate_category not in self.names:
+                raise KeyError(f"Unknown component category: {candidate_category}")
+            rows = np.arange(len(self.names[candidate_category]))
+        else:
+            rows = self._rows(candidate_category, candidate_names)
+
+        anchor = self.embeddings[category][anchor_rows]
+        scores = self.encoder.score_matrix(anchor, self.embeddings[candidate_category][rows])[0]
+        order = np.argsort(-scores, kind="stable")
+        if top_k:
+            order = order[:top_k]
+        names = self.names[candidate_category]
+        return [{"name": str(names[rows[i]]), "score": float(scores[i])} for i in order]
+
+    def score_pairs(self, pairs) -> list:
+        """Scores (category_a, name_a, category_b, name_b) tuples, batched per category pair."""
+        self.load()
+        scores = np.zeros(len(pairs), dtype=np.float32)
+        groups = {}
+        for i, (category_a, name_a, category_b, name_b) in enumerate(pairs):
+            groups.setdefault((category_a, category_b), []).append((i, name_a, name_b))
+
+        for (category_a, category_b), items in groups.items():
+            positions, names_a, names_b = zip(*items)
+            rows_a, rows_b = self._rows(category_a, names_a), self._rows(category_b, names_b)
+            embeddings_a, embeddings_b = self.embeddings[category_a][rows_a], self.embeddings[category_b][rows_b]
+            scores[list(positions)] = self.encoder.score_pairs(embeddings_a, embeddings_b)
+        return scores.tolist()
+
+
+#  Shared instance used by the API
+compatibility_scorer = CompatibilityScorer()
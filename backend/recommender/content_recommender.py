@@ -5,7 +5,10 @@ Date Created: 2025-04-07
 Description:
 This module generates content-based PC build recommendations.
 Features:
-- Uses cosine similarity on labeled builds to recommend based on user features
+- Recommends the labeled builds nearest to user features (scaled Euclidean distance) from a
+  price-bounded KD-tree index built once at load (recommender/build_neighbor_index.py)
+- Re-ranks a wider set of nearest builds with the NumPy RandomForest scorer
+  (recommender/forest_scorer.py) when its artifact is available
 - Assembles manual builds under budget constraints for non-gaming use cases
 - Ensures CPU-Motherboard-RAM compatibility when building manually
 """
@@ -14,6 +17,8 @@ import os
 import joblib
 import pandas as pd
 import numpy as np
+from recommender.build_neighbor_index import BuildNeighborIndex, FEATURE_COLUMNS
+from recommender.forest_scorer import forest_backend
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SCALER_PATH = os.path.join(BASE_DIR, "models", "content_scaler.pkl")
@@ -23,7 +28,14 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 scaler = joblib.load(SCALER_PATH)
 build_df = pd.read_csv(BUILD_DATA_PATH)
 
-FEATURE_COLUMNS = ["cpu_score", "gpu_score", "ram_gb", "storage_gb", "price"]
+#  Scaled build features and the neighbour index are built once; queries return row positions
+build_index = BuildNeighborIndex(build_df, scaler)
+build_records = build_df.to_dict(orient="records")
+
+#  Nearest builds fetched per requested result, then re-ranked by the RandomForest build scorer
+RERANK_CANDIDATES_PER_RESULT = 5
+#  Forest features that labeled builds carry under other names (other component prices are unknown)
+FOREST_FEATURE_COLUMNS = {"cpu_performance_score": "cpu_score", "gpu_performance_score": "gpu_score"}
 
 component_files = {
     "cpu": "preprocessed_filtered_cpu.csv",
@@ -48,20 +60,22 @@ PART_MAPPING = {
     "storage": "Storage",
 }
 
-def recommend_build_from_features(user_features=None, use_case=None, budget=None, allocation=None, top_k=1):
+def recommend_build_from_features(user_features=None, use_case=None, budget=None, allocation=None, top_k=1,
+                                  rerank=True):
     if user_features:
-        input_df = pd.DataFrame([user_features])
-        scaled_input = scaler.transform(input_df)
-        filtered_builds = build_df[build_df["price"] <= user_features["price"]]
-        if filtered_builds.empty:
+        features = [user_features[column] for column in FEATURE_COLUMNS]
+        rerank = rerank and forest_backend.is_ready()
+        k = top_k * RERANK_CANDIDATES_PER_RESULT if rerank else top_k
+        rows, distances = build_index.query(features, k=k, max_price=user_features["price"])
+        if len(rows) == 0:
             print(" No builds under budget found — using full list as fallback.")
-            filtered_builds = build_df
-
-        scaled_builds = scaler.transform(filtered_builds[FEATURE_COLUMNS])
-        distances = np.linalg.norm(scaled_builds - scaled_input, axis=1)
-        filtered_builds["similarity"] = -distances
-        top_builds = filtered_builds.sort_values("similarity", ascending=False).head(top_k)
-        return top_builds.to_dict(orient="records")
+            rows, distances = build_index.query(features, k=k)
+        candidates = [{**build_records[row], "similarity": -float(distance)} for row, distance in zip(rows, distances)]
+        if not rerank:
+            return candidates
+        #  Nearest first among equal scores (the sort is stable)
+        return forest_backend.rank_builds(candidates, user_features["price"], k=top_k,
+                                          feature_columns=FOREST_FEATURE_COLUMNS)
 
     if use_case and budget and allocation:
         #  Load component datasets
@@ -0,0 +1,129 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-05-01
+Description:
+This module serves the RandomForest build scorer from flattened NumPy trees, without sklearn.
+Features:
+- Loads the .npz artifact written by models/export_forest_numpy.py
+- Walks all trees for a whole batch of builds at once: one gather/compare/select step per tree level
+  over a (trees x builds) array of node positions, instead of per-row sklearn calls
+- Applies the bundled MinMaxScaler, so candidate builds are given as raw feature values
+- rank_builds scores candidate builds (dicts keyed by feature name, e.g. "cpu_performance_score",
+  or mapped via feature_columns) for a budget and returns them best first; used to re-rank the
+  content recommender's nearest builds
+- ForestBackend reloads the artifact when the file changes
+"""
+
+import os
+import threading
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FOREST_ARTIFACT_PATH = os.path.join(BACKEND_DIR, "models", "sklearn_recommendation_model.npz")
+
+#  Builds traversed per step (bounds the trees x builds node-index array)
+SCORE_BATCH_SIZE = 8192
+
+
+class ForestBuildScorer:
+    """Vectorized RandomForestRegressor inference over flat node arrays."""
+
+    def __init__(self, node_feature, node_threshold, node_left, node_right, node_value, tree_roots, max_depth,
+                 feature_names, scaler_scale, scaler_min):
+        self.node_feature = np.asarray(node_feature, dtype=np.intp)
+        self.node_threshold = np.asarray(node_threshold, dtype=np.float64)
+        self.node_left = np.asarray(node_left, dtype=np.intp)
+        self.node_right = np.asarray(node_right, dtype=np.intp)
+        self.node_value = np.asarray(node_value, dtype=np.float64)
+        self.tree_roots = np.asarray(tree_roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.feature_names = [str(name) for name in feature_names]
+        self.scaler_scale = np.asarray(scaler_scale, dtype=np.float64)
+        self.scaler_min = np.asarray(scaler_min, dtype=np.float64)
+
+    @classmethod
+    def load(cls, artifact_path: str):
+        with np.load(artifact_path) as data:
+            return cls(**{key: data[key] for key in data.files})
+
+    def _predict_block(self, rows) -> np.ndarray:
+        #  sklearn compares float32 inputs against float64 thresholds; do the same for identical splits
+        columns = np.ascontiguousarray(np.asarray(rows, dtype=np.float32).astype(np.float64).T)
+        builds = np.arange(columns.shape[1])[None, :]
+        nodes = np.repeat(self.tree_roots[:, None], columns.shape[1], axis=1)
+        for _ in range(self.max_depth):
+            go_left = columns[self.node_feature[nodes], builds] <= self.node_threshold[nodes]
+            nodes = np.where(go_left, self.node_left[nodes], self.node_right[nodes])
+        return self.node_value[nodes].mean(axis=0)
+
+    def predict_scaled(self, rows) -> np.ndarray:
+        """Forest predictions for already-scaled feature rows, shape (n_builds,)."""
+        rows = np.asarray(rows)
+        scores = np.empty(len(rows), dtype=np.float64)
+        for start in range(0, len(rows), SCORE_BATCH_SIZE):
+            scores[start:start + SCORE_BATCH_SIZE] = self._predict_block(rows[start:start + SCORE_BATCH_SIZE])
+        return scores
+
+    def predict(self, raw_rows) -> np.ndarray:
+        """Forest predictions for raw feature rows (columns in feature_names order)."""
+        return self.predict_scaled(np.asarray(raw_rows, dtype=np.float64) * self.scaler_scale + self.scaler_min)
+
+    def feature_rows(self, builds: list, budget: float, feature_columns: dict = None) -> np.ndarray:
+        """
+        Raw feature matrix for candidate builds; budget fills the "budget" column and
+        features a build doesn't specify take the scaler's minimum (0 after scaling).
+        feature_columns maps feature names to differently named build keys
+        (e.g. {"cpu_performance_score": "cpu_score"}).
+        """
+        feature_columns = feature_columns or {}
+        keys = [feature_columns.get(name, name) for name in self.feature_names]
+        frame = pd.DataFrame.from_records(builds).reindex(columns=keys)
+        rows = frame.apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64)
+        rows = np.where(np.isnan(rows), -self.scaler_min / self.scaler_scale, rows)
+        if "budget" in self.feature_names:
+            rows[:, self.feature_names.index("budget")] = budget
+        return rows
+
+    def rank_builds(self, builds: list, budget: float, k: int = None, feature_columns: dict = None) -> list:
+        """Candidate builds sorted by learned score (best first), each with a "score" key added."""
+        if not builds:
+            return []
+        scores = self.predict(self.feature_rows(builds, budget, feature_columns))
+        order = np.argsort(-scores, kind="stable")
+        if k:
+            order = order[:k]
+        return [{**builds[i], "score": float(scores[i])} for i in order]
+
+
+class ForestBackend:
+    """Shared forest scorer; reloads the artifact when the file changes."""
+
+    def __init__(self, artifact_path: str = FOREST_ARTIFACT_PATH):
+        self.artifact_path = artifact_path
+        self.scorer = None
+        self.loaded_mtime = None
+        self._lock = threading.Lock()
+
+    def _current(self):
+        try:
+            mtime = os.path.getmtime(self.artifact_path)
+        except OSError:
+            return self.scorer
+        if mtime != self.loaded_mtime:
+            with self._lock:
+                if mtime != self.loaded_mtime:
+                    self.scorer = ForestBuildScorer.load(self.artifact_path)
+                    self.loaded_mtime = mtime
+        return self.scorer
+
+    def is_ready(self) -> bool:
+        return self._current() is not None
+
+    def rank_builds(self, builds: list, budget: float, k: int = None, feature_columns: dict = None) -> list:
+        return self._current().rank_builds(builds, budget, k, feature_columns)
+
+
+#  Shared instance
+forest_backend = ForestBackend()
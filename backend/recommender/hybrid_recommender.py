@@ -5,10 +5,14 @@ Date Created: 2025-04-08
 Description:
 This module generates hybrid PC build recommendations by combining content-based and collaborative filtering.
 Features:
-- Loads trained TensorFlow Recommenders (TFRS) model and labeled build data
+- Uses the TFRS model once the model manager has loaded it in the background, and labeled build data
 - Supports recommendations based on budget, use case, and game requirements
 - Matches gaming queries to TF-IDF or Steam API requirements
-- Provides top-k collaborative filtering fallback recommendations
+- Provides top-k collaborative filtering fallback recommendations from a pluggable backend:
+  "tfrs" (model_manager) or "svd" (factor model), chosen per deployment (COLLAB_BACKEND)
+  or per request ("collab_backend" in the request body); responses name the source actually used
+  ("collaborative_source": the backend, or "popularity" when it wasn't ready or the user is unknown)
+- Serves guest and cold-start users from a precomputed popularity ranking without model inference
 - Finalizes and formats the recommended PC builds with component details and total price
 """
 
@@ -17,9 +21,7 @@ import os
 import sys
 import json
 import pandas as pd
-import tensorflow as tf
 import uuid
-from tensorflow.keras.models import load_model
 
 #  Set up paths
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -27,21 +29,34 @@ BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
 sys.path.append(BACKEND_DIR)
 
 #  Imports
-from models.train_tfrs_check import train_if_needed
 from recommender.tfidf_game_matcher import find_best_matching_game, update_tfidf_model
 from recommender.budget_allocator import get_budget_allocation
 from recommender.content_recommender import recommend_build_from_features
 from utils.component_matcher import match_requirements_to_components
 from utils.steam_api_fetcher import get_game_system_requirements, save_game_requirements
 from utils.fallback_filler import fill_missing_components, component_data
-from models.train_tfrs_model import BuildRankingModel
+from recommender.popularity_recommender import get_popular_builds
+from recommender.model_manager import model_manager
+from recommender.svd_ranker import svd_backend
 
-#  Load models and builds
-train_if_needed()
+#  Load builds (the TFRS model is loaded by model_manager, started from main.py)
 LABELED_PATH = os.path.join(BACKEND_DIR, "data", "builds", "labeled_builds.csv")
 build_df = pd.read_csv(LABELED_PATH)
-TFRS_MODEL_PATH = os.path.join(BACKEND_DIR, "models", "tfrs_model.keras")
-tfrs_model = load_model(TFRS_MODEL_PATH, custom_objects={"BuildRankingModel": BuildRankingModel})
+
+#  Collaborative backends: each provides is_ready(), is_known_user(user_id) and recommend(user_id, k)
+COLLAB_BACKENDS = {
+    "tfrs": model_manager,
+    "svd": svd_backend,
+}
+COLLAB_BACKEND = os.environ.get("COLLAB_BACKEND", "tfrs")
+
+def get_collab_backend(name: str = None):
+    """Returns (name, backend) for the named backend, falling back to the deployment default for unknown names."""
+    if name not in COLLAB_BACKENDS:
+        if name:
+            print(f" Unknown collaborative backend '{name}' — using '{COLLAB_BACKEND}'")
+        name = COLLAB_BACKEND
+    return name, COLLAB_BACKENDS[name]
 
 #  Calculate real-world total cost
 def calculate_real_total_cost(build: dict) -> float:
@@ -87,11 +102,20 @@ def clean_and_finalize_recommendation(build: dict, budget: float, allocation: di
         "total_cost": round(total_cost, 2)
     }
 
-#  Collaborative recommendations
-def get_top_k_collab_builds(user_id: str, budget: float, k=3):
+#  Collaborative recommendations: {"collaborative_top_k": builds, "collaborative_source": source used}
+def get_top_k_collab_builds(user_id: str, budget: float, k=3, backend: str = None) -> dict:
+    backend_name, collab_backend = get_collab_backend(backend)
+
+    #  Guests and users unseen at training time would only hit the OOV embedding;
+    #  the same model-free ranking is served while the model is still loading (or missing)
+    if not collab_backend.is_ready():
+        print(f" Warning: collaborative backend '{backend_name}' is not ready — serving popular builds")
+        return {"collaborative_top_k": get_popular_builds(k=k), "collaborative_source": "popularity"}
+    if not collab_backend.is_known_user(user_id):
+        return {"collaborative_top_k": get_popular_builds(k=k), "collaborative_source": "popularity"}
+
     try:
-        _, top_build_ids_tensor = tfrs_model.recommend(tf.constant([user_id]), k=k)
-        top_build_ids = [b.decode().strip() for b in top_build_ids_tensor[0].numpy()]
+        top_build_ids = collab_backend.recommend(user_id, k=k)
         
         collab_builds = []
         for bid in top_build_ids:
@@ -103,10 +127,10 @@ def get_top_k_collab_builds(user_id: str, budget: float, k=3):
                     "gpu": row.iloc[0]["gpu_name"],
                     "price": round(row.iloc[0]["price"], 2)
                 })
-        return collab_builds
+        return {"collaborative_top_k": collab_builds, "collaborative_source": backend_name}
     except Exception as e:
         print(f" Collaborative filtering failed: {e}")
-        return []
+        return {"collaborative_top_k": [], "collaborative_source": backend_name}
 
 #  Hybrid recommender main logic
 def get_hybrid_recommendation(user_input: dict) -> dict:
@@ -114,6 +138,7 @@ def get_hybrid_recommendation(user_input: dict) -> dict:
     query = user_input.get("query", "general").lower()
     user_id = str(user_input.get("user_id", "guest"))
     mode = user_input.get("mode", "hybrid")
+    collab_backend = user_input.get("collab_backend")
 
     print(f"🔍 Normalized query = {query}")
 
@@ -121,7 +146,7 @@ def get_hybrid_recommendation(user_input: dict) -> dict:
         return {
             "use_case": query,
             "mode": "collaborative",
-            "collaborative_top_k": get_top_k_collab_builds(user_id, budget)
+            **get_top_k_collab_builds(user_id, budget, backend=collab_backend)
         }
 
     NON_GAMING_QUERIES = ["general", "work", "school"]
@@ -144,7 +169,7 @@ def get_hybrid_recommendation(user_input: dict) -> dict:
         }
 
         if mode == "hybrid":
-            result["collaborative_top_k"] = get_top_k_collab_builds(user_id, budget)
+            result.update(get_top_k_collab_builds(user_id, budget, backend=collab_backend))
 
         return result
 
@@ -203,6 +228,6 @@ def get_hybrid_recommendation(user_input: dict) -> dict:
     }
 
     if mode == "hybrid":
-        result["collaborative_top_k"] = get_top_k_collab_builds(user_id, budget)
+        result.update(get_top_k_collab_builds(user_id, budget, backend=collab_backend))
 
     return result
\ No newline at end of file
@@ -0,0 +1,234 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-24
+Description:
+This module manages the lifecycle of the TFRS collaborative filtering model.
+Features:
+- Loads the TFRS model in a background thread so the API can start immediately
+- Trains a missing model in a separate process instead of at import time
+- Reports readiness (loading, training, ready, failed) for the /health/ready probe
+- Lets the recommender check for a ready model without blocking requests
+- Watches the model file and hot-swaps retrained models after warming them up
+- Serves from the TensorFlow-free NumPy artifact by default (TFRS_SERVING_BACKEND=tensorflow to opt out),
+  exporting it once from the Keras model if it is missing or stale
+- Optionally serves float16/int8 embedding tables (TFRS_EMBEDDING_PRECISION), quantized from the float32 artifact
+"""
+
+import os
+import sys
+import time
+import threading
+import multiprocessing
+
+#  Set up paths
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+from recommender.numpy_ranker import NumpyBuildRanker
+
+TFRS_MODEL_PATH = os.path.join(BACKEND_DIR, "models", "tfrs_model.keras")
+TFRS_ARTIFACT_PATH = os.path.join(BACKEND_DIR, "models", "tfrs_model.npz")
+SERVING_BACKEND = os.environ.get("TFRS_SERVING_BACKEND", "numpy")
+EMBEDDING_PRECISION = os.environ.get("TFRS_EMBEDDING_PRECISION", "float32")
+MODEL_WATCH_SECONDS = float(os.environ.get("MODEL_WATCH_SECONDS", 30))
+GUEST_USER_ID = "guest"
+
+
+def _train_in_subprocess(force_retrain=False):
+    """Entry point for the training process (keeps TF training out of the API process)."""
+    from models.train_tfrs_check import train_if_needed
+    train_if_needed(force_retrain=force_retrain)
+
+
+class ModelManager:
+    """Owns the loaded TFRS model and the state reported by the readiness probe."""
+
+    def __init__(self, model_path: str = TFRS_MODEL_PATH, artifact_path: str = TFRS_ARTIFACT_PATH,
+                 backend: str = SERVING_BACKEND, precision: str = EMBEDDING_PRECISION):
+        self.model_path = model_path
+        self.artifact_path = artifact_path
+        self.backend = backend
+        self.precision = precision
+        self.model = None
+        self.known_user_ids = set()
+        self.hashed_users = False
+        self.status = "not_started"
+        self.error = None
+        self.loaded_mtime = None
+        self.swap_count = 0
+        self._thread = None
+        self._watcher = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Starts loading (and training, if needed) without blocking the caller."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.status = "loading"
+            self._thread = threading.Thread(target=self._load_or_train, name="tfrs-model-loader", daemon=True)
+            self._thread.start()
+
+    def wait_until_ready(self, timeout: float = None) -> bool:
+        """Blocks until loading finishes (for scripts that need the model, not the API)."""
+        self.start()
+        self._thread.join(timeout)
+        return self.is_ready()
+
+    def _load_or_train(self):
+        try:
+            if not os.path.exists(self.model_path):
+                self.status = "training"
+                print("🔄 No TFRS model found — training in a background process...")
+                process = multiprocessing.get_context("spawn").Process(target=_train_in_subprocess)
+                process.start()
+                process.join()
+                if process.exitcode != 0 or not os.path.exists(self.model_path):
+                    raise RuntimeError(f"TFRS training process exited with code {process.exitcode}")
+
+            self.status = "loading"
+            if self.backend == "numpy" and not artifact_is_current(self.model_path, self.artifact_path):
+                print("🔄 Exporting NumPy ranking artifact from the Keras model...")
+                from models.export_tfrs_numpy import export_numpy_artifact
+                export_numpy_artifact(load_tfrs_model(self.model_path), self.artifact_path)
+            if self.backend == "numpy":
+                self.refresh_quantized_artifact()
+
+            mtime = os.path.getmtime(self.watched_path())
+            self.set_model(warm_up(self.load()), mtime)
+            print(f" TFRS model loaded and ready ({self.backend} backend).")
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            print(f" Failed to prepare TFRS model: {e}")
+
+    def set_model(self, model, mtime: float = None):
+        """Publishes a loaded model to request handlers (a single reference swap)."""
+        known_user_ids = set(user_vocabulary(model))
+        with self._lock:
+            if self.model is not None:
+                self.swap_count += 1
+            self.model = model
+            self.known_user_ids = known_user_ids
+            #  Hashed user tables have no vocabulary: every non-guest ID has its own bucket
+            self.hashed_users = not known_user_ids
+            self.loaded_mtime = mtime
+            self.status = "ready"
+            self.error = None
+
+    def load(self):
+        if self.backend == "numpy":
+            return NumpyBuildRanker.load(self.serving_artifact_path())
+        return load_tfrs_model(self.model_path)
+
+    def serving_artifact_path(self) -> str:
+        from models.export_tfrs_numpy import quantized_artifact_path
+        return quantized_artifact_path(self.artifact_path, self.precision)
+
+    def refresh_quantized_artifact(self):
+        """Re-derives the quantized artifact if the float32 artifact is newer."""
+        if self.precision != "float32" and not artifact_is_current(self.artifact_path, self.serving_artifact_path()):
+            from models.export_tfrs_numpy import export_quantized_artifact
+            export_quantized_artifact(self.artifact_path, self.precision)
+
+    def watched_path(self) -> str:
+        """The file whose replacement signals a new model for this backend."""
+        return self.artifact_path if self.backend == "numpy" else self.model_path
+
+    def recommend(self, user_id: str, k: int = 3) -> list:
+        """Top-k build IDs for a user from whichever model is currently published."""
+        model = self.model
+        if isinstance(model, NumpyBuildRanker):
+            _, build_ids = model.recommend([user_id], k=k)
+            return [str(b).strip() for b in build_ids[0]]
+
+        import tensorflow as tf
+        _, build_ids = model.recommend(tf.constant([user_id]), k=k)
+        return [b.decode().strip() for b in build_ids[0].numpy()]
+
+    def watch_for_updates(self, interval: float = MODEL_WATCH_SECONDS):
+        """Polls the model file and hot-swaps in newly published models."""
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=self._watch, args=(interval,), name="tfrs-model-watcher", daemon=True)
+            self._watcher.start()
+
+    def _watch(self, interval: float):
+        while True:
+            time.sleep(interval)
+            path = self.watched_path()
+            if self.loaded_mtime is None or not os.path.exists(path):
+                continue
+            mtime = os.path.getmtime(path)
+            if mtime == self.loaded_mtime:
+                continue
+            try:
+                #  Load and warm outside the lock; requests keep using the old model meanwhile
+                if self.backend == "numpy":
+                    self.refresh_quantized_artifact()
+                new_model = warm_up(self.load())
+                self.set_model(new_model, mtime)
+                print(" Hot-swapped retrained TFRS model.")
+            except Exception as e:
+                self.loaded_mtime = mtime  # Don't retry a broken file every poll
+                print(f" Failed to load retrained TFRS model, keeping the current one: {e}")
+
+    def is_ready(self) -> bool:
+        return self.model is not None
+
+    def is_known_user(self, user_id: str) -> bool:
+        """False for guests and for users the model can only place in the OOV bucket."""
+        if self.hashed_users:
+            return user_id != GUEST_USER_ID
+        return user_id in self.known_user_ids
+
+    def get_status(self) -> dict:
+        status = {
+            "status": self.status,
+            "ready": self.is_ready(),
+            "backend": self.backend,
+            "precision": self.precision,
+            "swap_count": self.swap_count
+        }
+        if self.error:
+            status["error"] = self.error
+        return status
+
+
+def load_tfrs_model(model_path: str = TFRS_MODEL_PATH):
+    """Loads a saved BuildRankingModel (imports TensorFlow on first use)."""
+    from tensorflow.keras.models import load_model
+    from models.train_tfrs_model import BuildRankingModel
+    return load_model(model_path, custom_objects={"BuildRankingModel": BuildRankingModel})
+
+
+def artifact_is_current(model_path: str, artifact_path: str) -> bool:
+    """True if the NumPy artifact exists and was written after the Keras model."""
+    if not os.path.exists(artifact_path):
+        return False
+    return not os.path.exists(model_path) or os.path.getmtime(artifact_path) >= os.path.getmtime(model_path)
+
+
+def user_vocabulary(model) -> list:
+    """User IDs with their own embedding (empty for hashed embedding tables)."""
+    if isinstance(model, NumpyBuildRanker):
+        return model.user_vocabulary.tolist()
+    lookup = model.user_model.layers[0]
+    return lookup.get_vocabulary() if hasattr(lookup, "get_vocabulary") else []
+
+
+def warm_up(model):
+    """Runs one recommendation so first-call setup costs are paid before the model serves traffic."""
+    last_user = (user_vocabulary(model) or [GUEST_USER_ID])[-1]
+    if isinstance(model, NumpyBuildRanker):
+        model.recommend([last_user], k=1)
+    else:
+        import tensorflow as tf
+        model.recommend(tf.constant([last_user]), k=1)
+    return model
+
+
+#  Shared manager used by the API
+model_manager = ModelManager()
@@ -0,0 +1,163 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-26
+Description:
+This module scores builds for users with a pure-NumPy copy of the TFRS BuildRankingModel.
+Features:
+- Loads the .npz artifact written by models/export_tfrs_numpy.py (no TensorFlow import)
+- Reproduces StringLookup (out-of-vocabulary IDs map to index 0), the embeddings and the rating MLP
+- Reproduces Keras' salted Hashing layer (SipHash-2-4) for models with hashed embedding tables
+- Accepts float16 or int8 (per-row scale) embedding tables and dequantizes the looked-up rows
+- Precomputes each build's contribution to the first dense layer, so full-vocabulary
+  scoring is one small matrix product per user
+- Mirrors BuildRankingModel.recommend, returning (scores, build_ids) arrays
+"""
+
+import struct
+from functools import lru_cache
+import numpy as np
+
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+def _rotl(x, b):
+    return ((x << b) | (x >> (64 - b))) & _MASK64
+
+
+def _sip_round(v0, v1, v2, v3):
+    v0 = (v0 + v1) & _MASK64
+    v1 = _rotl(v1, 13) ^ v0
+    v0 = _rotl(v0, 32)
+    v2 = (v2 + v3) & _MASK64
+    v3 = _rotl(v3, 16) ^ v2
+    v0 = (v0 + v3) & _MASK64
+    v3 = _rotl(v3, 21) ^ v0
+    v2 = (v2 + v1) & _MASK64
+    v1 = _rotl(v1, 17) ^ v2
+    v2 = _rotl(v2, 32)
+    return v0, v1, v2, v3
+
+
+def siphash24(k0: int, k1: int, data: bytes) -> int:
+    """SipHash-2-4, as used by tf.strings.to_hash_bucket_strong."""
+    v0 = k0 ^ 0x736F6D6570736575
+    v1 = k1 ^ 0x646F72616E646F6D
+    v2 = k0 ^ 0x6C7967656E657261
+    v3 = k1 ^ 0x7465646279746573
+
+    end = len(data) - len(data) % 8
+    for i in range(0, end, 8):
+        m = struct.unpack_from("<Q", data, i)[0]
+        v3 ^= m
+        v0, v1, v2, v3 = _sip_round(*_sip_round(v0, v1, v2, v3))
+        v0 ^= m
+
+    last = (len(data) & 0xFF) << 56
+    for i, byte in enumerate(data[end:]):
+        last |= byte << (8 * i)
+    v3 ^= last
+    v0, v1, v2, v3 = _sip_round(*_sip_round(v0, v1, v2, v3))
+    v0 ^= last
+
+    v2 ^= 0xFF
+    for _ in range(4):
+        v0, v1, v2, v3 = _sip_round(v0, v1, v2, v3)
+    return v0 ^ v1 ^ v2 ^ v3
+
+
+@lru_cache(maxsize=65536)
+def hash_bucket(value: str, num_bins: int, k0: int, k1: int) -> int:
+    """Bucket index matching keras.layers.Hashing(num_bins, salt=[k0, k1])."""
+    return siphash24(k0, k1, value.encode("utf-8")) % num_bins
+
+
+class NumpyBuildRanker:
+    """TensorFlow-free scorer that is numerically equivalent to BuildRankingModel."""
+
+    def __init__(self, user_vocabulary, build_vocabulary, user_embeddings, build_embeddings,
+                 hidden_kernel, hidden_bias, output_kernel, output_bias, user_hash=None, build_hash=None,
+                 user_embeddings_scales=None, build_embeddings_scales=None):
+        self.user_vocabulary = np.asarray(user_vocabulary)
+        self.build_vocabulary = np.asarray(build_vocabulary)
+        self.user_index = {uid: i for i, uid in enumerate(self.user_vocabulary.tolist())}
+        self.build_index = {bid: i for i, bid in enumerate(self.build_vocabulary.tolist())}
+        #  (num_bins, k0, k1) for hashed tables, None for vocabulary lookups
+        self.user_hash = tuple(int(v) for v in user_hash) if user_hash is not None else None
+        self.build_hash = tuple(int(v) for v in build_hash) if build_hash is not None else None
+        #  Tables stay in their stored precision; rows are dequantized when looked up
+        self.user_embeddings = user_embeddings
+        self.build_embeddings = build_embeddings
+        self.user_embeddings_scales = user_embeddings_scales
+        self.build_embeddings_scales = build_embeddings_scales
+
+        #  concat([u, b]) @ W == u @ W_user + b @ W_build, so split the first kernel once
+        embedding_dim = user_embeddings.shape[1]
+        self.hidden_kernel_user = hidden_kernel[:embedding_dim]
+        self.hidden_kernel_build = hidden_kernel[embedding_dim:]
+        self.hidden_bias = hidden_bias
+        self.output_kernel = output_kernel
+        self.output_bias = output_bias
+
+        #  Every candidate build's (static) share of the hidden layer, including the bias
+        build_rows = self.lookup_builds(self.build_vocabulary)
+        self.build_hidden = self.build_vectors(build_rows) @ self.hidden_kernel_build + hidden_bias
+
+    @classmethod
+    def load(cls, artifact_path: str):
+        with np.load(artifact_path) as data:
+            return cls(**{key: data[key] for key in data.files})
+
+    def is_hashed(self) -> bool:
+        return self.user_hash is not None
+
+    def known_user_ids(self) -> set:
+        return set(self.user_vocabulary.tolist())
+
+    def lookup_users(self, user_ids) -> np.ndarray:
+        """Embedding rows for user IDs."""
+        if self.user_hash is not None:
+            return np.array([hash_bucket(str(uid), *self.user_hash) for uid in user_ids], dtype=np.int64)
+        return np.array([self.user_index.get(str(uid), 0) for uid in user_ids], dtype=np.int64)
+
+    def lookup_builds(self, build_ids) -> np.ndarray:
+        """Embedding rows for build IDs."""
+        if self.build_hash is not None:
+            return np.array([hash_bucket(str(bid), *self.build_hash) for bid in build_ids], dtype=np.int64)
+        return np.array([self.build_index.get(str(bid), 0) for bid in build_ids], dtype=np.int64)
+
+    @staticmethod
+    def _dequantize(table, scales, rows) -> np.ndarray:
+        vectors = table[rows].astype(np.float32)
+        if scales is not None:
+            vectors *= scales[rows, None]
+        return vectors
+
+    def user_vectors(self, rows) -> np.ndarray:
+        return self._dequantize(self.user_embeddings, self.user_embeddings_scales, rows)
+
+    def build_vectors(self, rows) -> np.ndarray:
+        return self._dequantize(self.build_embeddings, self.build_embeddings_scales, rows)
+
+    def score_all(self, user_ids) -> np.ndarray:
+        """Predicted ratings for every candidate build, shape (len(user_ids), n_builds)."""
+        user_hidden = self.user_vectors(self.lookup_users(user_ids)) @ self.hidden_kernel_user
+        hidden = np.maximum(user_hidden[:, None, :] + self.build_hidden[None, :, :], 0.0)
+        return (hidden @ self.output_kernel)[..., 0] + self.output_bias[0]
+
+    def predict(self, user_ids, build_ids) -> np.ndarray:
+        """Predicted ratings for aligned (user, build) pairs, like calling the model on features."""
+        user_hidden = self.user_vectors(self.lookup_users(user_ids)) @ self.hidden_kernel_user
+        build_hidden = self.build_vectors(self.lookup_builds(build_ids)) @ self.hidden_kernel_build
+        hidden = np.maximum(user_hidden + build_hidden + self.hidden_bias, 0.0)
+        return hidden @ self.output_kernel + self.output_bias
+
+    def recommend(self, user_ids, k: int = 5):
+        """Top-k (scores, build_ids) per user over all candidate builds."""
+        scores = self.score_all(user_ids)
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        return np.take_along_axis(scores, top, axis=1), self.build_vocabulary[top]
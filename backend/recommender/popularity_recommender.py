@@ -0,0 +1,128 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-23
+Description:
+This module provides a popularity-based recommender for guest and cold-start users.
+Features:
+- Reads rating counts and sums per build from the build_rating_stats table, which the rating
+  routes keep current in the same transaction as each rating (auth/rating_stats.py)
+- Ranks builds by a Bayesian average (damped towards the global mean rating)
+- Reloads them every POPULARITY_REFRESH_SECONDS, so every worker sees ratings handled by any worker
+- Answers collaborative requests for unknown users without calling the TFRS model
+"""
+
+import os
+import time
+import sqlite3
+import threading
+import pandas as pd
+
+#  Define paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(BASE_DIR, "database", "users.db")
+LABELED_PATH = os.path.join(BASE_DIR, "data", "builds", "labeled_builds.csv")
+
+#  Number of "virtual" global-mean ratings blended into every build's average
+PRIOR_WEIGHT = 5
+
+#  Seconds before the aggregates are reloaded (reading build_rating_stats is one row per build)
+POPULARITY_REFRESH_SECONDS = float(os.environ.get("POPULARITY_REFRESH_SECONDS", 10))
+
+
+class PopularityRecommender:
+    """Per-build rating aggregates (from build_rating_stats) and a cached Bayesian-average ranking."""
+
+    def __init__(self, build_df: pd.DataFrame, prior_weight: int = PRIOR_WEIGHT):
+        self.build_df = build_df.set_index("build_id", drop=False)
+        self.valid_build_ids = set(self.build_df.index)
+        self.prior_weight = prior_weight
+        self.counts = {}
+        self.sums = {}
+        self.total_count = 0
+        self.total_sum = 0.0
+        self._ranking = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_db(cls, db_path: str = DB_PATH, labeled_path: str = LABELED_PATH):
+        """Loads the aggregates from build_rating_stats (one row per rated build)."""
+        model = cls(pd.read_csv(labeled_path))
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute("SELECT build_id, rating_count, rating_sum FROM build_rating_stats").fetchall()
+        except sqlite3.Error as e:
+            print(f" Could not load rating stats for popularity model: {e}")
+            rows = []
+        finally:
+            conn.close()
+
+        for build_id, count, total in rows:
+            if build_id in model.valid_build_ids and count > 0:
+                model.counts[build_id] = count
+                model.sums[build_id] = float(total or 0.0)
+                model.total_count += count
+                model.total_sum += float(total or 0.0)
+        return model
+
+    def global_mean(self) -> float:
+        return self.total_sum / self.total_count if self.total_count else 0.0
+
+    def bayesian_average(self, build_id: str) -> float:
+        count = self.counts.get(build_id, 0)
+        if self.prior_weight + count == 0:
+            return 0.0
+        prior = self.prior_weight * self.global_mean()
+        return (prior + self.sums.get(build_id, 0.0)) / (self.prior_weight + count)
+
+    def ranking(self) -> list:
+        """Returns build IDs ordered by Bayesian average, then rating count."""
+        ranking = self._ranking
+        if ranking is None:
+            with self._lock:
+                ranking = sorted(
+                    self.counts,
+                    key=lambda bid: (self.bayesian_average(bid), self.counts[bid]),
+                    reverse=True
+                )
+                self._ranking = ranking
+        return ranking
+
+    def recommend(self, k: int = 3) -> list:
+        """Returns the top-k builds in the same format as the collaborative recommender."""
+        top_builds = []
+        for bid in self.ranking()[:k]:
+            row = self.build_df.loc[bid]
+            top_builds.append({
+                "build_id": bid,
+                "cpu": row["cpu_name"],
+                "gpu": row["gpu_name"],
+                "price": round(row["price"], 2)
+            })
+        return top_builds
+
+
+#  Shared instance, loaded on first use and reloaded every POPULARITY_REFRESH_SECONDS
+_popularity_model = None
+_loaded_at = 0.0
+_load_lock = threading.Lock()
+
+def get_popularity_model() -> PopularityRecommender:
+    global _popularity_model, _loaded_at
+    if _popularity_model is None:
+        with _load_lock:
+            if _popularity_model is None:
+                _popularity_model = PopularityRecommender.from_db()
+                _loaded_at = time.monotonic()
+    elif time.monotonic() - _loaded_at >= POPULARITY_REFRESH_SECONDS and _load_lock.acquire(blocking=False):
+        #  One thread reloads; the others keep serving the current ranking meanwhile
+        try:
+            if time.monotonic() - _loaded_at >= POPULARITY_REFRESH_SECONDS:
+                _popularity_model = PopularityRecommender.from_db()
+                _loaded_at = time.monotonic()
+        finally:
+            _load_lock.release()
+    return _popularity_model
+
+def get_popular_builds(k: int = 3) -> list:
+    return get_popularity_model().recommend(k=k)
@@ -0,0 +1,229 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-05-01
+Description:
+This module keeps precomputed "more like this" neighbour lists for every labeled build.
+Features:
+- Top-NEIGHBORS_K nearest builds per build over the scaled content features
+  (cpu_score, gpu_score, ram_gb, storage_gb, price), stored as row/distance arrays
+- Serving a build's similar builds is a single dict lookup plus slicing its precomputed row
+- Incremental refresh: when labeled_builds.csv gains builds, only the new builds are scored
+  against the catalog, and existing lists are merged with the new candidates
+- Builds whose features (components or price) changed are detected against the cached feature
+  rows; their lists, and only the lists that contained them, are recomputed
+- Lists are cached in models/build_neighbors.npz; removed builds or a new content scaler
+  trigger a full rebuild
+"""
+
+import os
+import threading
+import joblib
+import numpy as np
+import pandas as pd
+
+from recommender.build_neighbor_index import FEATURE_COLUMNS
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUILD_DATA_PATH = os.path.join(BASE_DIR, "data", "builds", "labeled_builds.csv")
+SCALER_PATH = os.path.join(BASE_DIR, "models", "content_scaler.pkl")
+NEIGHBOR_CACHE_PATH = os.path.join(BASE_DIR, "models", "build_neighbors.npz")
+
+#  Neighbours kept per build (the most a request can ask for)
+NEIGHBORS_K = 10
+#  Builds compared per distance block (bounds the block x catalog distance matrix)
+DISTANCE_BLOCK = 1024
+
+SUMMARY_COLUMNS = ["build_id", "cpu_name", "gpu_name", "ram_name", "storage_name", "price"]
+
+
+def _top_k(distances: np.ndarray, candidates: np.ndarray, k: int):
+    """Row-wise k smallest distances (nearest first) and their candidate rows; pads with -1 / inf."""
+    k_eff = min(k, distances.shape[1])
+    rows = np.full((len(distances), k), -1, dtype=np.int64)
+    dists = np.full((len(distances), k), np.inf)
+    if k_eff == 0:
+        return rows, dists
+    best = np.argpartition(distances, k_eff - 1, axis=1)[:, :k_eff]
+    best_dist = np.take_along_axis(distances, best, axis=1)
+    order = np.argsort(best_dist, axis=1, kind="stable")
+    best = np.take_along_axis(best, order, axis=1)
+    rows[:, :k_eff] = np.take_along_axis(candidates, best, axis=1)
+    dists[:, :k_eff] = np.take_along_axis(best_dist, order, axis=1)
+    return rows, dists
+
+
+class SimilarBuildsStore:
+    """Precomputed nearest-neighbour lists per build, refreshed when builds are added."""
+
+    def __init__(self, build_path: str = BUILD_DATA_PATH, scaler_path: str = SCALER_PATH,
+                 cache_path: str = NEIGHBOR_CACHE_PATH, k: int = NEIGHBORS_K):
+        self.build_path = build_path
+        self.scaler_path = scaler_path
+        self.cache_path = cache_path
+        self.k = k
+        self.index = {}
+        self.summaries = []
+        self.loaded_mtime = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.build_ids = np.empty(0, dtype=str)
+        self.features = np.empty((0, len(FEATURE_COLUMNS)))
+        self.neighbors = np.empty((0, self.k), dtype=np.int64)
+        self.distances = np.empty((0, self.k))
+
+    def _scale(self, df: pd.DataFrame) -> np.ndarray:
+        scaler = joblib.load(self.scaler_path)
+        return df[FEATURE_COLUMNS].to_numpy(dtype=np.float64) * scaler.scale_ + scaler.min_
+
+    def _load_cache(self) -> bool:
+        if not os.path.exists(self.cache_path):
+            return False
+        if os.path.getmtime(self.scaler_path) > os.path.getmtime(self.cache_path):
+            return False
+        with np.load(self.cache_path) as data:
+            if data["neighbors"].shape[1] != self.k:
+                return False
+            self.build_ids = data["build_ids"]
+            self.features = data["features"]
+            self.neighbors = data["neighbors"]
+            self.distances = data["distances"]
+        return True
+
+    def _nearest(self, rows: np.ndarray):
+        """Full neighbour lists for the given rows against the whole catalog (excluding themselves)."""
+        neighbors, distances = [], []
+        for start in range(0, len(rows), DISTANCE_BLOCK):
+            block = rows[start:start + DISTANCE_BLOCK]
+            block_dists = np.linalg.norm(self.features[block, None, :] - self.features[None, :, :], axis=2)
+            block_dists[np.arange(len(block)), block] = np.inf
+            candidates = np.broadcast_to(np.arange(len(self.features)), block_dists.shape)
+            block_rows, block_dists = _top_k(block_dists, candidates, self.k)
+            neighbors.append(block_rows)
+            distances.append(block_dists)
+        if not neighbors:
+            return np.empty((0, self.k), dtype=np.int64), np.empty((0, self.k))
+        return np.vstack(neighbors), np.vstack(distances)
+
+    def _merge_candidates(self, neighbors, distances, rows: np.ndarray, candidate_rows: np.ndarray):
+        """Merges candidate_rows (at their current features) into the existing lists of rows."""
+        for start in range(0, len(rows), DISTANCE_BLOCK):
+            block = rows[start:start + DISTANCE_BLOCK]
+            to_candidates = np.linalg.norm(
+                self.features[block, None, :] - self.features[None, candidate_rows, :], axis=2
+            )
+            merged_dist = np.hstack([distances[block], to_candidates])
+            merged_rows = np.hstack([neighbors[block], np.broadcast_to(candidate_rows, to_candidates.shape)])
+            neighbors[block], distances[block] = _top_k(merged_dist, merged_rows, self.k)
+
+    def add_builds(self, build_ids, features: np.ndarray):
+        """Appends builds, computes their lists and merges them into the existing lists."""
+        n_old = len(self.build_ids)
+        self.features = np.vstack([self.features, features])
+        new_rows = np.arange(n_old, len(self.features))
+
+        #  New builds against the whole catalog; existing builds only need the new builds as extra candidates
+        new_neighbors, new_distances = self._nearest(new_rows)
+        neighbors, distances = self.neighbors.copy(), self.distances.copy()
+        self._merge_candidates(neighbors, distances, np.arange(n_old), new_rows)
+
+        self.build_ids = np.concatenate([self.build_ids, np.asarray(build_ids, dtype=str)])
+        self.neighbors = np.vstack([neighbors, new_neighbors])
+        self.distances = np.vstack([distances, new_distances])
+
+    def update_builds(self, rows, features: np.ndarray):
+        """
+        Replaces the features of existing builds (components or price changed). Their lists and any
+        list that contained them are recomputed; every other list just merges them in as candidates.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        self.features = self.features.copy()
+        self.features[rows] = features
+
+        changed = np.zeros(len(self.build_ids), dtype=bool)
+        changed[rows] = True
+        listed = self.neighbors >= 0
+        stale = changed | (changed[np.where(listed, self.neighbors, 0)] & listed).any(axis=1)
+
+        neighbors, distances = self.neighbors.copy(), self.distances.copy()
+        stale_rows = np.flatnonzero(stale)
+        neighbors[stale_rows], distances[stale_rows] = self._nearest(stale_rows)
+        self._merge_candidates(neighbors, distances, np.flatnonzero(~stale), rows)
+        self.neighbors, self.distances = neighbors, distances
+        return len(stale_rows)
+
+    def _save_cache(self):
+        from models.export_tfrs_numpy import save_artifact
+
+        save_artifact({"build_ids": self.build_ids, "features": self.features,
+                       "neighbors": self.neighbors, "distances": self.distances}, self.cache_path)
+
+    def refresh(self):
+        """Brings the lists up to date with labeled_builds.csv (no-op when the file is unchanged)."""
+        mtime = os.path.getmtime(self.build_path)
+        if mtime == self.loaded_mtime:
+            return self
+        with self._lock:
+            if mtime == self.loaded_mtime:
+                return self
+            df = pd.read_csv(self.build_path)
+            df["build_id"] = df["build_id"].astype(str)
+            df = df.drop_duplicates("build_id", keep="first").reset_index(drop=True)
+
+            if self.loaded_mtime is None and not self._load_cache():
+                self._reset()
+            known = set(self.build_ids.tolist())
+            current = df["build_id"].tolist()
+            if len(known - set(current)) > 0:
+                #  Builds were removed: neighbour rows would shift, so start over
+                print(" Builds removed from the catalog — rebuilding neighbour lists.")
+                self._reset()
+                known = set()
+            positions = {build_id: row for row, build_id in enumerate(self.build_ids.tolist())}
+
+            #  Builds whose components or price changed since their lists were computed
+            kept = df[df["build_id"].isin(known)]
+            updated = False
+            if not kept.empty:
+                rows = np.array([positions[build_id] for build_id in kept["build_id"]], dtype=np.int64)
+                features = self._scale(kept)
+                edited = np.any(features != self.features[rows], axis=1)
+                if edited.any():
+                    recomputed = self.update_builds(rows[edited], features[edited])
+                    updated = True
+                    print(f" {int(edited.sum())} build(s) changed — recomputed {recomputed} neighbour list(s).")
+
+            #  Rows follow the cached order; new builds are appended in file order
+            added = df[~df["build_id"].isin(known)]
+            if not added.empty:
+                self.add_builds(added["build_id"].to_numpy(dtype=str), self._scale(added))
+                updated = True
+                print(f" Neighbour lists updated with {len(added)} new build(s).")
+            if updated:
+                self._save_cache()
+
+            summaries = df.set_index("build_id").reindex(pd.Index(self.build_ids, name="build_id")).reset_index()
+            self.summaries = summaries[[c for c in SUMMARY_COLUMNS if c in summaries.columns]].to_dict(orient="records")
+            self.index = {build_id: row for row, build_id in enumerate(self.build_ids.tolist())}
+            self.loaded_mtime = mtime
+        return self
+
+    def start(self):
+        """Builds or refreshes the lists in the background."""
+        threading.Thread(target=self.refresh, name="similar-builds-warmup", daemon=True).start()
+
+    def similar(self, build_id: str, k: int = NEIGHBORS_K) -> list:
+        """Up to k builds most similar to build_id, nearest first; KeyError for unknown builds."""
+        self.refresh()
+        row = self.index.get(str(build_id))
+        if row is None:
+            raise KeyError(f"Unknown build: {build_id}")
+        k = max(0, min(k, self.k))
+        return [{**self.summaries[neighbor], "distance": float(distance)}
+                for neighbor, distance in zip(self.neighbors[row, :k], self.distances[row, :k]) if neighbor >= 0]
+
+
+#  Shared instance used by the API
+similar_builds = SimilarBuildsStore()
@@ -0,0 +1,120 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-29
+Description:
+This module serves the Surprise SVD collaborative model from exported NumPy factors.
+Features:
+- Loads the .npz artifact written by models/export_svd_numpy.py (no Surprise or pickle needed)
+- Reproduces SVD.estimate: global mean + user bias + build bias + user factors . build factors
+- Scores every candidate build for a user with one matrix-vector product (a matrix product for batches)
+- Unknown users get the bias-only estimate, as Surprise does
+- Same recommend/score_all interface as NumpyBuildRanker, so the two can be swapped and benchmarked
+- SvdBackend wraps it as a collaborative backend for hybrid_recommender, reloading when the artifact changes
+"""
+
+import os
+import threading
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SVD_ARTIFACT_PATH = os.path.join(BACKEND_DIR, "models", "svd_model.npz")
+
+
+class SvdBuildRanker:
+    """Top-k build ranking from SVD factors and biases."""
+
+    def __init__(self, user_vocabulary, build_vocabulary, user_factors, build_factors,
+                 user_bias, build_bias, global_mean):
+        self.user_vocabulary = np.asarray(user_vocabulary)
+        self.build_vocabulary = np.asarray(build_vocabulary)
+        self.user_index = {uid: i for i, uid in enumerate(self.user_vocabulary.tolist())}
+        self.build_index = {bid: i for i, bid in enumerate(self.build_vocabulary.tolist())}
+        self.user_factors = np.asarray(user_factors, dtype=np.float32)
+        self.build_factors = np.asarray(build_factors, dtype=np.float32)
+        self.user_bias = np.asarray(user_bias, dtype=np.float32)
+        self.global_mean = float(global_mean)
+        #  The global mean is folded into the build bias once, so scoring is factors @ user + offset
+        self.build_offset = np.asarray(build_bias, dtype=np.float32) + float(global_mean)
+
+    @classmethod
+    def load(cls, artifact_path: str):
+        with np.load(artifact_path) as data:
+            return cls(**{key: data[key] for key in data.files})
+
+    def is_hashed(self) -> bool:
+        return False
+
+    def known_user_ids(self) -> set:
+        return set(self.user_vocabulary.tolist())
+
+    def _user_rows(self, user_ids):
+        rows = np.array([self.user_index.get(str(uid), -1) for uid in user_ids], dtype=np.int64)
+        known = rows >= 0
+        factors = np.zeros((len(rows), self.user_factors.shape[1]), dtype=np.float32)
+        bias = np.zeros(len(rows), dtype=np.float32)
+        factors[known] = self.user_factors[rows[known]]
+        bias[known] = self.user_bias[rows[known]]
+        return factors, bias
+
+    def score_all(self, user_ids) -> np.ndarray:
+        """Predicted ratings for every candidate build, shape (len(user_ids), n_builds)."""
+        factors, bias = self._user_rows(user_ids)
+        return factors @ self.build_factors.T + self.build_offset[None, :] + bias[:, None]
+
+    def predict(self, user_ids, build_ids) -> np.ndarray:
+        """Predicted ratings for aligned (user, build) pairs; unknown IDs drop their bias and factors."""
+        factors, bias = self._user_rows(user_ids)
+        rows = np.array([self.build_index.get(str(bid), -1) for bid in build_ids], dtype=np.int64)
+        known = rows >= 0
+        scores = bias + self.global_mean
+        scores[known] += (np.einsum("ij,ij->i", factors[known], self.build_factors[rows[known]])
+                          + self.build_offset[rows[known]] - self.global_mean)
+        return scores
+
+    def recommend(self, user_ids, k: int = 5):
+        """Top-k (scores, build_ids) per user over all candidate builds."""
+        scores = self.score_all(user_ids)
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        return np.take_along_axis(scores, top, axis=1), self.build_vocabulary[top]
+
+
+class SvdBackend:
+    """Collaborative backend serving the SVD artifact; reloads it when the file changes."""
+
+    def __init__(self, artifact_path: str = SVD_ARTIFACT_PATH):
+        self.artifact_path = artifact_path
+        self.ranker = None
+        self.loaded_mtime = None
+        self._lock = threading.Lock()
+
+    def _current(self):
+        try:
+            mtime = os.path.getmtime(self.artifact_path)
+        except OSError:
+            return self.ranker
+        if mtime != self.loaded_mtime:
+            with self._lock:
+                if mtime != self.loaded_mtime:
+                    self.ranker = SvdBuildRanker.load(self.artifact_path)
+                    self.loaded_mtime = mtime
+        return self.ranker
+
+    def is_ready(self) -> bool:
+        return self._current() is not None
+
+    def is_known_user(self, user_id: str) -> bool:
+        ranker = self._current()
+        return ranker is not None and str(user_id) in ranker.user_index
+
+    def recommend(self, user_id: str, k: int = 5) -> list:
+        _, build_ids = self._current().recommend([str(user_id)], k=k)
+        return [str(b) for b in build_ids[0]]
+
+
+#  Shared instance used by hybrid_recommender
+svd_backend = SvdBackend()
@@ -4,7 +4,7 @@ Student ID: S2336002
 Date Created: 2025-04-18
 Description:
 Modernized component matcher for PC builds.
-- Ensures CPU-Motherboard-RAM compatibility
+- Ensures CPU-Motherboard-RAM compatibility (socket checks use the precompiled compatibility bitsets)
 - Matches parts to system requirements
 - Allocates budget smartly
 - Picks highest performance CPU/GPU within budget
@@ -17,6 +17,7 @@ import os
 import pandas as pd
 import re
 from fuzzywuzzy import process, fuzz
+from recommender.compatibility_rules import compatibility_rules
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -52,6 +53,14 @@ def match_best_component(component_name, dataset, column_name):
             return dataset.iloc[index].to_dict()
     return None
 
+def compatible_motherboards(cpu, motherboard_data):
+    """Rows of motherboard_data whose socket matches the CPU, matched by name (empty for an unknown CPU)."""
+    try:
+        names = compatibility_rules.compatible_parts("motherboard", {"cpu": str(cpu["name"])})
+    except KeyError:
+        return motherboard_data.iloc[0:0]
+    return motherboard_data[motherboard_data["name"].astype(str).isin(names)]
+
 def upgrade_build_with_spare_budget(matched, spare_budget, cpu_data, gpu_data, ram_ddr4, ram_ddr5, motherboard_data):
     """Upgrade build if spare budget allows."""
     upgrades_made = False
@@ -82,8 +91,7 @@ def upgrade_build_with_spare_budget(matched, spare_budget, cpu_data, gpu_data, r
 
     # Re-match Motherboard
     if upgrades_made and matched.get("CPU"):
-        cpu_socket = matched["CPU"].get("socket", "").replace("FCLGA", "LGA").replace(" ", "")
-        compatible_mobos = motherboard_data[motherboard_data["socket"] == cpu_socket]
+        compatible_mobos = compatible_motherboards(matched["CPU"], motherboard_data)
 
         if not compatible_mobos.empty:
             best_mobo = compatible_mobos.sort_values("original_price").iloc[0].to_dict()
@@ -184,8 +192,7 @@ def match_requirements_to_components(game_requirements, budget):
 
     # Motherboard Matching
     if matched["CPU"]:
-        cpu_socket = matched["CPU"]["socket"].replace("FCLGA", "LGA")
-        compatible_mobos = motherboard_data[motherboard_data["socket"] == cpu_socket]
+        compatible_mobos = compatible_motherboards(matched["CPU"], motherboard_data)
         if not compatible_mobos.empty:
             matched["Motherboard"] = compatible_mobos.sort_values("original_price").iloc[0].to_dict()
             total_cost += matched["Motherboard"]["original_price"]
@@ -15,6 +15,7 @@ BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
 sys.path.append(BACKEND_DIR)
 
 from recommender.hybrid_recommender import get_hybrid_recommendation
+from recommender.model_manager import model_manager
 
 def precision_recall_at_k(predicted, actual, k=3):
     predicted_k = predicted[:k]
@@ -30,6 +31,8 @@ if __name__ == "__main__":
     budget = 900
     k = 3
 
+    model_manager.wait_until_ready()
+
     result = get_hybrid_recommendation({
         "budget": budget,
         "query": "general",
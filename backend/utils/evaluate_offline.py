@@ -0,0 +1,172 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-29
+Description:
+This script evaluates a ranking artifact offline for every user with ratings.
+Features:
+- Loads the NumPy ranking artifact (tfrs_model.npz, a quantized copy or a candidate via --artifact)
+  or the SVD factor artifact (--backend svd), so the two collaborative backends can be compared directly
+- Scores users in batches as one matrix per batch (NumpyBuildRanker.score_all) and takes top-k with argpartition
+- Computes Precision@K, Recall@K and NDCG@K from a boolean relevance matrix, plus catalogue coverage
+- Splits users across a process pool (--workers), each worker loading the artifact once
+- Reports wall time and users/second next to the quality metrics
+Usage:
+    python utils/evaluate_offline.py [--backend tfrs|svd] [--artifact PATH] [--k 10] [--workers N] [--holdout]
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.abspath(os.path.join(CURRENT_DIR, ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from recommender.numpy_ranker import NumpyBuildRanker
+from recommender.svd_ranker import SvdBuildRanker, SVD_ARTIFACT_PATH
+
+#  Paths
+DB_PATH = os.path.join(BACKEND_DIR, "database", "users.db")
+ARTIFACT_PATH = os.path.join(BACKEND_DIR, "models", "tfrs_model.npz")
+
+#  Ranker class and default artifact per collaborative backend
+RANKERS = {
+    "tfrs": (NumpyBuildRanker, ARTIFACT_PATH),
+    "svd": (SvdBuildRanker, SVD_ARTIFACT_PATH),
+}
+
+#  A rating at or above this counts as relevant
+RELEVANCE_THRESHOLD = 3.5
+#  Users scored per matrix product (bounds the users x builds x hidden intermediate)
+USER_BATCH_SIZE = 64
+#  Same deterministic split as models/ratings_stream.HOLDOUT_SPLIT
+HOLDOUT_SPLIT = "id % 5 = 0"
+
+_ranker = None
+
+
+def load_relevant_builds(db_path: str, threshold: float = RELEVANCE_THRESHOLD, where: str = None) -> pd.DataFrame:
+    """One row per (user_id, build_id) the user rated at or above the threshold."""
+    condition = f" AND ({where})" if where else ""
+    conn = sqlite3.connect(db_path)
+    try:
+        df = pd.read_sql_query(
+            f"SELECT user_id, build_id FROM ratings WHERE rating >= ?{condition}", conn, params=(threshold,)
+        )
+    finally:
+        conn.close()
+    return df.astype(str).drop_duplicates()
+
+
+def _init_worker(backend: str, artifact_path: str):
+    global _ranker
+    _ranker = RANKERS[backend][0].load(artifact_path)
+
+
+def evaluate_users(user_ids, relevant_rows, k: int, ranker=None):
+    """
+    Metrics for one chunk of users.
+    relevant_rows[i] holds the candidate-build column indices user_ids[i] found relevant.
+    Returns (precision, recall, ndcg) arrays and the set of recommended build columns.
+    """
+    ranker = ranker or _ranker
+    n_builds = len(ranker.build_vocabulary)
+    k = min(k, n_builds)
+    discounts = 1.0 / np.log2(np.arange(2, k + 2))
+    ideal_dcg = np.concatenate([[0.0], np.cumsum(discounts)])
+
+    precision, recall, ndcg, recommended = [], [], [], []
+    for start in range(0, len(user_ids), USER_BATCH_SIZE):
+        batch_users = user_ids[start:start + USER_BATCH_SIZE]
+        batch_rows = relevant_rows[start:start + USER_BATCH_SIZE]
+
+        relevance = np.zeros((len(batch_users), n_builds), dtype=bool)
+        for i, rows in enumerate(batch_rows):
+            relevance[i, rows] = True
+        n_relevant = relevance.sum(axis=1)
+
+        scores = ranker.score_all(batch_users)
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+
+        hits = np.take_along_axis(relevance, top, axis=1)
+        n_hits = hits.sum(axis=1)
+        precision.append(n_hits / k)
+        recall.append(n_hits / n_relevant)
+        ndcg.append((hits @ discounts) / ideal_dcg[np.minimum(n_relevant, k)])
+        recommended.append(np.unique(top))
+
+    recommended = np.unique(np.concatenate(recommended)) if recommended else np.array([], dtype=np.int64)
+    return np.concatenate(precision), np.concatenate(recall), np.concatenate(ndcg), recommended
+
+
+def _evaluate_chunk(args):
+    return evaluate_users(*args)
+
+
+def evaluate(artifact_path: str = None, db_path: str = DB_PATH, k: int = 10, workers: int = None,
+             holdout: bool = False, backend: str = "tfrs") -> dict:
+    start = time.perf_counter()
+    ranker_class, default_path = RANKERS[backend]
+    artifact_path = artifact_path or default_path
+    ranker = ranker_class.load(artifact_path)
+    build_column = {bid: i for i, bid in enumerate(ranker.build_vocabulary.tolist())}
+
+    #  Only builds the model can rank count as relevant; users with none are skipped
+    relevant_df = load_relevant_builds(db_path, where=HOLDOUT_SPLIT if holdout else None)
+    relevant_df = relevant_df[relevant_df["build_id"].isin(build_column)]
+    relevant_df["column"] = relevant_df["build_id"].map(build_column)
+    grouped = relevant_df.groupby("user_id")["column"].apply(np.asarray)
+    user_ids = grouped.index.to_numpy(dtype=str)
+    relevant_rows = grouped.tolist()
+    if len(user_ids) == 0:
+        raise ValueError(" No users with relevant ratings to evaluate.")
+
+    workers = workers or os.cpu_count() or 1
+    workers = min(workers, len(user_ids))
+    if workers == 1:
+        results = [evaluate_users(user_ids, relevant_rows, k, ranker)]
+    else:
+        bounds = np.linspace(0, len(user_ids), workers + 1, dtype=int)
+        chunks = [(user_ids[a:b], relevant_rows[a:b], k) for a, b in zip(bounds[:-1], bounds[1:])]
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(backend, artifact_path)) as pool:
+            results = list(pool.map(_evaluate_chunk, chunks))
+
+    precision, recall, ndcg, recommended = zip(*results)
+    elapsed = time.perf_counter() - start
+    return {
+        "users": len(user_ids),
+        f"precision@{k}": float(np.concatenate(precision).mean()),
+        f"recall@{k}": float(np.concatenate(recall).mean()),
+        f"ndcg@{k}": float(np.concatenate(ndcg).mean()),
+        "coverage": len(np.unique(np.concatenate(recommended))) / len(ranker.build_vocabulary),
+        "workers": workers,
+        "wall_time_s": elapsed,
+        "users_per_s": len(user_ids) / elapsed,
+    }
+
+
+#  CLI usage
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline ranking evaluation for all users.")
+    parser.add_argument("--backend", choices=sorted(RANKERS), default="tfrs")
+    parser.add_argument("--artifact", default=None, help="defaults to the backend's serving artifact")
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--holdout", action="store_true", help="only count holdout ratings (id %% 5 = 0) as relevant")
+    args = parser.parse_args()
+
+    results = evaluate(args.artifact, args.db, k=args.k, workers=args.workers, holdout=args.holdout,
+                       backend=args.backend)
+    print(f"\n📊 Offline evaluation of the {args.backend} backend ({args.artifact or RANKERS[args.backend][1]})")
+    for name, value in results.items():
+        print(f" {name:>14}: {value:.4f}" if isinstance(value, float) else f" {name:>14}: {value}")
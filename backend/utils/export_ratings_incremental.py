@@ -0,0 +1,181 @@
+"""
+Created by: Stuart Smith
+Student ID: S2336002
+Date Created: 2025-04-29
+Description:
+This script incrementally exports ratings from users.db to a partitioned, columnar dataset.
+Features:
+- Tracks a high-water mark in the dataset manifest: a (timestamp, id) cursor, which is monotonic
+  because rating writes always move the timestamp forward (auth/repositories.py), plus an id
+  cursor for rows without a timestamp (written directly by the seeding scripts)
+- Each run appends only ratings inserted or updated since the last run as a new partition
+- Partitions are NumPy .npz files with one array per column (id, user_id, build_id, rating, timestamp)
+- Only the new rows are checked against the labeled build IDs
+- Compacts the partitions into one once there are too many, keeping the latest version of each rating
+  and dropping ratings that have since been deleted
+Export time scales with the number of new ratings, not the size of the ratings table.
+"""
+
+import os
+import json
+import sqlite3
+import numpy as np
+import pandas as pd
+
+# Define paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(BASE_DIR, "database", "users.db")
+LABELED_PATH = os.path.join(BASE_DIR, "data", "builds", "labeled_builds.csv")
+DATASET_DIR = os.path.join(BASE_DIR, "data", "ratings_dataset")
+MANIFEST_NAME = "_manifest.json"
+
+#  Compact once this many partitions have accumulated
+COMPACT_AFTER_PARTS = int(os.environ.get("RATINGS_COMPACT_AFTER_PARTS", 16))
+COLUMNS = ("id", "user_id", "build_id", "rating", "timestamp")
+
+
+#  Ratings past a watermark (see watermark_params); never NULL, so NOT (...) selects the rest
+NEW_RATINGS_CONDITION = "((timestamp IS NOT NULL AND (timestamp, id) > (?, ?)) OR (timestamp IS NULL AND id > ?))"
+
+
+def watermark_params(watermark: dict) -> tuple:
+    """NEW_RATINGS_CONDITION parameters for a manifest/training-state dict."""
+    return (watermark["last_timestamp"], watermark["last_rating_id"], watermark.get("last_untimestamped_id", 0))
+
+
+def advance_watermark(watermark: dict, df: pd.DataFrame) -> dict:
+    """Moves the watermark past every row of df (rows read with NEW_RATINGS_CONDITION)."""
+    timestamped = df[df["timestamp"].notna()]
+    if not timestamped.empty:
+        last = timestamped.sort_values(["timestamp", "id"]).iloc[-1]
+        watermark["last_timestamp"], watermark["last_rating_id"] = str(last["timestamp"]), int(last["id"])
+    untimestamped = df[df["timestamp"].isna()]
+    if not untimestamped.empty:
+        watermark["last_untimestamped_id"] = max(watermark.get("last_untimestamped_id", 0),
+                                                 int(untimestamped["id"].max()))
+    return watermark
+
+
+def load_manifest(dataset_dir: str = DATASET_DIR) -> dict:
+    path = os.path.join(dataset_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"last_rating_id": 0, "last_timestamp": "", "last_untimestamped_id": 0, "next_part": 1, "parts": []}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_manifest(manifest: dict, dataset_dir: str = DATASET_DIR):
+    """The manifest is the commit point: readers only see partitions listed in it."""
+    path = os.path.join(dataset_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def write_partition(df: pd.DataFrame, dataset_dir: str, manifest: dict) -> str:
+    """Writes df as the next numbered partition and returns its file name (not yet in the manifest)."""
+    name = f"part-{manifest['next_part']:06d}.npz"
+    manifest["next_part"] += 1
+    path = os.path.join(dataset_dir, name)
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f,
+                 id=df["id"].to_numpy(np.int64),
+                 user_id=df["user_id"].to_numpy(dtype=str),
+                 build_id=df["build_id"].to_numpy(dtype=str),
+                 rating=df["rating"].to_numpy(np.float32),
+                 timestamp=df["timestamp"].fillna("").to_numpy(dtype=str))
+    os.replace(path + ".tmp", path)
+    return name
+
+
+def read_partition(path: str, columns=COLUMNS) -> pd.DataFrame:
+    with np.load(path) as data:
+        return pd.DataFrame({column: data[column] for column in columns})
+
+
+def read_ratings_dataset(dataset_dir: str = DATASET_DIR, columns=("user_id", "build_id", "rating")) -> pd.DataFrame:
+    """Loads the dataset, keeping only the latest exported version of each rating."""
+    manifest = load_manifest(dataset_dir)
+    if not manifest["parts"]:
+        return pd.DataFrame(columns=list(columns))
+    read_columns = tuple(dict.fromkeys(("id",) + tuple(columns)))
+    df = pd.concat([read_partition(os.path.join(dataset_dir, part), read_columns) for part in manifest["parts"]],
+                   ignore_index=True)
+    #  Partitions are in export order, so the last occurrence of an id is the newest
+    df = df.drop_duplicates("id", keep="last").sort_values("id")
+    return df[list(columns)].reset_index(drop=True)
+
+
+def fetch_new_ratings(conn, manifest: dict) -> pd.DataFrame:
+    """Ratings inserted or updated after the watermark (uses the primary key and timestamp index)."""
+    return pd.read_sql_query(
+        f"SELECT id, user_id, build_id, rating, timestamp FROM ratings WHERE {NEW_RATINGS_CONDITION} ORDER BY id",
+        conn, params=watermark_params(manifest)
+    )
+
+
+def export_ratings_incremental(db_path: str = DB_PATH, labeled_path: str = LABELED_PATH,
+                               dataset_dir: str = DATASET_DIR, compact_after: int = COMPACT_AFTER_PARTS) -> int:
+    """Appends new/updated ratings as one partition. Returns the number of rows written."""
+    os.makedirs(dataset_dir, exist_ok=True)
+    manifest = load_manifest(dataset_dir)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_ratings_timestamp ON ratings(timestamp)")
+        df = fetch_new_ratings(conn, manifest)
+    finally:
+        conn.close()
+
+    if df.empty:
+        print(" No new ratings since the last export.")
+        return 0
+
+    #  The watermark covers every row read, including ones filtered out below
+    advance_watermark(manifest, df)
+
+    valid_build_ids = set(pd.read_csv(labeled_path, usecols=["build_id"])["build_id"].astype(str))
+    df = df[df["build_id"].astype(str).isin(valid_build_ids) & df["rating"].notna()]
+
+    if not df.empty:
+        manifest["parts"].append(write_partition(df, dataset_dir, manifest))
+    save_manifest(manifest, dataset_dir)
+    print(f" Exported {len(df)} new/updated ratings ({len(manifest['parts'])} partitions).")
+
+    if len(manifest["parts"]) >= compact_after:
+        compact_dataset(db_path, dataset_dir)
+    return len(df)
+
+
+def compact_dataset(db_path: str = DB_PATH, dataset_dir: str = DATASET_DIR):
+    """Rewrites all partitions as one, keeping the newest version of each still-existing rating."""
+    manifest = load_manifest(dataset_dir)
+    old_parts = list(manifest["parts"])
+    if not old_parts:
+        return
+
+    df = read_ratings_dataset(dataset_dir, columns=COLUMNS)
+
+    #  Deletes never move the watermark, so reconcile them here with a cheap id-only scan
+    conn = sqlite3.connect(db_path)
+    try:
+        existing_ids = {row[0] for row in conn.execute("SELECT id FROM ratings")}
+    finally:
+        conn.close()
+    df = df[df["id"].isin(existing_ids)]
+
+    manifest["parts"] = [write_partition(df, dataset_dir, manifest)]
+    save_manifest(manifest, dataset_dir)
+    for part in old_parts:
+        os.remove(os.path.join(dataset_dir, part))
+    print(f" Compacted {len(old_parts)} partitions into {manifest['parts'][0]} ({len(df)} ratings).")
+
+
+# CLI usage
+if __name__ == "__main__":
+    import sys
+
+    if "--compact" in sys.argv:
+        compact_dataset(DB_PATH, DATASET_DIR)
+    else:
+        export_ratings_incremental(DB_PATH, LABELED_PATH, DATASET_DIR)
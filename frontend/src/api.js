@@ -100,17 +100,28 @@ export async function saveBuild(build, token) {
  * @returns {Promise<Object>} Saved builds array
  */
 export async function getSavedBuilds(token) {
-  const response = await fetch(`${API_BASE_URL}/auth/my_builds`, {
-    headers: {
-      Authorization: `Bearer ${token}`,
-    },
-  });
-
-  if (!response.ok) {
-    throw new Error("Failed to fetch saved builds");
-  }
-
-  return await response.json();
+  const savedBuilds = [];
+  let cursor = null;
+
+  //  The backend pages saved builds; follow next_cursor until the last page
+  do {
+    const query = cursor === null ? "" : `?cursor=${cursor}`;
+    const response = await fetch(`${API_BASE_URL}/auth/my_builds${query}`, {
+      headers: {
+        Authorization: `Bearer ${token}`,
+      },
+    });
+
+    if (!response.ok) {
+      throw new Error("Failed to fetch saved builds");
+    }
+
+    const page = await response.json();
+    savedBuilds.push(...(page.saved_builds || []));
+    cursor = page.next_cursor ?? null;
+  } while (cursor !== null);
+
+  return { saved_builds: savedBuilds };
 }
 
 /**